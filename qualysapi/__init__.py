@@ -3,4 +3,4 @@ __author__ = "Parag Baxi <parag.baxi@gmail.com>"
 __copyright__ = "Copyright 2011-2013, Parag Baxi"
 __license__ = "BSD-new"
 
-from qualysapi.util import connect
+from qualysapi.util import connect, connect_pool
@@ -1,27 +1,111 @@
+import datetime
+import json
 import logging
+import os
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from urllib import parse as urlparse
 
 from lxml import objectify
 
+import qualysapi.settings as qcs
 from qualysapi.api_objects import *
+from qualysapi.asset_index import AssetGroupIndex
+from qualysapi.checkpoint import Checkpoint
+from qualysapi.compliance import ComplianceIndex, iter_controls, iter_policies, iter_posture_info
+from qualysapi.host_store import API_DATETIME_FORMAT
+from qualysapi.ip_ranges import chunk_ip_ranges, collapse_ranges, ip_to_int, iter_ip_ranges
+from qualysapi.parallel import map_concurrent, worker_count
+from qualysapi.pipeline import Pipeline
+from qualysapi.portal import (
+    ServiceRequestTemplate,
+    has_more_records,
+    parse_service_response,
+    records,
+)
+from qualysapi.scan_results import iter_csv_results, iter_json_results
+from qualysapi.streaming import columnar_batches, raw_stream
+from qualysapi.tag_index import TagIndex
+from qualysapi.was import finding_record, iter_scan_vulns
+
+
+@contextmanager
+def null_context():
+    """ Context manager that does nothing (contextlib.nullcontext needs Python 3.7). """
+    yield
 
 
 class QGActions:
-    def getHost(self, host):
+    def _storeHosts(self, hosts, complete=True):
+        # Populate the connector's host store, if any, from a bulk pull.
+        # Only pulls with details=All are 'complete': other pulls lack LAST_VULN_SCAN_DATETIME
+        # and would overwrite stored records with ones that getHost reports as never scanned.
+        if self.host_store is not None and complete:
+            self.host_store.merge(hosts)
+        return hosts
+
+    def getHost(self, host, max_age=None):
+        # Served from the host store when it holds a record younger than 'max_age' seconds
+        # (defaults to the connector's host_store_max_age), otherwise from the API.
+        if self.host_store is not None:
+            if max_age is None:
+                max_age = self.host_store_max_age
+            stored = self.host_store.find_by_ip(host, max_age)
+            if stored:
+                return stored[0]
         call = "/api/2.0/fo/asset/host/"
         parameters = {"action": "list", "ips": host, "details": "All"}
-        hostData = objectify.fromstring(self.request(call, parameters).encode("utf-8")).RESPONSE
+        hostData = self._fromstring(self.request(call, parameters)).RESPONSE
         hostData = hostData.HOST_LIST.HOST
-        return Host(
-            hostData.find("DNS"),
-            hostData.find("ID"),
-            hostData.find("IP"),
-            hostData.find("LAST_VULN_SCAN_DATETIME"),
-            hostData.find("NETBIOS"),
-            hostData.find("OS"),
-            hostData.find("TRACKING_METHOD"),
-        )
+        return self._storeHosts([self._hostFromElement(hostData)])[0]
+
+    def getHosts(
+        self, ips, max_age=None, max_length=qcs.max_ips_length, max_workers=None, limit=1000
+    ):
+        # Bulk version of getHost.
+        # Returns dict mapping each IP in 'ips' to its Host, or to None when the subscription
+        # has no such host. IPs fresh in the host store are served from it; the rest are
+        # collapsed into ranges and pulled with as few paginated host list calls as possible,
+        # run concurrently within the concurrency limit.
+        wanted = {}
+        for ip in ips:
+            wanted[str(ip).strip()] = ip_to_int(ip)
+        found = {}
+        if self.host_store is not None:
+            if max_age is None:
+                max_age = self.host_store_max_age
+            for ip in wanted:
+                stored = self.host_store.find_by_ip(ip, max_age)
+                if stored:
+                    found[wanted[ip]] = stored[0]
+        missing = [
+            (version, value, value)
+            for version, value in set(wanted.values())
+            if (version, value) not in found
+        ]
+        chunks = chunk_ip_ranges(collapse_ranges(missing), max_length)
+
+        def pull(chunk):
+            hosts = []
+            parameters = {"ips": chunk, "details": "All", "truncation_limit": str(limit)}
+            for page in self._hostPages(parameters):
+                hosts.extend(page)
+            return hosts
+
+        for result in map_concurrent(self, pull, chunks, max_workers):
+            if result.error is not None:
+                raise result.error
+            for host in self._storeHosts(result.result):
+                try:
+                    key = ip_to_int(host.ip)
+                except ValueError:
+                    # No IPv4 address (host.ip is "None"), cannot match a requested IP.
+                    logging.debug("Skipping host %s without IP address.", host.id)
+                    continue
+                found.setdefault(key, host)
+        return {ip: found.get(key) for ip, key in wanted.items()}
 
     def listHosts(
         self,
@@ -55,47 +139,23 @@ class QGActions:
         if echo_request:
             parameters["echo_request"] = echo_request
 
-        hostData = objectify.fromstring(self.request(call, parameters).encode("utf-8"))
-        hostArray = []
-        for host in hostData.RESPONSE.HOST_LIST.HOST:
-            hostArray.append(
-                Host(
-                    host.find("DNS"),
-                    host.find("ID"),
-                    host.find("IP"),
-                    host.find("LAST_VULN_SCAN_DATETIME"),
-                    host.find("NETBIOS"),
-                    host.find("OS"),
-                    host.find("TRACKING_METHOD"),
-                )
-            )
+        hostData = self._fromstring(self.request(call, parameters))
+        hostArray = self._hostsFromList(hostData.RESPONSE)
 
-        return hostArray
+        return self._storeHosts(hostArray, complete=detailed)
 
     def getHostRange(self, start, end):
         call = "/api/2.0/fo/asset/host/"
         parameters = {"action": "list", "ips": f"{start}-{end}"}
-        hostData = objectify.fromstring(self.request(call, parameters).encode("utf-8"))
-        hostArray = []
-        for host in hostData.RESPONSE.HOST_LIST.HOST:
-            hostArray.append(
-                Host(
-                    host.find("DNS"),
-                    host.find("ID"),
-                    host.find("IP"),
-                    host.find("LAST_VULN_SCAN_DATETIME"),
-                    host.find("NETBIOS"),
-                    host.find("OS"),
-                    host.find("TRACKING_METHOD"),
-                )
-            )
+        hostData = self._fromstring(self.request(call, parameters))
+        hostArray = self._hostsFromList(hostData.RESPONSE)
 
-        return hostArray
+        return self._storeHosts(hostArray, complete=False)
 
     def listVirtualHosts(self, ip=None, port=None):
         call = "/api/2.0/fo/asset/vhost/"
         parameters = {"action": "list", "ip": ip, "port": port}
-        hostsData = objectify.fromstring(self.request(call, parameters).encode("utf-8")).RESPONSE
+        hostsData = self._fromstring(self.request(call, parameters)).RESPONSE
         hosts = [
             VirtualHost(
                 hostData.find("FQDN"),
@@ -110,7 +170,7 @@ class QGActions:
     def createVirtualHost(self, fqdn, ip, port):
         call = "/api/2.0/fo/asset/vhost/"
         parameters = {"action": "create", "fqdn": fqdn, "ip": ip, "port": port}
-        res = objectify.fromstring(self.request(call, parameters).encode("utf-8")).RESPONSE
+        res = self._fromstring(self.request(call, parameters)).RESPONSE
         code = getattr(res, "CODE", "")
         logging.debug("%s %s %s", res.DATETIME, code, res.TEXT)
         return code, res
@@ -118,7 +178,7 @@ class QGActions:
     def deleteVirtualHost(self, ip, port):
         call = "/api/2.0/fo/asset/vhost/"
         parameters = {"action": "delete", "ip": ip, "port": port}
-        res = objectify.fromstring(self.request(call, parameters).encode("utf-8")).RESPONSE
+        res = self._fromstring(self.request(call, parameters)).RESPONSE
         code = getattr(res, "CODE", "")
         logging.debug("%s %s %s", res.DATETIME, code, res.TEXT)
         return code, res
@@ -126,11 +186,9 @@ class QGActions:
     def listAssetGroups(self, groupName=""):
         call = "asset_group_list.php"
         if groupName == "":
-            agData = objectify.fromstring(self.request(call).encode("utf-8"))
+            agData = self._fromstring(self.request(call))
         else:
-            agData = objectify.fromstring(
-                self.request(call, f"title={groupName}").encode("utf-8")
-            )
+            agData = self._fromstring(self.request(call, f"title={groupName}"))
 
         groupsArray = []
         for group in agData.ASSET_GROUP:
@@ -169,9 +227,18 @@ class QGActions:
 
         return groupsArray
 
+    def assetGroupIndex(self, index=None):
+        # Build an AssetGroupIndex for fast IP membership lookups.
+        # Pass a previously built 'index' to refresh it in place; only groups whose LAST_UPDATE
+        # changed since the last refresh have their IPs reparsed.
+        if index is None:
+            index = AssetGroupIndex()
+        index.update(self.listAssetGroups())
+        return index
+
     def listReportTemplates(self):
         call = "report_template_list.php"
-        rtData = objectify.fromstring(self.request(call).encode("utf-8"))
+        rtData = self._fromstring(self.request(call))
         templatesArray = []
 
         for template in rtData.REPORT_TEMPLATE:
@@ -195,9 +262,7 @@ class QGActions:
         if id == 0:
             parameters = {"action": "list"}
 
-            repData = objectify.fromstring(
-                self.request(call, parameters).encode("utf-8")
-            ).RESPONSE
+            repData = self._fromstring(self.request(call, parameters)).RESPONSE
             reportsArray = []
             while repData.find("REPORT_LIST") is None and max_retries > 0:
                 max_retries = max_retries - 1
@@ -242,9 +307,7 @@ class QGActions:
             if max_retries <= 0:
                 logging.info("Report Listing not successful")
                 return None
-            repData = objectify.fromstring(
-                self.request(call, parameters).encode("utf-8")
-            ).RESPONSE.REPORT_LIST.REPORT
+            repData = self._fromstring(self.request(call, parameters)).RESPONSE.REPORT_LIST.REPORT
 
             return Report(
                 repData.find("EXPIRATION_DATETIME"),
@@ -298,7 +361,7 @@ class QGActions:
             else:
                 raise ValueError("tag_set_by must be id or name")
 
-        repData = objectify.fromstring(self.request(call, parameters).encode("utf-8")).RESPONSE
+        repData = self._fromstring(self.request(call, parameters)).RESPONSE
         while (
             repData.find("TEXT")
             == "Max number of allowed reports already running. Please try again later."
@@ -306,9 +369,7 @@ class QGActions:
         ):
             max_retries = max_retries - 1
             time.sleep(30)
-            repData = objectify.fromstring(
-                self.request(call, parameters).encode("utf-8")
-            ).RESPONSE
+            repData = self._fromstring(self.request(call, parameters)).RESPONSE
             logging.info(
                 "Max number of allowed reports already running. %s attempts left.", max_retries
             )
@@ -320,7 +381,9 @@ class QGActions:
         logging.warn("Report ID is empty.")
         return None
 
-    def downloadReport(self, report_id, echo_request=0):
+    def downloadReport(self, report_id, echo_request=0, spool=False):
+        # With 'spool', return a binary file object (spooled to disk when large, see
+        # request_spooled) instead of the report text.
         call = "/api/2.0/fo/report"
         parameters = {
             "action": "fetch",
@@ -329,64 +392,272 @@ class QGActions:
         if echo_request:
             parameters["echo_request"] = echo_request
 
+        if spool:
+            return self.request_spooled(call, parameters)
         return self.request(call, parameters)
 
-    def notScannedSince(self, days):
+    def _phase(self, name):
+        # Return context manager timing phase 'name' of the current action when profiling.
+        profiler = getattr(self, "profiler", None)
+        if profiler is None:
+            return null_context()
+        return profiler.phase(name)
+
+    def _fromstring(self, text):
+        # Return objectified XML response text.
+        with self._phase("parse"):
+            return objectify.fromstring(text.encode("utf-8"))
+
+    def _hostFromElement(self, host):
+        return Host(
+            host.find("DNS"),
+            host.find("ID"),
+            host.find("IP"),
+            host.find("LAST_VULN_SCAN_DATETIME"),
+            host.find("NETBIOS"),
+            host.find("OS"),
+            host.find("TRACKING_METHOD"),
+        )
+
+    def _hostsFromList(self, response):
+        # Return Host objects of a host list RESPONSE.
+        with self._phase("materialize"):
+            return [self._hostFromElement(host) for host in response.HOST_LIST.HOST]
+
+    def _nextIdMin(self, response):
+        # Return id_min of the next page from the truncation WARNING URL, or None on last page.
+        try:
+            return dict(urlparse.parse_qsl(urlparse.urlparse(str(response.WARNING.URL)).query))[
+                "id_min"
+            ]
+        except (AttributeError, KeyError):
+            return None
+
+    def _resume(self, checkpoint, call, parameters, cursor="id_min"):
+        # Return copy of parameters continuing from checkpoint's saved cursor, if any.
+        parameters = dict(parameters)
+        if checkpoint is not None:
+            saved = checkpoint.begin(call, parameters)
+            if saved is not None:
+                parameters[cursor] = saved
+        return parameters
+
+    def _advance(self, checkpoint, cursor):
+        # Record a completely processed page in checkpoint (None cursor: pull finished).
+        if checkpoint is None:
+            return
+        if cursor is None:
+            checkpoint.finish()
+        else:
+            checkpoint.advance(cursor)
+
+    def _pages(self, call, parameters, checkpoint=None):
+        # Yield each RESPONSE of a truncated v2 list call, following id_min until the last page.
+        # With a Checkpoint, a page counts as done once the consumer asks for the next one.
+        # With adaptive paging, truncation_limit is retuned after every full page from its
+        # request and parse time and its size.
+        parameters = self._resume(checkpoint, call, parameters)
+        pager = self.pager(call, parameters.get("truncation_limit"))
+        while True:
+            if pager is not None:
+                parameters["truncation_limit"] = str(pager.size)
+            started = time.monotonic()
+            text = self.request(call, parameters)
+            response = self._fromstring(text).RESPONSE
+            elapsed = time.monotonic() - started
+            yield response
+            id_min = self._nextIdMin(response)
+            if pager is not None and id_min is not None:
+                # A truncated page holds exactly truncation_limit records.
+                pager.observe(int(parameters["truncation_limit"]), elapsed, len(text))
+            self._advance(checkpoint, id_min)
+            if id_min is None:
+                break
+            parameters["id_min"] = id_min
+
+    def _streamPages(self, call, parameters, parse, checkpoint=None):
+        # Yield records of a truncated v2 list call parsed incrementally from streamed responses.
+        # 'parse' is a generator function taking a binary file-like object, yielding records and
+        # returning the next page's id_min (or None on the last page).
+        # Adaptive page durations include the time the consumer spends on the records.
+        parameters = self._resume(checkpoint, call, parameters)
+        pager = self.pager(call, parameters.get("truncation_limit"))
+        while True:
+            if pager is not None:
+                parameters["truncation_limit"] = str(pager.size)
+            started = time.monotonic()
+            response = self.request_streaming(call, parameters)
+            try:
+                id_min = yield from parse(raw_stream(response))
+                nbytes = response.raw.tell()
+            finally:
+                response.close()
+            if pager is not None and id_min is not None:
+                pager.observe(
+                    int(parameters["truncation_limit"]), time.monotonic() - started, nbytes
+                )
+            self._advance(checkpoint, id_min)
+            if id_min is None:
+                break
+            parameters["id_min"] = id_min
+
+    def pipeline(
+        self,
+        fetch=None,
+        parse=None,
+        fetch_workers=None,
+        parse_workers=1,
+        processes=False,
+        queue_size=qcs.pipeline_queue_size,
+    ):
+        # Return Pipeline overlapping fetch (I/O threads), parse (threads or processes) and the
+        # consumer, connected by bounded queues. fetch_workers defaults to the subscription's
+        # concurrency limit. For example, to parse WAS scans while the next ones download:
+        #   conn.pipeline(
+        #       fetch=lambda scan_id: conn.request_spooled(f"/download/was/wasscan/{scan_id}"),
+        #       parse=iter_scan_vulns,
+        #   ).run(scan_ids, writer.writerow)
+        if fetch is not None:
+            fetch_workers = worker_count(self, fetch_workers)
+        return Pipeline(fetch, parse, fetch_workers or 1, parse_workers, queue_size, processes)
+
+    def _hostPages(self, parameters, checkpoint=None):
+        # Yield list of Host objects per page of /api/2.0/fo/asset/host/ list results.
         call = "/api/2.0/fo/asset/host/"
-        parameters = {"action": "list", "details": "All"}
+        for response in self._pages(call, dict(parameters, action="list"), checkpoint):
+            if response.find("HOST_LIST") is None:
+                yield []
+            else:
+                yield self._hostsFromList(response)
+
+    def notScannedSince(self, days):
+        # Hosts whose last vulnerability scan is at least 'days' days old (inclusive: with
+        # days=30 on March 10th, hosts last scanned on February 9th are returned).
+        # Filtering happens server side with no_vm_scan_since, which matches hosts not scanned
+        # on or after the given date; hosts never scanned are skipped.
+        cutoff = datetime.date.today() - datetime.timedelta(days=days - 1)
+        parameters = {"details": "All", "no_vm_scan_since": cutoff.strftime("%Y-%m-%d")}
         hostArray = []
-        today = datetime.date.today()
-        hasNextPage = True
-        while hasNextPage:
-            hostData = objectify.fromstring(self.request(call, parameters).encode("utf-8"))
-            for host in hostData.RESPONSE.HOST_LIST.HOST:
-                if host.find("LAST_VULN_SCAN_DATETIME"):
-                    last_scan = str(host.LAST_VULN_SCAN_DATETIME).split("T")[0]
-                    last_scan = datetime.date(
-                        int(last_scan.split("-")[0]),
-                        int(last_scan.split("-")[1]),
-                        int(last_scan.split("-")[2]),
-                    )
-                    if (today - last_scan).days >= days:
-                        hostArray.append(
-                            Host(
-                                host.find("DNS"),
-                                host.find("ID"),
-                                host.find("IP"),
-                                host.find("LAST_VULN_SCAN_DATETIME"),
-                                host.find("NETBIOS"),
-                                host.find("OS"),
-                                host.find("TRACKING_METHOD"),
-                            )
-                        )
-            try:
-                id_min = dict(
-                    urlparse.parse_qsl(
-                        urlparse.urlparse(str(hostData.RESPONSE.WARNING.URL)).query
-                    )
-                )["id_min"]
-                parameters["id_min"] = id_min
-            except:
-                hasNextPage = False
+        for hosts in self._hostPages(parameters):
+            hostArray.extend(host for host in hosts if host.last_scan != "never")
+
+        return self._storeHosts(hostArray)
+
+    def syncHosts(
+        self, store, since_filter="vm_processed_after", full=False, limit=1000, checkpoint=None
+    ):
+        # Incrementally sync a HostStore with the subscription's hosts.
+        # Only hosts matching 'since_filter' (vm_processed_after or vm_scan_since) relative to
+        # the store's high-water mark are pulled and merged by ID.
+        # 'full' pulls every host and drops hosts no longer in the subscription.
+        # The high-water mark only advances after the whole pull succeeded.
+        # With a Checkpoint, an interrupted sync continues from its last merged page; merges
+        # are idempotent, but a resumed full sync cannot tell which hosts disappeared and
+        # therefore skips pruning.
+        # Returns number of hosts merged.
+        if since_filter not in ("vm_processed_after", "vm_scan_since"):
+            raise ValueError(f"Unsupported since_filter {since_filter!r}")
+        started = datetime.datetime.utcnow()
+        parameters = {"details": "All", "truncation_limit": str(limit)}
+        high_water_mark = store.high_water_mark
+        if high_water_mark and not full:
+            parameters[since_filter] = high_water_mark
+        logging.info("Syncing hosts with %s", parameters)
+        merged = 0
+        seen = set()
+        for hosts in self._hostPages(parameters, checkpoint):
+            if checkpoint is not None:
+                # An interrupted sync may have missed hosts changed since it first started.
+                if checkpoint.get("started") is None:
+                    checkpoint.set("started", started.strftime(API_DATETIME_FORMAT))
+                started = datetime.datetime.strptime(
+                    checkpoint.get("started"), API_DATETIME_FORMAT
+                )
+            merged += store.merge(hosts)
+            if full or not high_water_mark:
+                seen.update(host.id for host in hosts)
+        resumed = checkpoint is not None and checkpoint.resumed
+        if (full or not high_water_mark) and not resumed:
+            store.prune(seen)
+        store.high_water_mark = started
+        logging.info("Merged %d hosts into host store.", merged)
+        return merged
+
+    def exportHosts(self, filename, checkpoint=None, limit=1000):
+        # Write every host as one JSON object per line to 'filename'; returns number written.
+        # With a Checkpoint, a rerun after a failure continues from the last completed page
+        # and first truncates 'filename' to that page's end, so no host is written twice.
+        if checkpoint is None:
+            checkpoint = Checkpoint(f"{filename}.checkpoint")
+        output = checkpoint.open_output(filename)
+        written = 0
+        try:
+            parameters = {"details": "All", "truncation_limit": str(limit)}
+            for hosts in self._hostPages(parameters, checkpoint):
+                for host in hosts:
+                    output.write(json.dumps(vars(host), default=str).encode("utf-8") + b"\n")
+                written += len(hosts)
+        finally:
+            checkpoint.close()
+        return written
+
+    def snapshotHosts(self, store, name=None, limit=1000):
+        # Save every host to SnapshotStore 'store' as a snapshot sorted by host ID and return
+        # its name. Compare two pulls with store.diff(old_name, new_name), which streams
+        # "add", "remove" and "change" SnapshotEvents.
+        parameters = {"details": "All", "truncation_limit": str(limit)}
+        records = (vars(host) for hosts in self._hostPages(parameters) for host in hosts)
+        return store.save(records, name)
 
-        return hostArray
+    def _vmpcFlags(self, vmpc):
+        # Return (enable_vm, enable_pc) for 'vm', 'pc', or 'both'.
+        if vmpc == "pc":
+            return 0, 1
+        elif vmpc == "both":
+            return 1, 1
+        return 1, 0
 
     def addIP(self, ips, vmpc):
         # 'ips' parameter accepts comma-separated list of IP addresses.
         # 'vmpc' parameter accepts 'vm', 'pc', or 'both'. (Vulnerability Managment, Policy Compliance, or both)
         call = "/api/2.0/fo/asset/ip/"
-        enablevm = 1
-        enablepc = 0
-        if vmpc == "pc":
-            enablevm = 0
-            enablepc = 1
-        elif vmpc == "both":
-            enablevm = 1
-            enablepc = 1
+        enablevm, enablepc = self._vmpcFlags(vmpc)
 
         parameters = {"action": "add", "ips": ips, "enable_vm": enablevm, "enable_pc": enablepc}
         self.request(call, parameters)
 
+    def addIPs(self, ips, vmpc="vm", max_length=qcs.max_ips_length, max_workers=None):
+        # Bulk version of addIP.
+        # 'ips' parameter accepts a comma-separated string, an iterable of IPs, ranges or CIDRs,
+        # an open file or a path (pathlib.Path / os.PathLike) to a file with one entry per line.
+        # Inputs are validated and merged into minimal ranges, split into chunks of at most
+        # 'max_length' characters and submitted concurrently within the subscription
+        # concurrency limit.
+        # Returns list of TaskResult(item=chunk, result=response text, error=exception or None).
+        if isinstance(ips, os.PathLike):
+            with open(ips) as f:
+                ranges = collapse_ranges(iter_ip_ranges(line for line in f))
+        else:
+            ranges = collapse_ranges(iter_ip_ranges(ips))
+        chunks = chunk_ip_ranges(ranges, max_length)
+        logging.info("Adding %d IP ranges in %d chunks.", len(ranges), len(chunks))
+        call = "/api/2.0/fo/asset/ip/"
+        enablevm, enablepc = self._vmpcFlags(vmpc)
+
+        def add_chunk(chunk):
+            parameters = {
+                "action": "add",
+                "ips": chunk,
+                "enable_vm": enablevm,
+                "enable_pc": enablepc,
+            }
+            response = self.request(call, parameters)
+            if response is False:
+                raise ValueError(f"Adding IPs failed for chunk {chunk}")
+            return response
+
+        return map_concurrent(self, add_chunk, chunks, max_workers)
+
     def listScans(self, launched_after="", state="", target="", type="", user_login=""):
         # 'launched_after' parameter accepts a date in the format: YYYY-MM-DD
         # 'state' parameter accepts "Running", "Paused", "Canceled", "Finished", "Error", "Queued", and "Loading".
@@ -410,69 +681,151 @@ class QGActions:
         if user_login != "":
             parameters["user_login"] = user_login
 
-        scanlist = objectify.fromstring(self.request(call, parameters).encode("utf-8"))
+        scanlist = self._fromstring(self.request(call, parameters))
         scanArray = []
-        for scan in scanlist.RESPONSE.SCAN_LIST.SCAN:
-            try:
-                agList = []
-                for ag in scan.ASSET_GROUP_TITLE_LIST.ASSET_GROUP_TITLE:
-                    agList.append(ag)
-            except AttributeError:
-                agList = []
-
-            scanArray.append(
-                Scan(
-                    agList,
-                    scan.find("DURATION"),
-                    scan.find("LAUNCH_DATETIME"),
-                    scan.find("OPTION_PROFILE.TITLE"),
-                    scan.find("PROCESSED"),
-                    scan.find("REF"),
-                    scan.find("STATUS"),
-                    scan.find("TARGET"),
-                    scan.find("TITLE"),
-                    scan.find("TYPE"),
-                    scan.find("USER_LOGIN"),
+        with self._phase("materialize"):
+            for scan in scanlist.RESPONSE.SCAN_LIST.SCAN:
+                try:
+                    agList = []
+                    for ag in scan.ASSET_GROUP_TITLE_LIST.ASSET_GROUP_TITLE:
+                        agList.append(ag)
+                except AttributeError:
+                    agList = []
+
+                scanArray.append(
+                    Scan(
+                        agList,
+                        scan.find("DURATION"),
+                        scan.find("LAUNCH_DATETIME"),
+                        scan.find("OPTION_PROFILE.TITLE"),
+                        scan.find("PROCESSED"),
+                        scan.find("REF"),
+                        scan.find("STATUS"),
+                        scan.find("TARGET"),
+                        scan.find("TITLE"),
+                        scan.find("TYPE"),
+                        scan.find("USER_LOGIN"),
+                    )
                 )
-            )
 
+        if self.host_store is not None:
+            self.host_store.merge_scans(scanArray)
         return scanArray
 
     def listChildTags(self, tag_name=None, tag_id=None, filename=None):
         if tag_id:
-            files = (
-                """<ServiceRequest>
-<filters>
-<Criteria field="id" operator="EQUALS">"""
-                + tag_id
-                + """</Criteria>
-</filters>
-</ServiceRequest>"""
-            )
+            files = ServiceRequestTemplate([("id", "EQUALS", tag_id)]).render()
         elif filename:
             files = open(filename, "rb").read()
         elif tag_name:
-            files = (
-                """<ServiceRequest>
-<filters>
-<Criteria field="name" operator="EQUALS">"""
-                + tag_name
-                + """</Criteria>
-</filters>
-</ServiceRequest>"""
-            ).encode("ascii", "ignore")
+            files = ServiceRequestTemplate([("name", "EQUALS", tag_name)]).render()
 
         call = "/qps/rest/2.0/search/am/tag"
         parameters = files
-        response = objectify.fromstring(
-            self.request(call, parameters, api_version=2, http_method="post").encode("utf-8")
+        response = self._fromstring(
+            self.request(call, parameters, api_version=2, http_method="post")
         )
         childs = list()
-        for child in response.getchildren()[3][0].Tag.children.list.getchildren():
+        tag = response.find("data/Tag")
+        if tag is None or tag.find("children/list") is None:
+            return childs
+        for child in tag.children.list.getchildren():
             childs.append(child.getchildren())
 
         return childs
 
+    def tagIndex(self, index=None, full=False, limit=1000):
+        # Load the whole tag hierarchy into a TagIndex with paginated tag searches.
+        # Pass a previously built 'index' to refresh it with tags updated since its newest
+        # modified date. 'full' reloads every tag, which also drops deleted tags.
+        if index is None:
+            index = TagIndex()
+        criteria = []
+        if full:
+            index.clear()
+        elif index.last_modified:
+            criteria.append(("updated", "GREATER", index.last_modified))
+        index.update(
+            self.searchPortal(
+                "search/am/tag", criteria, limit=limit, api_version="am2", prefetch=True
+            )
+        )
+        return index
+
+    def updateAssetTags(self, asset_ids, add_tag_ids=(), remove_tag_ids=(), batch_size=1000):
+        # Add and/or remove tags on many host assets with one update/am/hostasset call per
+        # 'batch_size' assets, instead of one call per asset.
+        # Returns list of objectified ServiceResponses.
+        tags = {}
+        if add_tag_ids:
+            tags["add"] = {"TagSimple": [{"id": tag_id} for tag_id in add_tag_ids]}
+        if remove_tag_ids:
+            tags["remove"] = {"TagSimple": [{"id": tag_id} for tag_id in remove_tag_ids]}
+        template = ServiceRequestTemplate()
+        asset_ids = [str(asset_id) for asset_id in asset_ids]
+        responses = []
+        for i in range(0, len(asset_ids), batch_size):
+            payload = template.render(
+                [("id", "IN", ",".join(asset_ids[i : i + batch_size]))],
+                data=[{"tags": tags}],
+                object_type="HostAsset",
+            )
+            responses.append(
+                parse_service_response(
+                    self.request(
+                        "update/am/hostasset", payload, api_version="am2", http_method="post"
+                    )
+                )
+            )
+        return responses
+
+    def searchPortal(
+        self, call, criteria=(), limit=100, api_version=None, prefetch=False, checkpoint=None
+    ):
+        # Yield every record of a Portal API search call (e.g. 'search/am/tag' with
+        # api_version='am2', 'search/am/hostasset', 'search/was/webapp'), across pages.
+        # 'criteria' is an iterable of (field, operator, value) tuples.
+        # Pages are chained by adding "id GREATER lastId" to the criteria while the server
+        # reports hasMoreRecords. With 'prefetch', the next page is requested in the background
+        # while the records of the current page are consumed. With a Checkpoint, lastId is
+        # saved after the records of each page have been consumed and a rerun resumes there.
+        # With adaptive paging, limitResults is retuned after every full page.
+        criteria = list(criteria)
+        template = ServiceRequestTemplate(criteria, limit)
+        resume = self._resume(checkpoint, call, {"criteria": criteria, "limit": limit}, "lastId")
+        pager = self.pager(call, limit, portal=True)
+
+        def fetch(last_id):
+            started = time.monotonic()
+            payload = template.render(
+                [("id", "GREATER", last_id)] if last_id else (),
+                limit_results=pager.size if pager is not None else None,
+            )
+            text = self.request(call, payload, api_version=api_version, http_method="post")
+            root = parse_service_response(text)
+            if pager is not None and has_more_records(root):
+                pager.observe(len(records(root)), time.monotonic() - started, len(text))
+            return root
+
+        executor = ThreadPoolExecutor(max_workers=1) if prefetch else None
+        try:
+            root = fetch(resume.get("lastId"))
+            while True:
+                upcoming = None
+                if has_more_records(root):
+                    last_id = str(root.lastId)
+                    if executor:
+                        upcoming = executor.submit(fetch, last_id)
+                for record in records(root):
+                    yield record
+                self._advance(checkpoint, last_id if has_more_records(root) else None)
+                if not has_more_records(root):
+                    break
+                root = upcoming.result() if upcoming else fetch(last_id)
+        finally:
+            if executor:
+                executor.shutdown(wait=False)
+
     def launchScan(self, title, option_title, iscanner_name, asset_groups="", ip=""):
         # TODO: Add ability to scan by tag.
         call = "/api/2.0/fo/scan/"
@@ -491,9 +844,7 @@ class QGActions:
             parameters.pop("asset_groups")
 
         scan_ref = (
-            objectify.fromstring(self.request(call, parameters).encode("utf-8"))
-            .RESPONSE.ITEM_LIST.ITEM[1]
-            .VALUE
+            self._fromstring(self.request(call, parameters)).RESPONSE.ITEM_LIST.ITEM[1].VALUE
         )
 
         call = "/api/2.0/fo/scan/"
@@ -505,9 +856,7 @@ class QGActions:
             "show_op": 1,
         }
 
-        scan = objectify.fromstring(
-            self.request(call, parameters).encode("utf-8")
-        ).RESPONSE.SCAN_LIST.SCAN
+        scan = self._fromstring(self.request(call, parameters)).RESPONSE.SCAN_LIST.SCAN
         try:
             agList = []
             for ag in scan.ASSET_GROUP_TITLE_LIST.ASSET_GROUP_TITLE:
@@ -528,3 +877,179 @@ class QGActions:
             scan.find("TYPE"),
             scan.find("USER_LOGIN"),
         )
+
+    def iterScanResults(
+        self, scan_ref, output_format="json", mode="brief", batch_size=None, encoders=None
+    ):
+        # Stream the results of a finished scan (e.g. 'scan/1234567890.12345') from
+        # /api/2.0/fo/scan/ action=fetch as ScanResult records, parsed incrementally.
+        # 'output_format' is 'json', 'csv', 'json_extended' or 'csv_extended'; 'mode' is
+        # 'brief' or 'extended'. With 'batch_size', yield columnar dicts instead
+        # (see iterWasFindings for 'encoders').
+        parse = iter_csv_results if output_format.startswith("csv") else iter_json_results
+
+        def results():
+            response = self.request_streaming(
+                "/api/2.0/fo/scan/",
+                {
+                    "action": "fetch",
+                    "scan_ref": scan_ref,
+                    "output_format": output_format,
+                    "mode": mode,
+                },
+            )
+            try:
+                yield from parse(raw_stream(response), scan_ref)
+            finally:
+                response.close()
+
+        if batch_size:
+            return columnar_batches(results(), batch_size, encoders)
+        return results()
+
+    def _download(self, response, path):
+        # Save the body of a streamed response to 'path'. The body is written to a temporary
+        # file first, so a failed transfer leaves neither a partial file nor an earlier good
+        # download overwritten.
+        temporary = f"{path}.tmp"
+        try:
+            with response, open(temporary, "wb") as f:
+                response.raise_for_status()
+                for chunk in response.iter_content(chunk_size=qcs.stream_chunk_size):
+                    f.write(chunk)
+        except BaseException:
+            try:
+                os.unlink(temporary)
+            except FileNotFoundError:
+                pass
+            raise
+        os.replace(temporary, path)
+        return path
+
+    def downloadScanResults(
+        self, scan_refs, directory, output_format="json", mode="brief", max_workers=None
+    ):
+        # Download the results of many scans concurrently to 'directory', one file per scan
+        # named after its scan_ref (e.g. scan_1234567890.12345.json), within the concurrency
+        # limit. Parse the files later with qualysapi.scan_results.iter_json_results or
+        # iter_csv_results.
+        # Returns list of TaskResult(item=scan_ref, result=file path, error=exception or None).
+        extension = "csv" if output_format.startswith("csv") else "json"
+
+        def download(scan_ref):
+            path = os.path.join(directory, f"{scan_ref.replace('/', '_')}.{extension}")
+            response = self.request_streaming(
+                "/api/2.0/fo/scan/",
+                {
+                    "action": "fetch",
+                    "scan_ref": scan_ref,
+                    "output_format": output_format,
+                    "mode": mode,
+                },
+            )
+            return self._download(response, path)
+
+        return map_concurrent(self, download, scan_refs, max_workers)
+
+    def iterWasFindings(self, criteria=(), limit=1000, batch_size=None, encoders=None):
+        # Stream WAS findings from paginated search/was/finding calls as WasFinding records.
+        # 'criteria' is an iterable of (field, operator, value) tuples, e.g.
+        # [("webApp.id", "EQUALS", 123)]. With 'batch_size', yield columnar dicts of
+        # field name -> list of values instead of single records; 'encoders' maps field names
+        # to qualysapi.interning.DictionaryEncoder to emit integer codes for those fields.
+        findings = (
+            finding_record(record)
+            for record in self.searchPortal(
+                "search/was/finding", criteria, limit, api_version="was", prefetch=True
+            )
+        )
+        if batch_size:
+            return columnar_batches(findings, batch_size, encoders)
+        return findings
+
+    def iterWasScanResults(self, scan_id, batch_size=None, encoders=None):
+        # Stream-parse download/was/wasscan/<scan_id> into WasScanVuln records without
+        # holding the XML in memory. With 'batch_size', yield columnar dicts instead
+        # (see iterWasFindings for 'encoders').
+        def results():
+            response = self.request_streaming(
+                f"download/was/wasscan/{scan_id}", api_version="was", http_method="get"
+            )
+            try:
+                yield from iter_scan_vulns(raw_stream(response), scan_id)
+            finally:
+                response.close()
+
+        if batch_size:
+            return columnar_batches(results(), batch_size, encoders)
+        return results()
+
+    def downloadWasScans(self, scan_ids, directory, max_workers=None):
+        # Download the results of many WAS scans (e.g. the latest scan of each web app)
+        # concurrently to 'directory'/wasscan_<scan_id>.xml, within the concurrency limit.
+        # Parse the files later with qualysapi.was.iter_scan_vulns.
+        # Returns list of TaskResult(item=scan_id, result=file path, error=exception or None).
+        def download(scan_id):
+            path = os.path.join(directory, f"wasscan_{scan_id}.xml")
+            response = self.request_streaming(
+                f"download/was/wasscan/{scan_id}", api_version="was", http_method="get"
+            )
+            return self._download(response, path)
+
+        return map_concurrent(self, download, scan_ids, max_workers)
+
+    def complianceIndex(self, index=None, controls=True):
+        # Load policy (and optionally control) definitions into a ComplianceIndex.
+        if index is None:
+            index = ComplianceIndex()
+        for _ in self._streamPages(
+            "/api/2.0/fo/compliance/policy/",
+            {"action": "list", "details": "Basic"},
+            lambda source: iter_policies(source, index),
+        ):
+            pass
+        if controls:
+            for _ in self._streamPages(
+                "/api/2.0/fo/compliance/control/",
+                {"action": "list", "details": "Basic"},
+                lambda source: iter_controls(source, index),
+            ):
+                pass
+        return index
+
+    def iterPostureInfo(self, policy_id, index=None, hosts=None, limit=None):
+        # Stream posture info of 'policy_id' as compact PostureInfo records.
+        # Control, technology and policy definitions from each page's GLOSSARY are filed once
+        # in 'index' (a ComplianceIndex) instead of being repeated in every record.
+        # 'hosts' optionally limits the pull to a comma-separated list of IPs.
+        if index is None:
+            index = ComplianceIndex()
+        parameters = {"action": "list", "policy_id": str(policy_id), "output_format": "xml"}
+        if hosts:
+            parameters["ips"] = hosts
+        if limit:
+            parameters["truncation_limit"] = str(limit)
+        return self._streamPages(
+            "/api/2.0/fo/compliance/posture/info/",
+            parameters,
+            lambda source: iter_posture_info(source, int(policy_id), index),
+        )
+
+    def pullPostureInfo(self, policy_ids, callback, index=None, max_workers=None):
+        # Stream posture info of many policies concurrently, within the concurrency limit.
+        # Pages of one policy are chained through id_min and so stay sequential.
+        # 'callback' is called with each PostureInfo record, one call at a time.
+        # Returns list of TaskResult(item=policy_id, result=record count, error=exception or None).
+        if index is None:
+            index = ComplianceIndex()
+        lock = threading.Lock()
+
+        def pull(policy_id):
+            count = 0
+            for record in self.iterPostureInfo(policy_id, index):
+                with lock:
+                    callback(record)
+                count += 1
+            return count
+
+        return map_concurrent(self, pull, policy_ids, max_workers)
@@ -2,6 +2,16 @@ import datetime
 
 from lxml import objectify
 
+import qualysapi.settings as qcs
+from qualysapi.interning import intern_value
+from qualysapi.ip_ranges import (
+    chunk_ip_ranges,
+    collapse_ranges,
+    format_ip_range,
+    iter_ip_ranges,
+    subtract_ranges,
+)
+
 
 class Host:
     def __init__(self, dns, id, ip, last_scan, netbios, os, tracking_method):
@@ -18,8 +28,8 @@ class Host:
         except IndexError:
             self.last_scan = "never"
         self.netbios = str(netbios)
-        self.os = str(os)
-        self.tracking_method = str(tracking_method)
+        self.os = intern_value(str(os))
+        self.tracking_method = intern_value(str(tracking_method))
 
     def __repr__(self):
         return f"ip: {self.ip}, qualys_id: {self.id}, dns: {self.dns}"
@@ -42,24 +52,77 @@ class AssetGroup:
     def __init__(
         self, business_impact, id, last_update, scanips, scandns, scanner_appliances, title
     ):
-        self.business_impact = str(business_impact)
+        self.business_impact = intern_value(str(business_impact))
         self.id = int(id)
         self.last_update = str(last_update)
-        self.scanips = scanips
+        # IPs and ranges as strings, whether parsed from XML or edited locally.
+        self.scanips = [str(ip) for ip in scanips]
         self.scandns = scandns
         self.scanner_appliances = scanner_appliances
         self.title = str(title)
+        # Pending batched edits, as collapsed (version, start, end) ranges.
+        self._pending_add = []
+        self._pending_remove = []
 
     def addAsset(self, conn, ip):
         call = "/api/2.0/fo/asset/group/"
         parameters = {"action": "edit", "id": self.id, "add_ips": ip}
         conn.request(call, parameters)
-        self.scanips.append(ip)
+        self.scanips.append(str(ip))
 
     def setAssets(self, conn, ips):
+        # 'ips' accepts IPs, ranges or CIDRs, as a comma-separated string or an iterable.
         call = "/api/2.0/fo/asset/group/"
-        parameters = {"action": "edit", "id": self.id, "set_ips": ips}
+        scanips = [format_ip_range(*r) for r in collapse_ranges(iter_ip_ranges(ips))]
+        parameters = {"action": "edit", "id": self.id, "set_ips": ",".join(scanips)}
         conn.request(call, parameters)
+        self.scanips = scanips
+
+    def queueAdd(self, ips):
+        # Buffer IPs to add on the next flush(). Accepts IPs, ranges or CIDRs, as a
+        # comma-separated string or an iterable. Overrides any pending removal of the same IPs.
+        ranges = list(iter_ip_ranges(ips))
+        self._pending_remove = subtract_ranges(self._pending_remove, ranges)
+        self._pending_add = collapse_ranges(self._pending_add + ranges)
+
+    def queueRemove(self, ips):
+        # Buffer IPs to remove on the next flush(). Overrides any pending addition of the same IPs.
+        ranges = list(iter_ip_ranges(ips))
+        self._pending_add = subtract_ranges(self._pending_add, ranges)
+        self._pending_remove = collapse_ranges(self._pending_remove + ranges)
+
+    def hasPendingEdits(self):
+        return bool(self._pending_add or self._pending_remove)
+
+    def flush(self, conn, max_length=qcs.max_ips_length):
+        # Send buffered edits using as few edit calls as possible. Contiguous IPs are sent
+        # as ranges, and each call carries one add_ips and one remove_ips chunk of at most
+        # 'max_length' characters. Returns the number of calls made.
+        # Edits of a failed call, and of the calls after it, stay queued for the next flush().
+        call = "/api/2.0/fo/asset/group/"
+        add_chunks = chunk_ip_ranges(self._pending_add, max_length)
+        remove_chunks = chunk_ip_ranges(self._pending_remove, max_length)
+        current = collapse_ranges(iter_ip_ranges(self.scanips))
+        calls = max(len(add_chunks), len(remove_chunks))
+        for i in range(calls):
+            parameters = {"action": "edit", "id": self.id}
+            if i < len(add_chunks):
+                parameters["add_ips"] = add_chunks[i]
+            if i < len(remove_chunks):
+                parameters["remove_ips"] = remove_chunks[i]
+            if conn.request(call, parameters) is False:
+                raise ValueError(f"Editing asset group {self.id} failed with {parameters}")
+            # Keep scanips consistent with what the server has accepted so far.
+            if "add_ips" in parameters:
+                added = list(iter_ip_ranges(parameters["add_ips"]))
+                current = collapse_ranges(current + added)
+                self._pending_add = subtract_ranges(self._pending_add, added)
+            if "remove_ips" in parameters:
+                removed = list(iter_ip_ranges(parameters["remove_ips"]))
+                current = subtract_ranges(current, removed)
+                self._pending_remove = subtract_ranges(self._pending_remove, removed)
+            self.scanips = [format_ip_range(*r) for r in current]
+        return calls
 
     def __repr__(self):
         return f"qualys_id: {self.id}, title: {self.title}"
@@ -137,14 +200,14 @@ class Scan:
         self.launch_datetime = datetime.datetime(
             int(date[0]), int(date[1]), int(date[2]), int(time[0]), int(time[1]), int(time[2])
         )
-        self.option_profile = str(option_profile)
+        self.option_profile = intern_value(str(option_profile))
         self.processed = int(processed)
         self.ref = str(ref)
-        self.status = str(status.STATE)
-        self.target = str(target).split(", ")
+        self.status = intern_value(str(status.STATE))
+        self.target = [intern_value(target) for target in str(target).split(", ")]
         self.title = str(title)
-        self.type = str(type)
-        self.user_login = str(user_login)
+        self.type = intern_value(str(type))
+        self.user_login = intern_value(str(user_login))
 
     def __repr__(self):
         return (
@@ -0,0 +1,134 @@
+""" Module providing an in-memory index of asset group IP membership.
+
+The index is built from asset_group_list.php results (see
+QGActions.assetGroupIndex) and answers "which asset groups contain this IP"
+with a binary search over disjoint integer segments instead of a linear scan of
+every group's SCANIPS.
+"""
+import logging
+from bisect import bisect_right
+from collections import Counter
+
+from qualysapi.ip_ranges import collapse_ranges, ip_to_int, iter_ip_ranges
+
+
+# Setup module level logging.
+logger = logging.getLogger(__name__)
+
+
+class AssetGroupIndex:
+    """ Index of asset group IPs stored as sorted, disjoint integer segments.
+
+    Each segment maps an inclusive (start, end) interval to the frozenset of
+    asset group IDs covering it, per IP version, so lookups are O(log n).
+    """
+
+    def __init__(self, groups=None):
+        # Asset groups, LAST_UPDATE values and collapsed ranges keyed by group ID.
+        self.groups = {}
+        self._last_update = {}
+        self._ranges = {}
+        # Per IP version: segment starts, segment ends and member group IDs.
+        self._segments = {}
+        self._dirty = False
+        if groups:
+            self.update(groups)
+
+    def __len__(self):
+        return len(self.groups)
+
+    def update(self, groups, complete=True):
+        """ Merge asset groups into the index, reparsing only groups whose LAST_UPDATE changed.
+
+        When complete is True, groups is the full list from the server and groups
+        missing from it are dropped from the index. Returns the number of groups
+        added, changed or removed.
+        """
+        changed = 0
+        seen = set()
+        for group in groups:
+            seen.add(group.id)
+            if self._last_update.get(group.id) == group.last_update and group.id in self.groups:
+                # Unchanged since last refresh, keep the parsed ranges.
+                self.groups[group.id] = group
+                continue
+            self.groups[group.id] = group
+            self._last_update[group.id] = group.last_update
+            self._ranges[group.id] = collapse_ranges(iter_ip_ranges(group.scanips))
+            changed += 1
+        if complete:
+            for group_id in set(self.groups) - seen:
+                del self.groups[group_id]
+                del self._last_update[group_id]
+                del self._ranges[group_id]
+                changed += 1
+        if changed:
+            self._dirty = True
+        logger.debug("Asset group index refreshed, %d groups changed.", changed)
+        return changed
+
+    def _build(self):
+        """ Rebuild the disjoint segment tables from the per group ranges.
+
+        """
+        events = {}
+        for group_id, ranges in self._ranges.items():
+            for version, start, end in ranges:
+                events.setdefault(version, []).append((start, 1, group_id))
+                events.setdefault(version, []).append((end + 1, -1, group_id))
+        self._segments = {}
+        for version, version_events in events.items():
+            version_events.sort()
+            starts, ends, members = [], [], []
+            active = Counter()
+            position = None
+            for point, delta, group_id in version_events:
+                if position is not None and point > position and active:
+                    covering = frozenset(active)
+                    if members and members[-1] == covering and ends[-1] == position - 1:
+                        # Extend previous segment covered by the same groups.
+                        ends[-1] = point - 1
+                    else:
+                        starts.append(position)
+                        ends.append(point - 1)
+                        members.append(covering)
+                position = point
+                active[group_id] += delta
+                if not active[group_id]:
+                    del active[group_id]
+            self._segments[version] = (starts, ends, members)
+        self._dirty = False
+
+    def group_ids_for(self, ip):
+        """ Return frozenset of asset group IDs containing ip.
+
+        """
+        if self._dirty:
+            self._build()
+        version, value = ip_to_int(ip)
+        try:
+            starts, ends, members = self._segments[version]
+        except KeyError:
+            return frozenset()
+        position = bisect_right(starts, value) - 1
+        if position >= 0 and value <= ends[position]:
+            return members[position]
+        return frozenset()
+
+    def groups_for(self, ip):
+        """ Return list of AssetGroup objects containing ip.
+
+        """
+        return [self.groups[group_id] for group_id in sorted(self.group_ids_for(ip))]
+
+    def contains(self, group_id, ip):
+        """ Return True if asset group group_id contains ip.
+
+        """
+        return group_id in self.group_ids_for(ip)
+
+    def lookup(self, ips):
+        """ Return dict mapping each IP in ips to the frozenset of group IDs containing it.
+
+        """
+        return {ip: self.group_ids_for(ip) for ip in ips}
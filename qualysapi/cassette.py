@@ -0,0 +1,158 @@
+""" Record and replay QualysGuard API traffic for offline, repeatable runs.
+
+In record mode, a Cassette captures every response sent through a connector
+(status, headers such as the rate and concurrency limit headers, and body)
+into a deflate-compressed zip archive. In replay mode, it serves the recorded
+responses without touching the network, optionally with injected latency, so
+parsing and pagination can be profiled deterministically.
+
+Requests are matched by a hash of method, url and payload. Credentials never
+reach the archive: username/password fields are dropped from payloads before
+hashing and Set-Cookie headers (which carry the QualysSession) are not stored;
+only the names of cookies set are kept and replayed with placeholder values.
+"""
+import hashlib
+import io
+import json
+import logging
+import threading
+import time
+import zipfile
+from collections import defaultdict
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+
+# Setup module level logging.
+logger = logging.getLogger(__name__)
+
+# Payload fields and response headers that are never recorded.
+REDACTED_FIELDS = ("username", "password")
+REDACTED_HEADERS = ("set-cookie", "authorization", "cookie")
+
+
+class CassetteMiss(KeyError):
+    """ No recorded response matches a request replayed from a Cassette. """
+
+
+def cassette_key(http_method, url, data):
+    """ Return hex digest identifying a request by method, url and redacted payload.
+
+    """
+    if isinstance(data, dict):
+        data = sorted(
+            (str(k), [str(v) for v in value] if isinstance(value, (list, tuple)) else str(value))
+            for k, value in data.items()
+            if k not in REDACTED_FIELDS
+        )
+    elif isinstance(data, bytes):
+        data = data.decode("utf-8", errors="replace")
+    canonical = json.dumps([(http_method or "post").lower(), url, data], default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class Cassette:
+    """ Archive of recorded API responses at path, opened for "record" or "replay".
+
+    In replay mode, every response is delayed by latency seconds plus latency_scale
+    times the originally recorded response time. Responses recorded several times for
+    the same request are replayed in order, the last one repeating.
+    """
+
+    def __init__(self, path, mode="replay", latency=0.0, latency_scale=0.0):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown cassette mode {mode}")
+        self.path = path
+        self.mode = mode
+        self.latency = latency
+        self.latency_scale = latency_scale
+        self._lock = threading.Lock()
+        self._entries = defaultdict(list)
+        self._served = defaultdict(int)
+        self._count = 0
+        self._archive = zipfile.ZipFile(
+            path, "w" if mode == "record" else "r", compression=zipfile.ZIP_DEFLATED
+        )
+        if mode == "replay":
+            for entry in json.loads(self._archive.read("index.json")):
+                self._entries[entry["key"]].append(entry)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """ Finish the archive (writing its index in record mode). """
+        with self._lock:
+            if self._archive is None:
+                return
+            if self.mode == "record":
+                entries = [entry for entries in self._entries.values() for entry in entries]
+                entries.sort(key=lambda entry: entry["body"])
+                self._archive.writestr("index.json", json.dumps(entries))
+            self._archive.close()
+            self._archive = None
+
+    def send(self, session, http_method, url, data, **kwargs):
+        """ Return response to a GET or POST, recorded from session or replayed.
+
+        """
+        key = cassette_key(http_method, url, data)
+        if self.mode == "replay":
+            return self._replay(session, key, http_method, url)
+        started = time.monotonic()
+        if http_method == "get":
+            response = session.get(url, params=data, **kwargs)
+        else:
+            response = session.post(url, data=data, **kwargs)
+        with response:
+            body = response.content
+        entry = {
+            "key": key,
+            "method": http_method,
+            "url": url,
+            "status": response.status_code,
+            "headers": {
+                name: value
+                for name, value in response.headers.items()
+                if name.lower() not in REDACTED_HEADERS
+            },
+            "cookies": sorted(response.cookies.keys()),
+            "elapsed": time.monotonic() - started,
+        }
+        with self._lock:
+            self._count += 1
+            entry["body"] = f"bodies/{self._count:06d}"
+            self._archive.writestr(entry["body"], body)
+            self._entries[key].append(entry)
+        return self._response(entry, body, url)
+
+    def _replay(self, session, key, http_method, url):
+        with self._lock:
+            entries = self._entries.get(key)
+            if not entries:
+                raise CassetteMiss(f"No recorded response for {http_method} {url}")
+            entry = entries[min(self._served[key], len(entries) - 1)]
+            self._served[key] += 1
+            body = self._archive.read(entry["body"])
+        for name in entry["cookies"]:
+            session.cookies.set(name, "redacted")
+        delay = self.latency + self.latency_scale * entry["elapsed"]
+        if delay > 0:
+            time.sleep(delay)
+        return self._response(entry, body, url)
+
+    def _response(self, entry, body, url):
+        # Build an unconsumed requests Response, readable as text, in chunks or from raw.
+        response = requests.Response()
+        response.status_code = entry["status"]
+        response.headers = CaseInsensitiveDict(entry["headers"])
+        # The recorded body is already decoded.
+        response.headers.pop("content-encoding", None)
+        response.raw = io.BytesIO(body)
+        response.url = url
+        response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+        return response
@@ -0,0 +1,109 @@
+""" Durable checkpoints for long-running paginated pulls.
+
+A Checkpoint remembers, in a small JSON state file, which call and parameters
+a pull was made with, the cursor of the next page (v2 id_min or Portal lastId)
+and, when an output file is attached, how many bytes of output belong to the
+pages completed so far. A restarted pull with the same call and parameters
+continues from the saved cursor, and the output file is truncated back to the
+saved offset so records of a half-finished page are not written twice.
+"""
+import json
+import logging
+import os
+
+
+# Setup module level logging.
+logger = logging.getLogger(__name__)
+
+
+class Checkpoint:
+    """ Page cursor and output offset of a paginated pull, persisted to path.
+
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.output = None
+        self.state = {}
+        self.resumed = False
+
+    def open_output(self, path):
+        """ Open (without truncating) and attach the binary output file of the pull.
+
+        The file is rewound to the last checkpointed offset when the pull begins.
+        """
+        self.output = open(path, "r+b" if os.path.exists(path) else "w+b")
+        return self.output
+
+    def close(self):
+        if self.output is not None:
+            self.output.close()
+            self.output = None
+
+    def _read(self):
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except ValueError:
+            logger.warning("Ignoring unreadable checkpoint %s", self.path)
+            return None
+
+    def _write(self):
+        # Write to a temporary file first so a crash never leaves a truncated state file.
+        temporary = f"{self.path}.tmp"
+        with open(temporary, "w") as f:
+            json.dump(self.state, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary, self.path)
+
+    def begin(self, call, parameters):
+        """ Return the saved cursor to resume call with parameters from, or None.
+
+        A checkpoint of a different call, different parameters or a finished pull is
+        discarded and the pull starts from the first page.
+        """
+        key = {"call": call, "parameters": json.loads(json.dumps(parameters, default=str))}
+        state = self._read()
+        self.resumed = bool(state and state.get("key") == key and not state.get("done"))
+        if self.resumed:
+            self.state = state
+            logger.info(
+                "Resuming %s from cursor %s after %d pages.", call, state["cursor"], state["pages"]
+            )
+        else:
+            self.state = {"key": key, "cursor": None, "offset": 0, "pages": 0, "done": False}
+        if self.output is not None:
+            self.output.seek(self.state["offset"])
+            self.output.truncate()
+        self._write()
+        return self.state["cursor"]
+
+    def advance(self, cursor):
+        """ Record that every page before cursor has been completely processed.
+
+        """
+        self.state["cursor"] = cursor
+        self.state["pages"] += 1
+        if self.output is not None:
+            self.output.flush()
+            os.fsync(self.output.fileno())
+            self.state["offset"] = self.output.tell()
+        self._write()
+
+    def finish(self):
+        """ Record that the pull completed. """
+        self.advance(None)
+        self.state["done"] = True
+        self._write()
+
+    def get(self, name, default=None):
+        """ Return a value saved alongside the cursor with set(). """
+        return self.state.get("extra", {}).get(name, default)
+
+    def set(self, name, value):
+        """ Save a JSON serializable value alongside the cursor. """
+        self.state.setdefault("extra", {})[name] = value
+        self._write()
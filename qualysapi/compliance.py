@@ -0,0 +1,157 @@
+""" Streaming parsers and a deduplicated metadata index for Policy Compliance data.
+
+Posture info responses repeat control and technology definitions for every
+page. iter_posture_info turns each INFO element into a compact PostureInfo
+record that only references controls, technologies and hosts by ID, and files
+the GLOSSARY definitions into a ComplianceIndex once.
+"""
+import logging
+import threading
+from collections import namedtuple
+from urllib import parse as urlparse
+
+from lxml import etree
+
+from qualysapi.interning import intern_value
+from qualysapi.streaming import findtext
+
+
+# Setup module level logging.
+logger = logging.getLogger(__name__)
+
+PostureInfo = namedtuple(
+    "PostureInfo",
+    [
+        "id",
+        "policy_id",
+        "host_id",
+        "control_id",
+        "technology_id",
+        "instance",
+        "status",
+        "modified",
+    ],
+)
+
+Control = namedtuple("Control", ["id", "statement", "criticality"])
+
+
+class ComplianceIndex:
+    """ Deduplicated control, technology and policy metadata keyed by ID.
+
+    Safe to share between threads pulling different policies.
+    """
+
+    def __init__(self):
+        self.controls = {}
+        self.technologies = {}
+        self.policies = {}
+        self._lock = threading.Lock()
+
+    def add_control(self, element):
+        control_id = findtext(element, "ID", int)
+        if control_id is None or control_id in self.controls:
+            return control_id
+        control = Control(
+            control_id,
+            findtext(element, "STATEMENT"),
+            findtext(element, "CRITICALITY/LABEL", intern_value),
+        )
+        with self._lock:
+            self.controls.setdefault(control_id, control)
+        return control_id
+
+    def add_technology(self, element):
+        technology_id = findtext(element, "ID", int)
+        if technology_id is None or technology_id in self.technologies:
+            return technology_id
+        with self._lock:
+            self.technologies.setdefault(technology_id, findtext(element, "NAME", intern_value))
+        return technology_id
+
+    def add_policy(self, element):
+        policy_id = findtext(element, "ID", int)
+        if policy_id is None:
+            return None
+        with self._lock:
+            self.policies[policy_id] = findtext(element, "TITLE")
+        return policy_id
+
+
+def _walk(source, handlers):
+    # Yield handler(element) results for (tag, parent tag) pairs in handlers, clearing handled
+    # elements. Returns the id_min of the next page from the WARNING URL, or None.
+    next_id_min = None
+    tags = tuple({tag for tag, _ in handlers} | {"URL"})
+    for _, element in etree.iterparse(source, events=("end",), tag=tags, huge_tree=True):
+        parent = element.getparent()
+        key = (element.tag, parent.tag if parent is not None else None)
+        if key == ("URL", "WARNING"):
+            query = dict(urlparse.parse_qsl(urlparse.urlparse(element.text or "").query))
+            next_id_min = query.get("id_min")
+            continue
+        handler = handlers.get(key)
+        if handler is None:
+            # Nested element of a record still being parsed; keep it.
+            continue
+        result = handler(element)
+        if result is not None:
+            yield result
+        element.clear()
+        while element.getprevious() is not None:
+            del parent[0]
+    return next_id_min
+
+
+def iter_posture_info(source, policy_id, index):
+    """ Yield PostureInfo records from a posture/info/ XML page, filling index.
+
+    The generator returns the id_min of the next page, or None on the last page.
+    """
+
+    def info(element):
+        return PostureInfo(
+            findtext(element, "ID", int),
+            policy_id,
+            findtext(element, "HOST_ID", int),
+            findtext(element, "CONTROL_ID", int),
+            findtext(element, "TECHNOLOGY_ID", int),
+            findtext(element, "INSTANCE", intern_value),
+            findtext(element, "STATUS", intern_value),
+            findtext(element, "POSTURE_MODIFIED_DATE"),
+        )
+
+    def glossary(add):
+        # File GLOSSARY definitions in the index without yielding them.
+        def handler(element):
+            add(element)
+
+        return handler
+
+    return (
+        yield from _walk(
+            source,
+            {
+                ("INFO", "INFO_LIST"): info,
+                ("CONTROL", "CONTROL_LIST"): glossary(index.add_control),
+                ("TECHNOLOGY", "TECHNOLOGY_LIST"): glossary(index.add_technology),
+                ("POLICY", "POLICY_LIST"): glossary(index.add_policy),
+            },
+        )
+    )
+
+
+def iter_policies(source, index):
+    """ Fill index from a compliance/policy/ list XML page and yield the policy IDs.
+
+    The generator returns the id_min of the next page, or None on the last page.
+    """
+    return (yield from _walk(source, {("POLICY", "POLICY_LIST"): index.add_policy}))
+
+
+def iter_controls(source, index):
+    """ Fill index from a compliance/control/ list XML page and yield the control IDs.
+
+    The generator returns the id_min of the next page, or None on the last page.
+    """
+    return (yield from _walk(source, {("CONTROL", "CONTROL_LIST"): index.add_control}))
@@ -24,6 +24,37 @@ __copyright__ = "Copyright 2011-2013, Parag Baxi & University of Waterloo"
 __license__ = "BSD-new"
 
 
+def find_config_file(filename=qcs.default_filename):
+    """ Return real path of filename in the working directory or else the home directory, or None.
+
+    """
+    if os.path.exists(filename):
+        return os.path.realpath(filename)
+    home_filename = os.path.join(os.path.expanduser("~"), filename)
+    if os.path.exists(home_filename):
+        return os.path.realpath(home_filename)
+    return None
+
+
+def read_config(filename=qcs.default_filename):
+    """ Return (config file path or None, RawConfigParser) for filename, parsed once.
+
+    The parser can be shared by several QualysConnectConfig objects, one per section.
+    """
+    cfgfile = find_config_file(filename)
+    # create RawConfigParser to combine defaults and input from config file.
+    cfgparse = RawConfigParser(qcs.defaults)
+    if cfgfile:
+        mode = stat.S_IMODE(os.stat(cfgfile)[stat.ST_MODE])
+
+        # apply bitmask to current mode to check ONLY user access permissions.
+        if (mode & (stat.S_IRWXG | stat.S_IRWXO)) != 0:
+            logger.warning("%s permissions allows more than user access.", filename)
+
+        cfgparse.read(cfgfile)
+    return cfgfile, cfgparse
+
+
 class QualysConnectConfig:
     """ Class to create a RawConfigParser and read user/password details
     from an ini file.
@@ -38,31 +69,16 @@ class QualysConnectConfig:
         username=None,
         password=None,
         hostname=None,
+        parser=None,
     ):
 
-        self._cfgfile = None
         self._section = section
-        # Prioritize local directory filename.
-        # Check for file existence.
-        if os.path.exists(filename):
-            self._cfgfile = filename
-        elif os.path.exists(os.path.join(os.path.expanduser("~"), filename)):
-            # Set home path for file.
-            self._cfgfile = os.path.join(os.path.expanduser("~"), filename)
-
-        # create RawConfigParser to combine defaults and input from config file.
-        self._cfgparse = RawConfigParser(qcs.defaults)
-
-        if self._cfgfile:
-            self._cfgfile = os.path.realpath(self._cfgfile)
-
-            mode = stat.S_IMODE(os.stat(self._cfgfile)[stat.ST_MODE])
-
-            # apply bitmask to current mode to check ONLY user access permissions.
-            if (mode & (stat.S_IRWXG | stat.S_IRWXO)) != 0:
-                logger.warning("%s permissions allows more than user access.", filename)
-
-            self._cfgparse.read(self._cfgfile)
+        # Reuse an already parsed config (see read_config), if given.
+        if parser is not None:
+            self._cfgfile = find_config_file(filename)
+            self._cfgparse = parser
+        else:
+            self._cfgfile, self._cfgparse = read_config(filename)
 
         # if 'info'/ specified section doesn't exist, create the section.
         if not self._cfgparse.has_section(self._section):
@@ -107,6 +123,41 @@ class QualysConnectConfig:
             self._cfgparse.set(self._section, "template_id", str(self.report_template_id))
         self.report_template_id = int(self.report_template_id)
 
+        # Timeouts in seconds: connect_timeout and read_timeout apply to every API family,
+        # read_timeout_v1, read_timeout_v2, read_timeout_am & read_timeout_was override per family.
+        self.timeouts = None
+        timeout_options = {}
+        for option in ("connect_timeout", "read_timeout") + tuple(
+            f"read_timeout_{family}" for family in ("v1", "v2", "am", "was")
+        ):
+            if self._cfgparse.has_option(self._section, option):
+                try:
+                    timeout_options[option] = float(self._cfgparse.get(self._section, option))
+                except ValueError:
+                    logger.error("Value %s must be a number.", option)
+                    print(f"Value {option} must be a number.")
+                    exit(1)
+        if timeout_options:
+            self.timeouts = {}
+            for family, read in qcs.read_timeouts.items():
+                name = {1: "v1", 2: "v2", "am2": "am"}.get(family, family)
+                self.timeouts[family] = (
+                    timeout_options.get("connect_timeout", qcs.connect_timeout),
+                    timeout_options.get(
+                        f"read_timeout_{name}", timeout_options.get("read_timeout", read)
+                    ),
+                )
+
+        # Log in once per connector and reuse the API v2 session instead of Basic auth.
+        self.use_session = False
+        if self._cfgparse.has_option(self._section, "use_session"):
+            try:
+                self.use_session = self._cfgparse.getboolean(self._section, "use_session")
+            except ValueError:
+                logger.error("Value use_session must be a boolean.")
+                print("Value use_session must be a boolean.")
+                exit(1)
+
         # Proxy support
         proxy_config = (
             proxy_url
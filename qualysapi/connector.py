@@ -5,7 +5,11 @@ __license__ = "Apache License 2.0"
 """ Module that contains classes for setting up connections to QualysGuard API
 and requesting data from it.
 """
+import io
 import logging
+import mmap
+import tempfile
+import threading
 import time
 from collections import defaultdict
 
@@ -13,7 +17,11 @@ import requests
 
 import qualysapi.api_actions as api_actions
 import qualysapi.api_methods
+import qualysapi.settings as qcs
 import qualysapi.version
+from qualysapi.memory_budget import MemoryBudget
+from qualysapi.paging import AdaptivePager
+from qualysapi.singleflight import SingleFlight, request_key
 
 
 try:
@@ -34,18 +42,86 @@ except ImportError as e:
     )
 
 
+def build_timeouts(timeouts=None):
+    """ Return dict of API family -> (connect, read) timeouts in seconds.
+
+    timeouts may be None (use settings defaults), a read timeout or (connect, read) tuple
+    applied to every family, or a dict of API family -> read timeout or (connect, read).
+    """
+    result = {family: (qcs.connect_timeout, read) for family, read in qcs.read_timeouts.items()}
+    if timeouts is None:
+        return result
+    if not isinstance(timeouts, dict):
+        timeouts = dict.fromkeys(result, timeouts)
+    for family, value in timeouts.items():
+        if isinstance(value, (tuple, list)):
+            result[family] = (float(value[0]), float(value[1]))
+        else:
+            result[family] = (result.get(family, (qcs.connect_timeout, None))[0], float(value))
+    return result
+
+
 class QGConnector(api_actions.QGActions):
     """ Qualys Connection class which allows requests to the QualysGuard API using HTTP-Basic Authentication (over SSL).
 
     """
 
-    def __init__(self, auth, server="qualysapi.qualys.com", proxies=None, max_retries=3):
+    def __init__(
+        self,
+        auth,
+        server="qualysapi.qualys.com",
+        proxies=None,
+        max_retries=3,
+        host_store=None,
+        host_store_max_age=qcs.host_store_max_age,
+        singleflight=False,
+        spool_threshold=qcs.spool_threshold,
+        timeouts=None,
+        use_session=False,
+        adaptive_paging=False,
+        cassette=None,
+        profiler=None,
+        memory_budget=None,
+    ):
         # Read username & password from file, if possible.
         self.auth = auth
+        # Log in once via api/2.0/fo/session/ and send API v2 calls with the QualysSession
+        # cookie instead of HTTP Basic credentials.
+        self.use_session = use_session
+        self._session_lock = threading.Lock()
+        # Incremented on every login, so threads holding an expired session re-login once.
+        self._session_generation = 0
+        self._logged_in = False
+        # Optional HostStore kept populated by bulk pulls and used by getHost.
+        self.host_store = host_store
+        self.host_store_max_age = host_store_max_age
+        # Share identical concurrent read-only calls, if requested.
+        self.singleflight = SingleFlight() if singleflight else None
+        # Size above which request_spooled() moves a response from memory to disk.
+        self.spool_threshold = spool_threshold
+        # (connect, read) timeouts in seconds per API family.
+        self.timeouts = build_timeouts(timeouts)
+        # Tune truncation_limit / limitResults of paged pulls per call, if requested.
+        self.adaptive_paging = adaptive_paging
+        self.pagers = {}
+        self._pagers_lock = threading.Lock()
+        # Record responses to, or replay them from, a qualysapi.cassette.Cassette.
+        self.cassette = cassette
+        # Time the phases of every action, see qualysapi.profiling.Profiler.
+        self.profiler = None
+        if profiler is not None:
+            profiler.instrument(self)
+        # MemoryBudget (or its size in bytes) bounding the response bytes buffered in memory
+        # by concurrent calls; share one MemoryBudget between connectors for a global budget.
+        if memory_budget is not None and not isinstance(memory_budget, MemoryBudget):
+            memory_budget = MemoryBudget(memory_budget)
+        self.memory_budget = memory_budget
         # Remember QualysGuard API server.
         self.server = server
         # Remember rate limits per call.
         self.rate_limit_remaining = defaultdict(int)
+        # Remember subscription concurrency limit, once reported by the API.
+        self.concurrency_limit = None
         # api_methods: Define method algorithm in a dict of set.
         # Naming convention: api_methods[api_version optional_blah] due to api_methods_with_trailing_slash testing.
         self.api_methods = qualysapi.api_methods.api_methods
@@ -67,6 +143,84 @@ class QGConnector(api_actions.QGActions):
     def __call__(self):
         return self
 
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """ Log out of the API session, if any, and release pooled connections.
+
+        """
+        self.logout()
+        self.session.close()
+
+    def _session_call(self, action, data=None):
+        # POST action to api/2.0/fo/session/ without session handling or Basic credentials.
+        requested_with = f"Parag Baxi QualysAPI (python) v{qualysapi.version.__version__}"
+        response = self._http(
+            "post",
+            f"https://{self.server}/api/2.0/fo/session/",
+            dict(data or {}, action=action),
+            headers={"X-Requested-With": requested_with},
+            proxies=self.proxies,
+            timeout=self.timeouts[2],
+        )
+        response.raise_for_status()
+        return response
+
+    def login(self):
+        """ Log in via api/2.0/fo/session/, storing the QualysSession cookie in the pool.
+
+        """
+        with self._session_lock:
+            self._login()
+
+    def _login(self):
+        # Caller holds _session_lock.
+        logger.debug("Logging in to QualysGuard API session.")
+        username, password = self.auth
+        self._session_call("login", {"username": username, "password": password})
+        if "QualysSession" not in self.session.cookies:
+            raise requests.exceptions.HTTPError("QualysGuard API session login failed.")
+        self._logged_in = True
+        self._session_generation += 1
+
+    def logout(self):
+        """ Log out of the API session, if logged in.
+
+        """
+        with self._session_lock:
+            if not self._logged_in:
+                return
+            self._logged_in = False
+            try:
+                self._session_call("logout")
+            except requests.exceptions.RequestException as e:
+                # The session will expire on its own.
+                logger.warning("QualysGuard API session logout failed: %s", e)
+            self.session.cookies.clear()
+
+    def _ensure_session(self, expired=None):
+        # Return generation of a live session, logging in if there is none yet or if the
+        # session of generation 'expired' is still the current one.
+        with self._session_lock:
+            if not self._logged_in or self._session_generation == expired:
+                self._login()
+            return self._session_generation
+
+    def uses_session(self, url):
+        """ Return True if a built request url is sent with the session cookie.
+
+        Only API v2 accepts the QualysSession cookie; other APIs keep Basic authentication.
+        """
+        return (
+            self.use_session
+            and self.url_family(url) == 2
+            and not url.endswith("api/2.0/fo/session/")
+        )
+
     def format_api_version(self, api_version):
         """ Return QualysGuard API version for api_version specified.
 
@@ -280,39 +434,220 @@ class QGConnector(api_actions.QGActions):
 
         return url, data, headers
 
-    def request_streaming(
-        self, api_call, data=None, api_version=None, http_method=None, verify=True
+    def pager(self, call, size=None, portal=False):
+        """ Return the AdaptivePager of a paged call, or None without adaptive paging.
+
+        Pagers are kept per call, so later pulls start from the size learned earlier.
+        size is the initial page size of a new pager.
+        """
+        if not self.adaptive_paging:
+            return None
+        with self._pagers_lock:
+            pager = self.pagers.get(call)
+            if pager is None:
+                if portal:
+                    pager = AdaptivePager(
+                        size or qcs.portal_page_size_max,
+                        qcs.portal_page_size_min,
+                        qcs.portal_page_size_max,
+                    )
+                else:
+                    pager = AdaptivePager(size or qcs.page_size)
+                self.pagers[call] = pager
+            return pager
+
+    def paging_metrics(self):
+        """ Return dict of call -> page size and statistics of its adaptive pager.
+
+        """
+        with self._pagers_lock:
+            pagers = dict(self.pagers)
+        return {call: pager.metrics() for call, pager in pagers.items()}
+
+    def remember_concurrency_limit(self, headers):
+        """ Remember subscription concurrency limit from response headers, if present.
+
+        """
+        try:
+            self.concurrency_limit = int(headers["x-concurrency-limit-limit"])
+        except (KeyError, TypeError, ValueError):
+            pass
+
+    def url_family(self, url):
+        """ Return API family (1, 2, "am", "am2" or "was") of a built request url.
+
+        """
+        if "/msp/" in url:
+            return 1
+        if "/qps/rest/3.0/" in url:
+            return "was"
+        if "/qps/rest/2.0/" in url:
+            return "am2"
+        if "/qps/rest/1.0/" in url:
+            return "am"
+        return 2
+
+    def deadline_at(self, deadline):
+        """ Return monotonic expiry time for a deadline budget in seconds, or None.
+
+        """
+        if deadline is None:
+            return None
+        return time.monotonic() + deadline
+
+    def remaining(self, deadline):
+        """ Return seconds left before deadline (None if unbounded), raising Timeout once past it.
+
+        """
+        if deadline is None:
+            return None
+        left = deadline - time.monotonic()
+        if left <= 0:
+            raise requests.exceptions.Timeout("QualysGuard API call deadline exceeded.")
+        return left
+
+    def _sleep(self, seconds, deadline):
+        # Wait before a retry, unless the wait would overrun the deadline.
+        left = self.remaining(deadline)
+        if left is not None and seconds >= left:
+            raise requests.exceptions.Timeout(
+                f"QualysGuard API call deadline exceeded, cannot wait {seconds} seconds to retry."
+            )
+        time.sleep(seconds)
+
+    def _send(
+        self,
+        http_method,
+        url,
+        data,
+        headers,
+        verify=True,
+        stream=False,
+        deadline=None,
+        reservation=None,
     ):
-        """ Return QualysGuard streaming response """
+        """ Make one GET or POST request, bounded by the url's API family timeouts and deadline.
 
-        url, data, headers = self.build_request(api_call, data, api_version, http_method)
-        # Make request.
-        if http_method == "get":
-            # GET
-            logger.debug("GET request.")
-            request = self.session.get(
-                url,
-                params=data,
-                auth=self.auth,
-                headers=headers,
-                proxies=self.proxies,
-                stream=True,
-                verify=verify,
+        A non-streamed body is downloaded in chunks when there is a deadline or a memory
+        budget Reservation, so that the deadline also bounds the body transfer. With a
+        Reservation, the body is only downloaded once it is admitted against the budget, and
+        every chunk received beyond the admitted size waits for room in the budget before
+        it is buffered.
+        """
+        if stream or (reservation is None and deadline is None):
+            return self._send_authenticated(
+                http_method, url, data, headers, verify, stream, deadline
             )
-        else:
+        response = self._send_authenticated(
+            http_method, url, data, headers, verify, True, deadline
+        )
+        with response:
+            length = response.headers.get("content-length", "")
+            if reservation is not None and length.isdigit():
+                self._reserve(reservation, int(length), deadline)
+            body = io.BytesIO()
+            for chunk in response.iter_content(chunk_size=qcs.stream_chunk_size):
+                self.remaining(deadline)
+                if reservation is not None and body.tell() + len(chunk) > reservation.size:
+                    # More than announced (or no Content-Length): wait for room first.
+                    self._reserve(reservation, body.tell() + len(chunk), deadline)
+                body.write(chunk)
+            response._content = body.getvalue()
+            response._content_consumed = True
+        return response
+
+    def _reserve(self, reservation, nbytes, deadline):
+        # Grow reservation to nbytes, waiting for memory budget until the deadline.
+        if not reservation.resize(nbytes, timeout=self.remaining(deadline)):
+            raise requests.exceptions.Timeout(
+                "QualysGuard API call deadline exceeded waiting for memory budget."
+            )
+
+    def _send_authenticated(self, http_method, url, data, headers, verify, stream, deadline):
+        # Send with Basic credentials or the API session cookie, logging in again on expiry.
+        if not self.uses_session(url):
+            return self._send_once(
+                http_method, url, data, headers, self.auth, verify, stream, deadline
+            )
+        generation = self._ensure_session()
+        response = self._send_once(
+            http_method, url, data, headers, None, verify, stream, deadline
+        )
+        if response.status_code == 401:
+            # Session expired, log in again (once across all threads) and retry.
+            logger.info("QualysGuard API session expired, logging in again.")
+            response.close()
+            self._ensure_session(expired=generation)
+            response = self._send_once(
+                http_method, url, data, headers, None, verify, stream, deadline
+            )
+        return response
+
+    def _send_once(self, http_method, url, data, headers, auth, verify, stream, deadline):
+        connect_timeout, read_timeout = self.timeouts[self.url_family(url)]
+        left = self.remaining(deadline)
+        if left is not None:
+            connect_timeout = min(connect_timeout, left)
+            read_timeout = min(read_timeout, left)
+        return self._http(
+            http_method,
+            url,
+            data,
+            auth=auth,
+            headers=headers,
+            proxies=self.proxies,
+            stream=stream,
+            verify=verify,
+            timeout=(connect_timeout, read_timeout),
+        )
+
+    def _http(self, http_method, url, data, **kwargs):
+        # Make a GET or POST through the pooled session, or through the cassette if any.
+        with self._phase("request"):
+            if self.cassette is not None:
+                return self.cassette.send(self.session, http_method, url, data, **kwargs)
+            if http_method == "get":
+                # GET
+                logger.debug("GET request.")
+                return self.session.get(url, params=data, **kwargs)
             # POST
             logger.debug("POST request.")
-            # Make POST request.
-            request = self.session.post(
-                url,
-                data=data,
-                auth=self.auth,
-                headers=headers,
-                proxies=self.proxies,
-                stream=True,
-                verify=verify,
-            )
+            return self.session.post(url, data=data, **kwargs)
+
+    def is_read_only(self, url, data):
+        """ Return True if a built request only reads data and may be shared or cached.
+
+        """
+        if "/qps/rest/" in url:
+            # Portal API: the operation is the first path segment after the version.
+            operation = url.split("/qps/rest/", 1)[1].split("/")[1]
+            return operation in ("search", "get", "count", "download", "status")
+        if "/msp/" in url:
+            # API v1.
+            return url.endswith("_list.php") or url.endswith("about.php")
+        if isinstance(data, dict):
+            action = data.get("action")
+            if isinstance(action, list):
+                action = action[0] if action else None
+            return action in ("list", "fetch")
+        return False
+
+    def request_streaming(
+        self, api_call, data=None, api_version=None, http_method=None, verify=True, deadline=None
+    ):
+        """ Return QualysGuard streaming response
+
+        deadline is an optional budget in seconds for establishing the connection and
+        receiving the headers.
+        """
+        deadline = self.deadline_at(deadline)
+        url, data, headers = self.build_request(api_call, data, api_version, http_method)
+        # Make request.
+        request = self._send(
+            http_method, url, data, headers, verify, stream=True, deadline=deadline
+        )
         logger.debug("response headers =\n%s", str(request.headers))
+        self.remember_concurrency_limit(request.headers)
         #
         # Remember how many times left user can make against api_call.
         try:
@@ -337,6 +672,77 @@ class QGConnector(api_actions.QGActions):
 
         return request
 
+    def request_spooled(
+        self,
+        api_call,
+        data=None,
+        api_version=None,
+        http_method=None,
+        verify=True,
+        spool_threshold=None,
+        use_mmap=False,
+        deadline=None,
+    ):
+        """ Return QualysGuard API response body as a readable binary file object.
+
+        The body is downloaded in chunks into memory and moved to a temporary file once
+        it exceeds spool_threshold bytes (defaults to the connector's spool_threshold), so
+        memory use stays bounded. The object is positioned at the start and can be passed
+        straight to lxml.etree.iterparse or lxml.objectify.parse. With use_mmap, a spooled
+        body is returned as a read-only mmap instead of a file. deadline is an optional
+        budget in seconds for the whole download. With a memory budget, a response is also
+        spooled to disk as soon as keeping it in memory would exceed the budget.
+        """
+        if spool_threshold is None:
+            spool_threshold = self.spool_threshold
+        deadline = self.deadline_at(deadline)
+        response = self.request_streaming(
+            api_call, data, api_version, http_method, verify, self.remaining(deadline)
+        )
+        reservation = self.memory_budget.reserve() if self.memory_budget is not None else None
+        # The reservation covers the download; the returned buffer belongs to the caller.
+        with response, reservation or api_actions.null_context():
+            response.raise_for_status()
+            buffer = io.BytesIO()
+            length = response.headers.get("content-length", "")
+            if length.isdigit() and (
+                int(length) > spool_threshold
+                or (reservation is not None and not reservation.resize(int(length), block=False))
+            ):
+                # Too large for memory, straight to disk.
+                logger.debug("Spooling response of %s to disk.", api_call)
+                buffer = tempfile.TemporaryFile()
+            try:
+                for chunk in response.iter_content(chunk_size=qcs.stream_chunk_size):
+                    # Closing the response on the way out frees the connection.
+                    self.remaining(deadline)
+                    buffer.write(chunk)
+                    if not isinstance(buffer, io.BytesIO):
+                        continue
+                    if buffer.tell() <= spool_threshold and (
+                        reservation is None
+                        or buffer.tell() <= reservation.size
+                        or reservation.resize(buffer.tell(), block=False)
+                    ):
+                        continue
+                    # Response outgrew memory threshold or budget, move it to disk.
+                    logger.debug("Spooling response of %s to disk.", api_call)
+                    spooled = tempfile.TemporaryFile()
+                    spooled.write(buffer.getbuffer())
+                    buffer = spooled
+                    if reservation is not None:
+                        reservation.release()
+            except BaseException:
+                # Do not leave a partial body (possibly a temporary file) open.
+                buffer.close()
+                raise
+        buffer.seek(0)
+        if use_mmap and not isinstance(buffer, io.BytesIO):
+            mapped = mmap.mmap(buffer.fileno(), 0, access=mmap.ACCESS_READ)
+            buffer.close()
+            return mapped
+        return buffer
+
     def request(
         self,
         api_call,
@@ -346,9 +752,14 @@ class QGConnector(api_actions.QGActions):
         concurrent_scans_retries=0,
         concurrent_scans_retry_delay=0,
         verify=True,
+        deadline=None,
     ):
         """ Return QualysGuard API response.
 
+        deadline is an optional budget in seconds covering every attempt and body download,
+        and the waits and retries on 1960/1965 limits and concurrent scan limits. Exceeding
+        it raises requests.exceptions.Timeout. With a memory budget, the call waits until its
+        response fits into the budget, which it holds until the response text is returned.
         """
 
         logger.debug("concurrent_scans_retries =\n%s", str(concurrent_scans_retries))
@@ -356,8 +767,61 @@ class QGConnector(api_actions.QGActions):
         concurrent_scans_retries = int(concurrent_scans_retries)
         concurrent_scans_retry_delay = int(concurrent_scans_retry_delay)
 
+        deadline = self.deadline_at(deadline)
         url, data, headers = self.build_request(api_call, data, api_version, http_method)
 
+        reservation = self.memory_budget.reserve() if self.memory_budget is not None else None
+        try:
+            if self.singleflight is not None and self.is_read_only(url, data):
+                # Identical concurrent read-only calls share one request.
+                return self.singleflight.do(
+                    request_key(http_method, url, data),
+                    lambda: self._request(
+                        api_call,
+                        url,
+                        data,
+                        headers,
+                        http_method,
+                        concurrent_scans_retries,
+                        concurrent_scans_retry_delay,
+                        verify,
+                        deadline,
+                        reservation,
+                    ),
+                    self.remaining(deadline),
+                )
+            return self._request(
+                api_call,
+                url,
+                data,
+                headers,
+                http_method,
+                concurrent_scans_retries,
+                concurrent_scans_retry_delay,
+                verify,
+                deadline,
+                reservation,
+            )
+        finally:
+            if reservation is not None:
+                reservation.release()
+
+    def _request(
+        self,
+        api_call,
+        url,
+        data,
+        headers,
+        http_method,
+        concurrent_scans_retries,
+        concurrent_scans_retry_delay,
+        verify,
+        deadline=None,
+        reservation=None,
+    ):
+        """ Make a built request, retrying on rate and concurrency limits, and return its text.
+
+        """
         # Make request at least once (more if concurrent_retry is enabled).
         retries = 0
         #
@@ -368,34 +832,23 @@ class QGConnector(api_actions.QGActions):
             logger.debug("url =\n%s", str(url))
             logger.debug("data =\n%s", str(data))
             logger.debug("headers =\n%s", str(headers))
-            if http_method == "get":
-                # GET
-                logger.debug("GET request.")
-                request = self.session.get(
-                    url,
-                    params=data,
-                    auth=self.auth,
-                    headers=headers,
-                    proxies=self.proxies,
-                    verify=verify,
-                )
-            else:
-                # POST
-                logger.debug("POST request.")
-                # Make POST request.
-                request = self.session.post(
-                    url,
-                    data=data,
-                    auth=self.auth,
-                    headers=headers,
-                    proxies=self.proxies,
-                    verify=verify,
-                )
+            request = self._send(
+                http_method,
+                url,
+                data,
+                headers,
+                verify,
+                deadline=deadline,
+                reservation=reservation,
+            )
             logger.debug("response headers =\n%s", str(request.headers))
             # Force request encoding value, the automatic detection is very long for large files (report for example)
             # And sometimes with MemoryError
             if request.encoding is None:
                 request.encoding = "utf-8"
+            self.remember_concurrency_limit(request.headers)
+            with self._phase("decode"):
+                response = request.text
             #
             # Remember how many times left user can make against api_call.
             try:
@@ -407,7 +860,6 @@ class QGConnector(api_actions.QGActions):
                     api_call,
                     self.rate_limit_remaining[api_call],
                 )
-                response = request.text
                 if (
                     "<CODE>1960</CODE>" in response
                     and "<TEXT>This API cannot be run again until" in response
@@ -424,32 +876,21 @@ class QGConnector(api_actions.QGActions):
                             "Concurrency Limit Exceeded waiting %d seconds. %d retries remaining"
                             % (time_to_wait, max_retries - retry_count)
                         )
-                        time.sleep(time_to_wait)
+                        self._sleep(time_to_wait, deadline)
 
                         logger.info(str(url), str(data))  # self.auth, headers, self.proxies)
-                        if http_method == "get":
-                            # GET
-                            logger.debug("GET request.")
-                            request = self.session.get(
-                                url,
-                                params=data,
-                                auth=self.auth,
-                                headers=headers,
-                                proxies=self.proxies,
-                            )
-                        else:
-                            # POST
-                            logger.debug("POST request.")
-                            # Make POST request.
-                            request = self.session.post(
-                                url,
-                                data=data,
-                                auth=self.auth,
-                                headers=headers,
-                                proxies=self.proxies,
-                            )
+                        request = self._send(
+                            http_method,
+                            url,
+                            data,
+                            headers,
+                            verify,
+                            deadline=deadline,
+                            reservation=reservation,
+                        )
                         logger.debug("response headers =\n%s" % (str(request.headers)))
-                        response = request.text
+                        with self._phase("decode"):
+                            response = request.text
                         if retry_count >= max_retries:
                             break
                 elif (
@@ -468,32 +909,21 @@ class QGConnector(api_actions.QGActions):
                             "API Limit Exceeded waiting %d seconds. %d retries remaining"
                             % (time_to_wait, max_retries - retry_count)
                         )
-                        time.sleep(time_to_wait)
+                        self._sleep(time_to_wait, deadline)
 
                         logger.info(str(url), str(data))  # self.auth, headers, self.proxies)
-                        if http_method == "get":
-                            # GET
-                            logger.debug("GET request.")
-                            request = self.session.get(
-                                url,
-                                params=data,
-                                auth=self.auth,
-                                headers=headers,
-                                proxies=self.proxies,
-                            )
-                        else:
-                            # POST
-                            logger.debug("POST request.")
-                            # Make POST request.
-                            request = self.session.post(
-                                url,
-                                data=data,
-                                auth=self.auth,
-                                headers=headers,
-                                proxies=self.proxies,
-                            )
+                        request = self._send(
+                            http_method,
+                            url,
+                            data,
+                            headers,
+                            verify,
+                            deadline=deadline,
+                            reservation=reservation,
+                        )
                         logger.debug("response headers =\n%s" % (str(request.headers)))
-                        response = request.text
+                        with self._phase("decode"):
+                            response = request.text
                         if retry_count >= max_retries:
                             break
 
@@ -524,7 +954,6 @@ class QGConnector(api_actions.QGActions):
                 logger.debug(e)
                 pass
             # Response received.
-            response = request.text
             logger.debug("response text =\n%s", response)
             # Keep track of how many retries.
             retries += 1
@@ -546,7 +975,7 @@ class QGConnector(api_actions.QGActions):
                     logger.warning(
                         "Waiting %d seconds until next try.", concurrent_scans_retry_delay
                     )
-                    time.sleep(concurrent_scans_retry_delay)
+                    self._sleep(concurrent_scans_retry_delay, deadline)
                     # Inform user of how many retries.
                     logger.critical("Retry #%d", retries)
                 else:
@@ -0,0 +1,280 @@
+""" Module providing a local, SQLite backed store of QualysGuard hosts and scans.
+
+The store is kept up to date by QGActions.syncHosts, which only pulls hosts
+processed since the last successful sync (the high-water mark) and merges them
+in by host ID. When a connector has a host_store, bulk pulls with full host
+details (getHosts, listHosts(detailed=True), notScannedSince) and listScans
+populate it too, and getHost answers from it while the stored record is fresh
+enough.
+"""
+import datetime
+import logging
+import sqlite3
+import threading
+import time
+from types import SimpleNamespace
+
+from qualysapi.api_objects import Host, Scan
+
+
+# Setup module level logging.
+logger = logging.getLogger(__name__)
+
+# Timestamp format accepted by the v2 API date filters.
+API_DATETIME_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+
+
+class HostStore:
+    """ SQLite store of Host records keyed by QualysGuard host ID.
+
+    Use ":memory:" as filename for a store that only lives as long as the process.
+    """
+
+    def __init__(self, filename=":memory:"):
+        self.filename = filename
+        self._lock = threading.RLock()
+        self._db = sqlite3.connect(filename, check_same_thread=False)
+        self._db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS hosts (
+                id INTEGER PRIMARY KEY,
+                ip TEXT,
+                dns TEXT,
+                netbios TEXT,
+                os TEXT,
+                tracking_method TEXT,
+                last_scan TEXT,
+                updated REAL
+            );
+            CREATE INDEX IF NOT EXISTS hosts_ip ON hosts (ip);
+            CREATE INDEX IF NOT EXISTS hosts_dns ON hosts (dns);
+            CREATE INDEX IF NOT EXISTS hosts_netbios ON hosts (netbios);
+            CREATE INDEX IF NOT EXISTS hosts_os ON hosts (os);
+            CREATE TABLE IF NOT EXISTS scans (
+                ref TEXT PRIMARY KEY,
+                title TEXT,
+                type TEXT,
+                status TEXT,
+                target TEXT,
+                assetgroups TEXT,
+                option_profile TEXT,
+                user_login TEXT,
+                launch_datetime TEXT,
+                duration TEXT,
+                processed INTEGER,
+                updated REAL
+            );
+            CREATE INDEX IF NOT EXISTS scans_status ON scans (status);
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            );
+            """
+        )
+        self._db.commit()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM hosts").fetchone()[0]
+
+    def get_meta(self, key, default=None):
+        with self._lock:
+            row = self._db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def set_meta(self, key, value):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, str(value))
+            )
+            self._db.commit()
+
+    @property
+    def high_water_mark(self):
+        """ API formatted timestamp of the last successful sync, or None. """
+        return self.get_meta("high_water_mark")
+
+    @high_water_mark.setter
+    def high_water_mark(self, value):
+        if isinstance(value, datetime.datetime):
+            value = value.strftime(API_DATETIME_FORMAT)
+        self.set_meta("high_water_mark", value)
+
+    def merge(self, hosts):
+        """ Insert or replace hosts by ID. Returns number of hosts merged.
+
+        """
+        updated = time.time()
+        rows = [
+            (
+                host.id,
+                host.ip,
+                host.dns,
+                host.netbios,
+                host.os,
+                host.tracking_method,
+                host.last_scan.strftime(API_DATETIME_FORMAT)
+                if isinstance(host.last_scan, datetime.datetime)
+                else None,
+                updated,
+            )
+            for host in hosts
+        ]
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO hosts "
+                "(id, ip, dns, netbios, os, tracking_method, last_scan, updated) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            self._db.commit()
+        return len(rows)
+
+    def prune(self, keep_ids):
+        """ Delete hosts whose ID is not in keep_ids. Returns number of hosts deleted.
+
+        """
+        keep_ids = set(keep_ids)
+        with self._lock:
+            stale = [
+                (host_id,)
+                for (host_id,) in self._db.execute("SELECT id FROM hosts")
+                if host_id not in keep_ids
+            ]
+            self._db.executemany("DELETE FROM hosts WHERE id = ?", stale)
+            self._db.commit()
+        return len(stale)
+
+    def _host(self, row):
+        host_id, ip, dns, netbios, os, tracking_method, last_scan = row
+        return Host(dns, host_id, ip, last_scan or "", netbios, os, tracking_method)
+
+    def _find_hosts(self, where, arguments, max_age=None):
+        query = (
+            "SELECT id, ip, dns, netbios, os, tracking_method, last_scan FROM hosts WHERE "
+            + where
+        )
+        if max_age is not None:
+            query += " AND updated >= ?"
+            arguments = tuple(arguments) + (time.time() - max_age,)
+        with self._lock:
+            rows = self._db.execute(query + " ORDER BY id", arguments).fetchall()
+        return [self._host(row) for row in rows]
+
+    def get(self, host_id, max_age=None):
+        """ Return Host with QualysGuard host ID host_id, or None.
+
+        With max_age (seconds), records stored longer ago than that are ignored.
+        """
+        hosts = self._find_hosts("id = ?", (int(host_id),), max_age)
+        return hosts[0] if hosts else None
+
+    def find_by_ip(self, ip, max_age=None):
+        """ Return list of Hosts with IP address ip. """
+        return self._find_hosts("ip = ?", (str(ip),), max_age)
+
+    def find_by_dns(self, dns, max_age=None):
+        """ Return list of Hosts with DNS name dns. """
+        return self._find_hosts("dns = ?", (str(dns),), max_age)
+
+    def find_by_netbios(self, netbios, max_age=None):
+        """ Return list of Hosts with NetBIOS name netbios. """
+        return self._find_hosts("netbios = ?", (str(netbios),), max_age)
+
+    def find_by_os(self, os_pattern, max_age=None):
+        """ Return list of Hosts whose OS matches the SQL LIKE pattern os_pattern. """
+        return self._find_hosts("os LIKE ?", (os_pattern,), max_age)
+
+    def hosts(self):
+        """ Return list of all stored Host objects ordered by ID.
+
+        """
+        return self._find_hosts("1 = 1", ())
+
+    def merge_scans(self, scans):
+        """ Insert or replace scans by scan reference. Returns number of scans merged.
+
+        """
+        updated = time.time()
+        rows = [
+            (
+                scan.ref,
+                scan.title,
+                scan.type,
+                scan.status,
+                ", ".join(scan.target),
+                "\n".join(str(ag) for ag in scan.assetgroups),
+                scan.option_profile,
+                scan.user_login,
+                scan.launch_datetime.strftime(API_DATETIME_FORMAT),
+                scan.duration,
+                scan.processed,
+                updated,
+            )
+            for scan in scans
+        ]
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO scans "
+                "(ref, title, type, status, target, assetgroups, option_profile, user_login, "
+                "launch_datetime, duration, processed, updated) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            self._db.commit()
+        return len(rows)
+
+    def _scan(self, row):
+        (
+            ref,
+            title,
+            type,
+            status,
+            target,
+            assetgroups,
+            option_profile,
+            user_login,
+            launch_datetime,
+            duration,
+            processed,
+        ) = row
+        return Scan(
+            assetgroups.split("\n") if assetgroups else [],
+            duration,
+            launch_datetime,
+            option_profile,
+            processed,
+            ref,
+            SimpleNamespace(STATE=status),
+            target,
+            title,
+            type,
+            user_login,
+        )
+
+    def _find_scans(self, where, arguments, max_age=None):
+        query = (
+            "SELECT ref, title, type, status, target, assetgroups, option_profile, user_login, "
+            "launch_datetime, duration, processed FROM scans WHERE " + where
+        )
+        if max_age is not None:
+            query += " AND updated >= ?"
+            arguments = tuple(arguments) + (time.time() - max_age,)
+        with self._lock:
+            rows = self._db.execute(query + " ORDER BY launch_datetime", arguments).fetchall()
+        return [self._scan(row) for row in rows]
+
+    def get_scan(self, ref, max_age=None):
+        """ Return Scan with scan reference ref, or None. """
+        scans = self._find_scans("ref = ?", (str(ref),), max_age)
+        return scans[0] if scans else None
+
+    def scans(self, status=None, max_age=None):
+        """ Return list of stored Scans, optionally only those with status. """
+        if status:
+            return self._find_scans("status = ?", (status,), max_age)
+        return self._find_scans("1 = 1", (), max_age)
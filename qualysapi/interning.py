@@ -0,0 +1,57 @@
+""" String interning and dictionary encoding for low-cardinality record fields.
+
+Fields such as OS, tracking method, status, type or user login only take a
+handful of distinct values across a whole inventory. intern_value makes every
+record share one str object per distinct value, and DictionaryEncoder goes one
+step further by replacing values with small integer codes for columnar output.
+"""
+import sys
+import threading
+
+
+def intern_value(value):
+    """ Return the shared (interned) str for value, or None if value is None.
+
+    """
+    if value is None:
+        return None
+    return sys.intern(str(value))
+
+
+class DictionaryEncoder:
+    """ Thread-safe mapping between distinct values and small integer codes.
+
+    """
+
+    def __init__(self):
+        self._codes = {}
+        self.values = []
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.values)
+
+    def encode(self, value):
+        """ Return integer code of value, assigning the next free code to new values. """
+        try:
+            return self._codes[value]
+        except KeyError:
+            with self._lock:
+                if value not in self._codes:
+                    self._codes[value] = len(self.values)
+                    self.values.append(value)
+                return self._codes[value]
+
+    def decode(self, code):
+        """ Return value for integer code. """
+        return self.values[code]
+
+
+def encode_columns(columns, encoders):
+    """ Replace columns named in encoders (field name -> DictionaryEncoder) by integer codes.
+
+    columns is a columnar batch (field name -> list of values) and is modified in place.
+    """
+    for field, encoder in encoders.items():
+        columns[field] = [encoder.encode(value) for value in columns[field]]
+    return columns
@@ -0,0 +1,127 @@
+""" Helpers for converting QualysGuard IP strings to and from integer intervals.
+
+QualysGuard reports and accepts IPs as single addresses ("10.0.0.1"), dashed
+ranges ("10.0.0.1-10.0.0.255") or CIDR blocks ("10.0.0.0/24"). Internally these
+are handled as inclusive (version, start, end) integer tuples.
+"""
+import ipaddress
+import logging
+
+
+# Setup module level logging.
+logger = logging.getLogger(__name__)
+
+
+def parse_ip_range(text):
+    """ Return (version, start, end) for an IP, dashed range or CIDR string.
+
+    """
+    text = str(text).strip()
+    if "-" in text:
+        first, last = (ipaddress.ip_address(part.strip()) for part in text.split("-", 1))
+        if first.version != last.version:
+            raise ValueError(f"Mixed IP versions in range {text}")
+        if int(first) > int(last):
+            first, last = last, first
+        return first.version, int(first), int(last)
+    if "/" in text:
+        network = ipaddress.ip_network(text, strict=False)
+        return network.version, int(network.network_address), int(network.broadcast_address)
+    address = ipaddress.ip_address(text)
+    return address.version, int(address), int(address)
+
+
+def iter_ip_ranges(ips):
+    """ Yield (version, start, end) tuples from a comma-separated string or an iterable.
+
+    Elements of the iterable may themselves be comma-separated strings (or
+    objectify elements), so the raw SCANIPS of an asset group can be passed as is.
+    """
+    if isinstance(ips, str):
+        ips = [ips]
+    for item in ips:
+        for part in str(item).split(","):
+            part = part.strip()
+            if part:
+                yield parse_ip_range(part)
+
+
+def collapse_ranges(ranges):
+    """ Return sorted list of (version, start, end) with overlapping and adjacent ranges merged.
+
+    """
+    merged = []
+    for version, start, end in sorted(ranges):
+        if merged and merged[-1][0] == version and start <= merged[-1][2] + 1:
+            if end > merged[-1][2]:
+                merged[-1] = (version, merged[-1][1], end)
+        else:
+            merged.append((version, start, end))
+    return merged
+
+
+def subtract_ranges(ranges, removed):
+    """ Return collapsed ranges with every address in removed taken out.
+
+    """
+    removed = collapse_ranges(removed)
+    result = []
+    for version, start, end in collapse_ranges(ranges):
+        for r_version, r_start, r_end in removed:
+            if r_version != version or r_end < start or r_start > end:
+                continue
+            if r_start > start:
+                result.append((version, start, r_start - 1))
+            start = r_end + 1
+            if start > end:
+                break
+        if start <= end:
+            result.append((version, start, end))
+    return result
+
+
+def format_ip_range(version, start, end):
+    """ Return QualysGuard string for a (version, start, end) tuple.
+
+    """
+    if version == 4:
+        first, last = ipaddress.IPv4Address(start), ipaddress.IPv4Address(end)
+    else:
+        first, last = ipaddress.IPv6Address(start), ipaddress.IPv6Address(end)
+    if start == end:
+        return str(first)
+    return f"{first}-{last}"
+
+
+def chunk_ip_ranges(ranges, max_length, max_ranges=None):
+    """ Return list of comma-separated IP strings, each at most max_length characters.
+
+    Ranges are kept whole; max_ranges optionally caps the number of ranges per chunk.
+    """
+    chunks = []
+    current = []
+    length = 0
+    for version, start, end in ranges:
+        text = format_ip_range(version, start, end)
+        # Account for separating comma.
+        needed = len(text) + (1 if current else 0)
+        if current and (
+            length + needed > max_length or (max_ranges and len(current) >= max_ranges)
+        ):
+            chunks.append(",".join(current))
+            current = []
+            length = 0
+            needed = len(text)
+        current.append(text)
+        length += needed
+    if current:
+        chunks.append(",".join(current))
+    return chunks
+
+
+def ip_to_int(ip):
+    """ Return (version, integer) for a single IP address.
+
+    """
+    address = ipaddress.ip_address(str(ip).strip())
+    return address.version, int(address)
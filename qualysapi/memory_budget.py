@@ -0,0 +1,114 @@
+""" Global budget for response bytes held in memory by concurrent calls.
+
+Every buffered call holds a Reservation against a shared MemoryBudget. A call
+is admitted once its expected size (Content-Length) fits into what is left of
+the budget. Responses without Content-Length (chunked transfer) or larger than
+announced grow their reservation before every chunk is buffered, waiting while
+the chunk does not fit.
+
+A call is always admitted when nothing else is in flight, and the oldest call
+holding bytes may always grow, so calls never wait on each other forever: the
+budget can be exceeded by the remainder of that one oldest response.
+"""
+import logging
+import threading
+import time
+
+
+# Setup module level logging.
+logger = logging.getLogger(__name__)
+
+
+class MemoryBudget:
+    """ Thread-safe in-flight byte budget shared by connectors.
+
+    """
+
+    def __init__(self, limit):
+        self.limit = int(limit)
+        self.in_use = 0
+        # Largest number of bytes in flight and number of calls that had to wait.
+        self.peak = 0
+        self.waits = 0
+        # Reentrant, so Reservation.resize can call Reservation.account while holding it.
+        self._condition = threading.Condition(threading.RLock())
+        # Reservations holding bytes, oldest first.
+        self._holders = []
+
+    @property
+    def available(self):
+        """ Bytes left before the budget is exhausted (never negative). """
+        with self._condition:
+            return max(0, self.limit - self.in_use)
+
+    def reserve(self):
+        """ Return an empty Reservation against this budget. """
+        return Reservation(self)
+
+
+class Reservation:
+    """ Bytes held by one call against a MemoryBudget; release() or use as context manager.
+
+    """
+
+    def __init__(self, budget):
+        self.budget = budget
+        self.size = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+    def resize(self, nbytes, block=True, timeout=None):
+        """ Set the reservation to nbytes, returning False if it did not fit in time.
+
+        Shrinking always succeeds. Growing waits (up to timeout seconds) for other calls
+        to release bytes when block is set, and fails at once otherwise.
+        """
+        budget = self.budget
+        with budget._condition:
+            expires = None if timeout is None else time.monotonic() + timeout
+            waited = False
+            while nbytes > self.size and not self._fits(nbytes):
+                left = None if expires is None else expires - time.monotonic()
+                if not block or (left is not None and left <= 0):
+                    return False
+                if not waited:
+                    waited = True
+                    budget.waits += 1
+                    logger.debug("Waiting for %d bytes of memory budget.", nbytes - self.size)
+                budget._condition.wait(left)
+            self.account(nbytes)
+            return True
+
+    def account(self, nbytes):
+        """ Set the reservation to nbytes already held in memory, even beyond the budget.
+
+        Calls admitted later wait until the budget is back within its limit.
+        """
+        budget = self.budget
+        with budget._condition:
+            budget.in_use += nbytes - self.size
+            budget.peak = max(budget.peak, budget.in_use)
+            if nbytes < self.size:
+                budget._condition.notify_all()
+            if nbytes and not self.size:
+                budget._holders.append(self)
+            elif self.size and not nbytes:
+                budget._holders.remove(self)
+            self.size = nbytes
+
+    def _fits(self, nbytes):
+        # Caller holds the budget's condition.
+        budget = self.budget
+        others = budget.in_use - self.size
+        if others == 0 or others + nbytes <= budget.limit:
+            return True
+        # The oldest holder may always grow, so that it finishes and frees its bytes.
+        return bool(self.size) and budget._holders[0] is self
+
+    def release(self):
+        """ Return all reserved bytes to the budget. """
+        self.resize(0)
@@ -0,0 +1,89 @@
+""" Adaptive page sizes for truncated v2 list calls and Portal search calls.
+
+An AdaptivePager measures how long a full page took and how many bytes it
+weighed, estimates the per-record cost, and picks the next page size so that
+a page takes about target_seconds and stays below max_bytes. Changes are
+limited to doubling or halving per page to damp noisy measurements.
+"""
+import logging
+import threading
+
+import qualysapi.settings as qcs
+
+
+# Setup module level logging.
+logger = logging.getLogger(__name__)
+
+
+class AdaptivePager:
+    """ Page size tuned toward a target page duration and size ceiling.
+
+    """
+
+    def __init__(
+        self,
+        size=qcs.page_size,
+        minimum=qcs.page_size_min,
+        maximum=qcs.page_size_max,
+        target_seconds=qcs.page_target_seconds,
+        max_bytes=qcs.page_max_bytes,
+    ):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.target_seconds = target_seconds
+        self.max_bytes = max_bytes
+        self.size = max(minimum, min(maximum, int(size)))
+        self._lock = threading.Lock()
+        self.pages = 0
+        self.records = 0
+        self.seconds = 0.0
+        self.bytes = 0
+        self.last_seconds = None
+        self.last_bytes = None
+        self.smallest = self.largest = self.size
+
+    def observe(self, records, seconds, nbytes):
+        """ Record a full page of records and return the next page size.
+
+        """
+        with self._lock:
+            self.pages += 1
+            self.records += records
+            self.seconds += seconds
+            self.bytes += nbytes
+            self.last_seconds = seconds
+            self.last_bytes = nbytes
+            if records <= 0:
+                return self.size
+            desired = float(self.maximum)
+            if seconds > 0:
+                desired = min(desired, records * self.target_seconds / seconds)
+            if nbytes > 0:
+                desired = min(desired, records * self.max_bytes / nbytes)
+            desired = max(self.size / 2, min(self.size * 2, desired))
+            size = int(max(self.minimum, min(self.maximum, desired)))
+            if size != self.size:
+                logger.debug(
+                    "Page size %d -> %d (%.1fs, %d bytes).", self.size, size, seconds, nbytes
+                )
+            self.size = size
+            self.smallest = min(self.smallest, size)
+            self.largest = max(self.largest, size)
+            return size
+
+    def metrics(self):
+        """ Return dict of the current page size and page statistics.
+
+        """
+        with self._lock:
+            return {
+                "size": self.size,
+                "smallest": self.smallest,
+                "largest": self.largest,
+                "pages": self.pages,
+                "records": self.records,
+                "seconds": self.seconds,
+                "bytes": self.bytes,
+                "last_seconds": self.last_seconds,
+                "last_bytes": self.last_bytes,
+            }
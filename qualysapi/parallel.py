@@ -0,0 +1,81 @@
+""" Helpers for running QualysGuard API calls concurrently.
+
+Concurrency is capped by the subscription's concurrency limit, which the
+connector learns from the X-Concurrency-Limit-Limit response header. Calls that
+still hit the rate or concurrency limit are retried by QGConnector.request().
+"""
+import logging
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+import qualysapi.settings as qcs
+
+
+# Setup module level logging.
+logger = logging.getLogger(__name__)
+
+# Outcome of one concurrent call: the input item, the returned value and the raised exception.
+TaskResult = namedtuple("TaskResult", ["item", "result", "error"])
+
+# Per thread: whether the thread holds a single concurrency slot (see single_slot).
+_local = threading.local()
+
+
+@contextmanager
+def single_slot():
+    """ Run the map_concurrent calls of the current thread in that thread only.
+
+    Used while the thread holds one of a subscription's concurrency slots (see
+    qualysapi.pool.SubscriptionLimiter), so that actions fanning out on their own do not
+    start more calls than the slot allows.
+    """
+    previous = getattr(_local, "single_slot", False)
+    _local.single_slot = True
+    try:
+        yield
+    finally:
+        _local.single_slot = previous
+
+
+def worker_count(conn, max_workers=None, tasks=None):
+    """ Return number of worker threads to use against conn.
+
+    """
+    if max_workers is None:
+        max_workers = getattr(conn, "concurrency_limit", None) or qcs.max_workers
+    else:
+        limit = getattr(conn, "concurrency_limit", None)
+        if limit:
+            max_workers = min(max_workers, limit)
+    if tasks is not None:
+        max_workers = min(max_workers, tasks)
+    return max(1, max_workers)
+
+
+def map_concurrent(conn, func, items, max_workers=None):
+    """ Return list of TaskResult for func(item) over items, in input order.
+
+    Exceptions are captured per item instead of aborting the whole batch.
+    """
+    items = list(items)
+    if not items:
+        return []
+
+    def run(item):
+        try:
+            return TaskResult(item, func(item), None)
+        except Exception as e:
+            logger.error("Concurrent call failed for %s: %s", item, e)
+            return TaskResult(item, None, e)
+
+    if getattr(_local, "single_slot", False):
+        workers = 1
+    else:
+        workers = worker_count(conn, max_workers, len(items))
+    logger.debug("Running %d calls with %d workers.", len(items), workers)
+    if workers == 1:
+        return [run(item) for item in items]
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(run, items))
@@ -0,0 +1,174 @@
+""" Producer/consumer pipeline for overlapping fetching, parsing and consuming.
+
+A Pipeline runs fetch and parse stages in worker threads (parse optionally in
+worker processes) connected by bounded queues, and hands parsed records to the
+consumer in the calling thread. When the consumer falls behind, the queues fill
+up and the upstream stages block instead of buffering unbounded data, so
+throughput follows the slowest stage while memory stays bounded.
+"""
+import logging
+import queue
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import qualysapi.settings as qcs
+
+
+# Setup module level logging.
+logger = logging.getLogger(__name__)
+
+# Marks the end of a stage's input.
+_DONE = object()
+
+
+def _parse_list(parse, payload):
+    # Run in a worker process: generators cannot be sent back, lists can.
+    return list(parse(payload))
+
+
+class Pipeline:
+    """ fetch -> parse -> consumer stages connected by bounded queues.
+
+    fetch(item) returns a payload (e.g. response text or a file) and runs in
+    fetch_workers threads; without fetch, items are the payloads themselves and
+    are pulled from the items iterable in one thread (e.g. a page iterator).
+    parse(payload) returns an iterable of records and runs in parse_workers
+    threads, or in as many processes with processes=True (parse must then be
+    picklable). Records are unordered when more than one worker runs a stage.
+    """
+
+    def __init__(
+        self,
+        fetch=None,
+        parse=None,
+        fetch_workers=1,
+        parse_workers=1,
+        queue_size=qcs.pipeline_queue_size,
+        processes=False,
+    ):
+        self.fetch = fetch
+        self.parse = parse
+        self.fetch_workers = fetch_workers
+        self.parse_workers = parse_workers
+        self.queue_size = queue_size
+        self.processes = processes
+
+    def iterate(self, items):
+        """ Yield records parsed from items as the stages produce them.
+
+        The first exception raised by any stage stops the pipeline and is re-raised here.
+        Closing the generator early stops all stages.
+        """
+        stop = threading.Event()
+        errors = []
+        stages = []
+        if self.fetch is not None:
+            stages.append((self.fetch, self.fetch_workers, False))
+        executor = None
+        if self.parse is not None:
+            parse = self.parse
+            if self.processes:
+                executor = ProcessPoolExecutor(max_workers=self.parse_workers)
+
+                def parse(payload, parse=self.parse):
+                    return executor.submit(_parse_list, parse, payload).result()
+
+            stages.append((parse, self.parse_workers, True))
+        queues = [queue.Queue(self.queue_size) for _ in range(len(stages) + 1)]
+
+        def put(outbox, value):
+            # Block while outbox is full, giving up once the pipeline stops.
+            while not stop.is_set():
+                try:
+                    outbox.put(value, timeout=0.1)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+
+        def get(inbox):
+            while not stop.is_set():
+                try:
+                    return inbox.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+            return _DONE
+
+        def fail(e):
+            logger.error("Pipeline stage failed: %s", e)
+            errors.append(e)
+            stop.set()
+
+        def source(consumers):
+            try:
+                for item in items:
+                    if not put(queues[0], item):
+                        return
+            except Exception as e:
+                fail(e)
+            for _ in range(consumers):
+                put(queues[0], _DONE)
+
+        def work(func, inbox, outbox, flatten):
+            try:
+                while True:
+                    value = get(inbox)
+                    if value is _DONE:
+                        return
+                    result = func(value)
+                    for record in result if flatten else (result,):
+                        if not put(outbox, record):
+                            return
+            except Exception as e:
+                fail(e)
+
+        def close(workers, outbox, consumers):
+            # Signal the next stage once every worker of this stage finished.
+            for worker in workers:
+                worker.join()
+            for _ in range(consumers):
+                put(outbox, _DONE)
+
+        threads = []
+        consumers = [workers for _, workers, _ in stages] + [1]
+        threads.append(threading.Thread(target=source, args=(consumers[0],), daemon=True))
+        for i, (func, workers, flatten) in enumerate(stages):
+            pool = [
+                threading.Thread(
+                    target=work, args=(func, queues[i], queues[i + 1], flatten), daemon=True
+                )
+                for _ in range(workers)
+            ]
+            threads.extend(pool)
+            threads.append(
+                threading.Thread(
+                    target=close, args=(pool, queues[i + 1], consumers[i + 1]), daemon=True
+                )
+            )
+        for thread in threads:
+            thread.start()
+        try:
+            while True:
+                record = get(queues[-1])
+                if record is _DONE:
+                    break
+                yield record
+        finally:
+            stop.set()
+            for thread in threads:
+                thread.join()
+            if executor is not None:
+                executor.shutdown()
+        if errors:
+            raise errors[0]
+
+    def run(self, items, sink):
+        """ Pass every record parsed from items to sink (e.g. a callback or file.write).
+
+        Returns number of records sunk.
+        """
+        count = 0
+        for record in self.iterate(items):
+            sink(record)
+            count += 1
+        return count
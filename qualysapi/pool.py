@@ -0,0 +1,137 @@
+""" Pool of connectors to many QualysGuard subscriptions configured in one file.
+
+Every section of the config file (except [proxy]) describes one subscription.
+The file is parsed once and every subscription gets its own QGConnector, and
+with it its own HTTP connection pool, rate limit bookkeeping and concurrency
+limit. ConnectorPool runs actions across subscriptions concurrently while never
+running more calls against one subscription than its concurrency limit allows.
+"""
+import logging
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import qualysapi.config as qcconf
+import qualysapi.connector as qcconn
+import qualysapi.settings as qcs
+from qualysapi.parallel import single_slot, worker_count
+
+
+# Setup module level logging.
+logger = logging.getLogger(__name__)
+
+# Outcome of one call against a subscription, named after its config section.
+SubscriptionResult = namedtuple("SubscriptionResult", ["subscription", "item", "result", "error"])
+
+
+class SubscriptionLimiter:
+    """ Context manager bounding concurrent calls against one connector.
+
+    The bound follows the subscription's concurrency limit as soon as the
+    connector has learned it from a response.
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.active = 0
+        self._condition = threading.Condition()
+
+    def __enter__(self):
+        with self._condition:
+            while self.active >= worker_count(self.conn):
+                self._condition.wait()
+            self.active += 1
+        return self.conn
+
+    def __exit__(self, *exc_info):
+        with self._condition:
+            self.active -= 1
+            self._condition.notify_all()
+
+
+class ConnectorPool:
+    """ QGConnector per subscription section of one config file.
+
+    connector_kwargs are passed to every QGConnector (e.g. singleflight=True).
+    """
+
+    def __init__(self, config_file=qcs.default_filename, sections=None, **connector_kwargs):
+        _, parser = qcconf.read_config(config_file)
+        if sections is None:
+            sections = [section for section in parser.sections() if section != "proxy"]
+        self.connectors = {}
+        self.limiters = {}
+        for section in sections:
+            conf = qcconf.QualysConnectConfig(
+                filename=config_file, section=section, parser=parser
+            )
+            kwargs = {"timeouts": conf.timeouts, "use_session": conf.use_session}
+            kwargs.update(connector_kwargs)
+            conn = qcconn.QGConnector(
+                conf.get_auth(), conf.get_hostname(), conf.proxies, conf.max_retries, **kwargs
+            )
+            self.connectors[section] = conn
+            self.limiters[section] = SubscriptionLimiter(conn)
+        logger.info("Built connectors for %d subscriptions.", len(self.connectors))
+
+    def __len__(self):
+        return len(self.connectors)
+
+    def __getitem__(self, subscription):
+        return self.connectors[subscription]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """ Close every connector (logging out of API sessions). """
+        for conn in self.connectors.values():
+            conn.close()
+
+    def map_tasks(self, func, tasks, max_workers=None):
+        """ Return list of SubscriptionResult for func(conn, item) over (subscription, item) tasks.
+
+        Tasks run concurrently, in at most max_workers threads overall (default: the sum of
+        the subscriptions' concurrency limits) and within each subscription's concurrency
+        limit. Each task makes its calls one at a time, also in bulk actions (addIPs,
+        getHosts, ...) that otherwise run calls concurrently. Exceptions are captured per
+        task. Results are in task order.
+        """
+        tasks = list(tasks)
+        if not tasks:
+            return []
+
+        def run(task):
+            subscription, item = task
+            try:
+                # One slot per task: actions using map_concurrent run their calls in it.
+                with self.limiters[subscription] as conn, single_slot():
+                    return SubscriptionResult(subscription, item, func(conn, item), None)
+            except Exception as e:
+                logger.error("Call failed for subscription %s, %s: %s", subscription, item, e)
+                return SubscriptionResult(subscription, item, None, e)
+
+        if max_workers is None:
+            max_workers = sum(worker_count(conn) for conn in self.connectors.values())
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(tasks)))) as executor:
+            return list(executor.map(run, tasks))
+
+    def map(self, func, subscriptions=None, max_workers=None):
+        """ Return list of SubscriptionResult for func(conn) against every subscription.
+
+        """
+        if subscriptions is None:
+            subscriptions = list(self.connectors)
+        return self.map_tasks(
+            lambda conn, item: func(conn), [(s, None) for s in subscriptions], max_workers
+        )
+
+    def call(self, action, *args, **kwargs):
+        """ Return list of SubscriptionResult of action(*args, **kwargs) on every subscription.
+
+        action names a QGActions method, e.g. pool.call("listScans", state="Running").
+        """
+        return self.map(lambda conn: getattr(conn, action)(*args, **kwargs))
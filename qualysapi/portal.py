@@ -0,0 +1,121 @@
+""" Helpers for building and reading Portal API (AM & WAS) ServiceRequest calls.
+
+Portal search calls return at most limitResults records per call, flagged with
+hasMoreRecords and lastId. QGActions.searchPortal uses these helpers to walk
+every page by adding an "id GREATER lastId" criteria to the next request.
+
+ServiceRequestTemplate renders request bodies straight to bytes: the static
+preferences and criteria are serialized once, and only per call criteria and
+data records are escaped and appended, avoiding an lxml tree per request.
+"""
+import logging
+from functools import lru_cache
+from xml.sax.saxutils import escape, quoteattr
+
+from lxml import objectify
+
+
+# Setup module level logging.
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=256)
+def _criteria_open(field, operator):
+    return f"<Criteria field={quoteattr(field)} operator={quoteattr(operator)}>"
+
+
+def criteria_xml(criteria):
+    """ Return XML string of Criteria elements for (field, operator, value) tuples.
+
+    """
+    return "".join(
+        f"{_criteria_open(field, operator)}{escape(str(value))}</Criteria>"
+        for field, operator, value in criteria
+    )
+
+
+def _render(name, value, out):
+    # Append XML for value to out. Dicts become child elements, lists repeat the element.
+    if isinstance(value, (list, tuple)):
+        for item in value:
+            _render(name, item, out)
+    elif isinstance(value, dict):
+        out.append(f"<{name}>")
+        for child_name, child_value in value.items():
+            _render(child_name, child_value, out)
+        out.append(f"</{name}>")
+    elif value is None:
+        out.append(f"<{name}/>")
+    else:
+        out.append(f"<{name}>{escape(str(value))}</{name}>")
+
+
+def data_xml(object_type, records):
+    """ Return XML string of a data element holding one object_type element per record dict.
+
+    """
+    out = ["<data>"]
+    for record in records:
+        _render(object_type, record, out)
+    out.append("</data>")
+    return "".join(out)
+
+
+class ServiceRequestTemplate:
+    """ Precompiled ServiceRequest body with static preferences and criteria.
+
+    render() appends per call criteria and data records and returns UTF-8 bytes.
+    """
+
+    def __init__(self, criteria=(), limit_results=None):
+        self._head = self._render_head(limit_results)
+        self._static_criteria = criteria_xml(criteria)
+
+    def _render_head(self, limit_results):
+        preferences = ""
+        if limit_results:
+            preferences = (
+                f"<preferences><limitResults>{int(limit_results)}</limitResults></preferences>"
+            )
+        return f"<ServiceRequest>{preferences}"
+
+    def render(self, criteria=(), data=None, object_type=None, limit_results=None):
+        """ Return request body bytes with extra criteria and optional data records.
+
+        limit_results overrides the template's limitResults for this call.
+        """
+        parts = [self._head if limit_results is None else self._render_head(limit_results)]
+        extra = criteria_xml(criteria)
+        if self._static_criteria or extra:
+            parts.append(f"<filters>{self._static_criteria}{extra}</filters>")
+        if data is not None:
+            parts.append(data_xml(object_type, data))
+        parts.append("</ServiceRequest>")
+        return "".join(parts).encode("utf-8")
+
+
+def parse_service_response(response):
+    """ Return objectified ServiceResponse, raising an Exception unless it succeeded.
+
+    """
+    if isinstance(response, str):
+        response = response.encode("utf-8")
+    root = objectify.fromstring(response)
+    code = str(root.find("responseCode"))
+    if code != "SUCCESS":
+        message = root.find("responseErrorDetails/errorMessage")
+        raise Exception(f"Portal API call failed ({code}): {message}")
+    return root
+
+
+def has_more_records(root):
+    """ Return True if a ServiceResponse reports more records after lastId. """
+    return str(root.find("hasMoreRecords")).lower() == "true"
+
+
+def records(root):
+    """ Return list of record elements under a ServiceResponse's data element. """
+    data = root.find("data")
+    if data is None:
+        return []
+    return data.getchildren()
@@ -0,0 +1,233 @@
+""" Opt-in profiling of QGActions calls.
+
+A Profiler instruments a connector's public actions and times, per action
+name, the phases of each call: "request" (HTTP round trips, including the body
+download of non-streamed calls), "decode" (response bytes to text), "parse"
+(XML to objects) and "materialize" (building Host, Scan, ... records). Time not
+spent in these phases (user code consuming generators, retry waits, ...) is
+reported as "other". Phases run by nested actions count toward the innermost
+action. Optionally, each outermost action also runs under cProfile and/or
+tracemalloc, whose top entries are included in the report.
+"""
+import atexit
+import cProfile
+import functools
+import inspect
+import io
+import logging
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import defaultdict
+
+from qualysapi.api_actions import QGActions
+
+
+# Setup module level logging.
+logger = logging.getLogger(__name__)
+
+PHASES = ("request", "decode", "parse", "materialize")
+
+
+class ActionStats:
+    """ Accumulated calls, wall time and phase times of one action. """
+
+    def __init__(self):
+        self.calls = 0
+        self.seconds = 0.0
+        self.phases = defaultdict(float)
+        self.peak_memory = 0
+
+    def as_dict(self):
+        phases = {phase: self.phases.get(phase, 0.0) for phase in PHASES}
+        phases["other"] = max(0.0, self.seconds - sum(phases.values()))
+        return {
+            "calls": self.calls,
+            "seconds": self.seconds,
+            "phases": phases,
+            "peak_memory": self.peak_memory,
+        }
+
+
+class _Phase:
+    # Context manager adding its duration to the current action's phase.
+
+    __slots__ = ("profiler", "name", "started")
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        self.profiler._add_phase(self.name, time.perf_counter() - self.started)
+
+
+class Profiler:
+    """ Per action phase timings, with optional cProfile and tracemalloc.
+
+    Attach with QGConnector(..., profiler=Profiler()) or profiler.instrument(conn).
+    With report_at_exit, report() is written to stream (default stderr) when the
+    process exits.
+    """
+
+    def __init__(self, cprofile=False, memory=False, report_at_exit=False, stream=None):
+        self.cprofile = cprofile
+        self.memory = memory
+        self.stream = stream
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._stats = defaultdict(ActionStats)
+        self._profiles = {}
+        if memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        if report_at_exit:
+            atexit.register(self.dump)
+
+    def instrument(self, conn):
+        """ Time every public QGActions method of conn (on this instance only).
+
+        """
+        for name, member in inspect.getmembers(QGActions, inspect.isfunction):
+            if not name.startswith("_"):
+                setattr(conn, name, self.wrap(name, getattr(conn, name)))
+        conn.profiler = self
+        return conn
+
+    def wrap(self, name, func):
+        """ Return func timed as action name; returned generators are timed as they run.
+
+        """
+
+        @functools.wraps(func)
+        def action(*args, **kwargs):
+            with self.action(name):
+                result = func(*args, **kwargs)
+            if inspect.isgenerator(result):
+                return self._generator(name, result)
+            return result
+
+        return action
+
+    def _generator(self, name, generator):
+        # Re-enter the action around every step of a generator returned by an action.
+        try:
+            while True:
+                with self.action(name, count=False):
+                    try:
+                        value = next(generator)
+                    except StopIteration:
+                        return
+                yield value
+        finally:
+            generator.close()
+
+    def _stack(self):
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def action(self, name, count=True):
+        """ Return context manager timing a call of action name. """
+        return _Action(self, name, count)
+
+    def phase(self, name):
+        """ Return context manager timing phase name of the current action. """
+        return _Phase(self, name)
+
+    def _add_phase(self, name, seconds):
+        stack = self._stack()
+        action = stack[-1] if stack else "(no action)"
+        with self._lock:
+            self._stats[action].phases[name] += seconds
+
+    def stats(self):
+        """ Return dict of action name -> calls, seconds, phase seconds and peak memory. """
+        with self._lock:
+            return {name: stats.as_dict() for name, stats in self._stats.items()}
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+            self._profiles.clear()
+
+    def report(self, limit=10):
+        """ Return text report of action timings, slowest first, with profiler top entries.
+
+        """
+        stats = self.stats()
+        out = io.StringIO()
+        out.write(
+            f"{'action':<28}{'calls':>7}{'total s':>10}"
+            + "".join(f"{phase:>13}" for phase in PHASES + ("other",))
+            + f"{'peak MB':>9}\n"
+        )
+        for name, action in sorted(stats.items(), key=lambda item: -item[1]["seconds"]):
+            out.write(
+                f"{name:<28}{action['calls']:>7}{action['seconds']:>10.3f}"
+                + "".join(f"{seconds:>13.3f}" for seconds in action["phases"].values())
+                + f"{action['peak_memory'] / 1e6:>9.1f}\n"
+            )
+        with self._lock:
+            profiles = dict(self._profiles)
+        for name, profile in profiles.items():
+            out.write(f"\ncProfile of {name}:\n")
+            pstats.Stats(profile, stream=out).sort_stats("cumulative").print_stats(limit)
+        if self.memory and tracemalloc.is_tracing():
+            out.write("\nTop allocations:\n")
+            for statistic in tracemalloc.take_snapshot().statistics("lineno")[:limit]:
+                out.write(f"{statistic}\n")
+        return out.getvalue()
+
+    def dump(self, stream=None):
+        """ Write report() to stream (default: the profiler's stream or stderr). """
+        (stream or self.stream or sys.stderr).write(self.report())
+
+
+class _Action:
+    # Context manager timing one call (or generator step) of an action.
+
+    def __init__(self, profiler, name, count):
+        self.profiler = profiler
+        self.name = name
+        self.count = count
+        self.profile = None
+
+    def __enter__(self):
+        stack = self.profiler._stack()
+        outermost = not stack
+        stack.append(self.name)
+        if outermost and self.profiler.cprofile and sys.getprofile() is None:
+            with self.profiler._lock:
+                self.profile = self.profiler._profiles.setdefault(self.name, cProfile.Profile())
+            try:
+                self.profile.enable()
+            except ValueError:
+                # Another thread is profiling this action.
+                self.profile = None
+        if outermost and self.profiler.memory:
+            if hasattr(tracemalloc, "reset_peak"):
+                tracemalloc.reset_peak()
+            else:
+                # Python < 3.9: clearing the traces also resets the peak.
+                tracemalloc.clear_traces()
+        self.started = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        seconds = time.perf_counter() - self.started
+        if self.profile is not None:
+            self.profile.disable()
+        stack = self.profiler._stack()
+        stack.pop()
+        peak = tracemalloc.get_traced_memory()[1] if self.profiler.memory and not stack else 0
+        with self.profiler._lock:
+            stats = self.profiler._stats[self.name]
+            stats.seconds += seconds
+            if self.count:
+                stats.calls += 1
+            stats.peak_memory = max(stats.peak_memory, peak)
@@ -0,0 +1,182 @@
+""" Incremental parsers for /api/2.0/fo/scan/ action=fetch results.
+
+Scan results are fetched as CSV or JSON (output_format csv, json, csv_extended
+or json_extended). Both parsers read a binary stream chunk by chunk and yield
+one ScanResult per result row, so a result set never has to fit in memory.
+Header or metadata rows of the extended formats are skipped.
+"""
+import codecs
+import csv
+import json
+import logging
+from collections import namedtuple
+
+import qualysapi.settings as qcs
+from qualysapi.interning import intern_value
+
+
+# Setup module level logging.
+logger = logging.getLogger(__name__)
+
+ScanResult = namedtuple(
+    "ScanResult",
+    [
+        "scan_ref",
+        "ip",
+        "dns",
+        "netbios",
+        "os",
+        "ip_status",
+        "qid",
+        "title",
+        "type",
+        "severity",
+        "port",
+        "protocol",
+        "fqdn",
+        "ssl",
+        "cve_id",
+        "vendor_reference",
+        "bugtraq_id",
+        "threat",
+        "impact",
+        "solution",
+        "exploitability",
+        "associated_malware",
+        "results",
+        "pci_vuln",
+        "instance",
+        "category",
+    ],
+)
+
+# Conversion of result fields that are not kept as plain strings.
+_CONVERTERS = {
+    "os": intern_value,
+    "ip_status": intern_value,
+    "qid": int,
+    "type": intern_value,
+    "severity": int,
+    "port": int,
+    "protocol": intern_value,
+    "ssl": intern_value,
+    "pci_vuln": intern_value,
+    "category": intern_value,
+}
+
+
+def scan_result_record(row, scan_ref=None):
+    """ Return ScanResult for a result row dict keyed by CSV/JSON column name.
+
+    """
+    values = {"scan_ref": scan_ref}
+    for field in ScanResult._fields[1:]:
+        value = row.get(field)
+        if value is not None and not isinstance(value, (int, float)):
+            value = str(value)
+            if value == "":
+                value = None
+        if value is not None and field in _CONVERTERS:
+            try:
+                value = _CONVERTERS[field](value)
+            except ValueError:
+                value = None
+        values[field] = value
+    return ScanResult(**values)
+
+
+def _text_chunks(source):
+    # Yield decoded text chunks read from a binary stream.
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    while True:
+        chunk = source.read(qcs.stream_chunk_size)
+        if not chunk:
+            break
+        yield decoder.decode(chunk)
+    yield decoder.decode(b"", final=True)
+
+
+def _lines(source):
+    # Yield "\n" terminated lines of a binary stream for csv.reader, which handles "\r\n"
+    # and line breaks inside quoted fields itself.
+    pending = ""
+    for text in _text_chunks(source):
+        lines = (pending + text).split("\n")
+        pending = lines.pop()
+        for line in lines:
+            yield line + "\n"
+    if pending:
+        yield pending
+
+
+def iter_csv_results(source, scan_ref=None):
+    """ Yield ScanResult for every result row of CSV scan results read from source.
+
+    Rows before the column header row (which names the "qid" column) are skipped.
+    """
+    rows = csv.reader(_lines(source))
+    header = None
+    for row in rows:
+        if header is None:
+            if "qid" in (column.strip().lower() for column in row):
+                # "IP Status", "CVE ID", ... name the ip_status, cve_id, ... fields.
+                header = [column.strip().lower().replace(" ", "_") for column in row]
+            continue
+        if not row:
+            continue
+        yield scan_result_record(dict(zip(header, row)), scan_ref)
+
+
+def iter_json_values(source):
+    """ Yield the elements of a top level JSON array read incrementally from source.
+
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    position = 0
+    started = False
+    chunks = _text_chunks(source)
+    exhausted = False
+    while True:
+        # Skip whitespace and separators between elements.
+        while position < len(buffer) and buffer[position] in " \t\r\n,":
+            position += 1
+        if position < len(buffer):
+            if not started:
+                if buffer[position] != "[":
+                    raise ValueError("Scan results are not a JSON array.")
+                started = True
+                position += 1
+                continue
+            if buffer[position] == "]":
+                return
+            try:
+                value, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if exhausted:
+                    raise
+            else:
+                yield value
+                position = end
+                continue
+        if exhausted:
+            if started:
+                raise ValueError("Truncated JSON scan results.")
+            return
+        # Need more input: drop consumed text and read the next chunk.
+        buffer = buffer[position:]
+        position = 0
+        try:
+            buffer += next(chunks)
+        except StopIteration:
+            exhausted = True
+
+
+def iter_json_results(source, scan_ref=None):
+    """ Yield ScanResult for every result object of JSON scan results read from source.
+
+    Metadata objects of the extended format (without a "qid") are skipped.
+    """
+    for value in iter_json_values(source):
+        if isinstance(value, dict) and "qid" in value:
+            yield scan_result_record(value, scan_ref)
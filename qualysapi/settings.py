@@ -17,3 +17,38 @@ else:
     default_filename = ".qcrc"
 
 defaults = {"hostname": "qualysapi.qualys.com", "max_retries": "3", "template_id": "00000"}
+
+# Maximum length of a single comma-separated IP list sent in one request (add_ips, ips, etc.).
+max_ips_length = 8000
+
+# Default number of concurrent API calls when the subscription concurrency limit is not yet known.
+max_workers = 2
+
+# Seconds a host store record is served by getHost before falling back to the API.
+host_store_max_age = 3600
+
+# Bytes read per chunk when streaming responses to disk.
+stream_chunk_size = 1024 * 1024
+
+# Responses larger than this many bytes are spooled to a temporary file by request_spooled().
+spool_threshold = 16 * 1024 * 1024
+
+# Connect timeout, and read timeouts per API family, in seconds.
+connect_timeout = 10
+read_timeouts = {1: 300, 2: 300, "am": 120, "am2": 120, "was": 300}
+
+# Adaptive paging: initial and bounds of v2 truncation_limit and Portal limitResults, and the
+# page duration (seconds) and response size (bytes) the page size is tuned toward.
+page_size = 1000
+page_size_min = 100
+page_size_max = 100000
+portal_page_size_min = 10
+portal_page_size_max = 1000
+page_target_seconds = 30
+page_max_bytes = 64 * 1024 * 1024
+
+# Number of items each bounded queue between pipeline stages holds before blocking upstream.
+pipeline_queue_size = 4
+
+# Records sorted in memory at once when writing a snapshot; larger snapshots are merged from runs.
+snapshot_run_size = 100000
@@ -0,0 +1,80 @@
+""" Deduplication of identical in-flight calls ("singleflight").
+
+When several threads make the same read-only call at the same time, only the
+first one (the leader) performs it; the others wait for and share its result
+or exception.
+"""
+import logging
+import threading
+
+import requests
+
+
+# Setup module level logging.
+logger = logging.getLogger(__name__)
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """ Share the outcome of concurrent calls with the same key.
+
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        # Number of calls answered from another thread's in-flight call.
+        self.shared = 0
+
+    def do(self, key, func, timeout=None):
+        """ Return func(), or the result of an identical in-flight call with key.
+
+        Waiting for another thread's call gives up after timeout seconds (None waits
+        forever) by raising requests.exceptions.Timeout.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                self.shared += 1
+        if not leader:
+            logger.debug("Waiting for in-flight call %s", key)
+            if not call.done.wait(timeout):
+                raise requests.exceptions.Timeout(
+                    "QualysGuard API call deadline exceeded waiting for identical call."
+                )
+            if call.error is not None:
+                raise call.error
+            return call.result
+        try:
+            call.result = func()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+
+def request_key(http_method, url, data):
+    """ Return hashable key identifying a request by method, url and normalized payload.
+
+    """
+    if isinstance(data, dict):
+        data = tuple(
+            sorted(
+                (str(k), tuple(map(str, v)) if isinstance(v, (list, tuple)) else str(v))
+                for k, v in data.items()
+            )
+        )
+    return (http_method or "", url, data)
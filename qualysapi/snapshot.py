@@ -0,0 +1,171 @@
+""" Sorted inventory snapshots and streaming diffs between them.
+
+A snapshot is a gzip compressed text file with one line per record, sorted by
+record ID: "<id>\t<content hash>\t<record as JSON>". Snapshots larger than
+snapshot_run_size records are sorted in runs spilled to temporary files and
+merged, so writing needs bounded memory. Two snapshots are compared with a
+merge-join over both files that only decodes the JSON of records whose hashes
+differ, so diffing needs constant memory however large the inventory is.
+"""
+import datetime
+import gzip
+import hashlib
+import heapq
+import json
+import logging
+import os
+import tempfile
+from collections import namedtuple
+
+import qualysapi.settings as qcs
+
+
+# Setup module level logging.
+logger = logging.getLogger(__name__)
+
+# Difference between two snapshots: kind is "add", "remove" or "change"; old and new are
+# the record dicts (None for the side where the record does not exist).
+SnapshotEvent = namedtuple("SnapshotEvent", ["kind", "id", "old", "new"])
+
+
+def record_line(record, key="id"):
+    """ Return (id, snapshot line) for a record dict. """
+    record_id = int(record[key])
+    data = json.dumps(record, sort_keys=True, separators=(",", ":"), default=str)
+    digest = hashlib.blake2b(data.encode("utf-8"), digest_size=8).hexdigest()
+    return record_id, f"{record_id}\t{digest}\t{data}\n"
+
+
+def _line_id(line):
+    return int(line.split("\t", 1)[0])
+
+
+def _runs(records, key, run_size):
+    # Yield iterators over sorted runs of snapshot lines, spilling all but the last run.
+    run = []
+    spilled = []
+    for record in records:
+        run.append(record_line(record, key))
+        if len(run) >= run_size:
+            run.sort(key=lambda item: item[0])
+            spill = tempfile.TemporaryFile("w+", encoding="utf-8")
+            spill.writelines(line for _, line in run)
+            spill.seek(0)
+            spilled.append(spill)
+            run = []
+    run.sort(key=lambda item: item[0])
+    return spilled + [[line for _, line in run]]
+
+
+def write_snapshot(filename, records, key="id", run_size=None):
+    """ Write dict records sorted by integer field key to snapshot filename.
+
+    Returns number of records written. The file is replaced atomically.
+    """
+    runs = _runs(records, key, run_size or qcs.snapshot_run_size)
+    temporary = f"{filename}.tmp"
+    count = 0
+    try:
+        with gzip.open(temporary, "wt", encoding="utf-8") as f:
+            for line in heapq.merge(*runs, key=_line_id):
+                f.write(line)
+                count += 1
+    except BaseException:
+        # Leave the previous snapshot, if any, and no partial file behind.
+        try:
+            os.unlink(temporary)
+        except FileNotFoundError:
+            pass
+        raise
+    finally:
+        for run in runs:
+            if hasattr(run, "close"):
+                run.close()
+    os.replace(temporary, filename)
+    return count
+
+
+def iter_snapshot(filename):
+    """ Yield (id, content hash, record JSON) of every line of a snapshot, in ID order.
+
+    """
+    with gzip.open(filename, "rt", encoding="utf-8") as f:
+        for line in f:
+            record_id, digest, data = line.rstrip("\n").split("\t", 2)
+            yield int(record_id), digest, data
+
+
+def diff_snapshots(old_filename, new_filename):
+    """ Yield SnapshotEvent for every record added, removed or changed from old to new.
+
+    """
+    old = iter_snapshot(old_filename)
+    new = iter_snapshot(new_filename)
+    old_line = next(old, None)
+    new_line = next(new, None)
+    while old_line is not None or new_line is not None:
+        if new_line is None or (old_line is not None and old_line[0] < new_line[0]):
+            yield SnapshotEvent("remove", old_line[0], json.loads(old_line[2]), None)
+            old_line = next(old, None)
+        elif old_line is None or new_line[0] < old_line[0]:
+            yield SnapshotEvent("add", new_line[0], None, json.loads(new_line[2]))
+            new_line = next(new, None)
+        else:
+            if old_line[1] != new_line[1]:
+                yield SnapshotEvent(
+                    "change", new_line[0], json.loads(old_line[2]), json.loads(new_line[2])
+                )
+            old_line = next(old, None)
+            new_line = next(new, None)
+
+
+def changed_fields(event):
+    """ Return sorted names of the fields that differ between event.old and event.new. """
+    old = event.old or {}
+    new = event.new or {}
+    return sorted(field for field in set(old) | set(new) if old.get(field) != new.get(field))
+
+
+class SnapshotStore:
+    """ Directory of named snapshots, e.g. one per daily host pull.
+
+    """
+
+    SUFFIX = ".snapshot.gz"
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, name):
+        return os.path.join(self.directory, f"{name}{self.SUFFIX}")
+
+    def names(self):
+        """ Return snapshot names, oldest first (names sort by their timestamps). """
+        return sorted(
+            filename[: -len(self.SUFFIX)]
+            for filename in os.listdir(self.directory)
+            if filename.endswith(self.SUFFIX)
+        )
+
+    def latest(self):
+        """ Return name of the newest snapshot, or None. """
+        names = self.names()
+        return names[-1] if names else None
+
+    def save(self, records, name=None, key="id"):
+        """ Save dict records as snapshot name (default: current UTC timestamp), return name.
+
+        """
+        if name is None:
+            name = datetime.datetime.utcnow().strftime("%Y%m%dT%H%M%S%fZ")
+        count = write_snapshot(self.path(name), records, key)
+        logger.info("Saved snapshot %s with %d records.", name, count)
+        return name
+
+    def diff(self, old_name, new_name):
+        """ Yield SnapshotEvent for every difference from snapshot old_name to new_name. """
+        return diff_snapshots(self.path(old_name), self.path(new_name))
+
+    def delete(self, name):
+        os.remove(self.path(name))
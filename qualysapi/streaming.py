@@ -0,0 +1,69 @@
+""" Helpers for parsing large QualysGuard XML responses incrementally.
+
+Records are read with lxml.etree.iterparse and each parsed element is cleared
+(together with its already processed siblings) as soon as it has been turned
+into a compact record, so memory stays flat regardless of response size.
+"""
+import logging
+
+from lxml import etree
+
+from qualysapi.interning import encode_columns
+
+
+# Setup module level logging.
+logger = logging.getLogger(__name__)
+
+
+def iterparse_records(source, tag, make_record):
+    """ Yield make_record(element) for every element named tag in source.
+
+    source is a filename or a binary file-like object (e.g. a streamed response's raw).
+    """
+    for _, element in etree.iterparse(source, events=("end",), tag=tag, huge_tree=True):
+        yield make_record(element)
+        # Free the element and the siblings already processed before it.
+        element.clear()
+        parent = element.getparent()
+        if parent is not None:
+            while element.getprevious() is not None:
+                del parent[0]
+
+
+def findtext(element, path, convert=str):
+    """ Return convert(text) of path under element, or None if missing or empty.
+
+    """
+    text = element.findtext(path)
+    if text is None or text == "":
+        return None
+    return convert(text)
+
+
+def columnar_batches(records, batch_size, encoders=None):
+    """ Yield dicts mapping each field of namedtuple records to a list of batch_size values.
+
+    encoders optionally maps field names to DictionaryEncoders, whose integer codes
+    then replace the values of those fields.
+    """
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) >= batch_size:
+            yield encode_columns(_columns(batch), encoders or {})
+            batch = []
+    if batch:
+        yield encode_columns(_columns(batch), encoders or {})
+
+
+def _columns(batch):
+    return {field: [getattr(r, field) for r in batch] for field in batch[0]._fields}
+
+
+def raw_stream(response):
+    """ Return the decoded raw body of a streamed requests response for iterparse.
+
+    """
+    response.raise_for_status()
+    response.raw.decode_content = True
+    return response.raw
@@ -0,0 +1,108 @@
+""" Module providing an in-memory index of the Asset Management tag hierarchy.
+
+The index is loaded with one paginated search/am/tag pull (see
+QGActions.tagIndex) and answers children, subtree, ancestor and name lookups
+locally instead of one API call per tag. Later refreshes only pull tags
+updated since the newest modified date already indexed.
+"""
+import logging
+from collections import defaultdict, deque, namedtuple
+
+
+# Setup module level logging.
+logger = logging.getLogger(__name__)
+
+TagNode = namedtuple("TagNode", ["id", "name", "parent_id", "modified"])
+
+
+class TagIndex:
+    """ Parent/child adjacency index of Asset Management tags keyed by tag ID.
+
+    """
+
+    def __init__(self):
+        self.tags = {}
+        self._children = defaultdict(set)
+        self._names = defaultdict(set)
+        # Newest modified date seen, in the Portal API's ISO format.
+        self.last_modified = None
+
+    def __len__(self):
+        return len(self.tags)
+
+    def __contains__(self, tag_id):
+        return int(tag_id) in self.tags
+
+    def clear(self):
+        self.tags.clear()
+        self._children.clear()
+        self._names.clear()
+        self.last_modified = None
+
+    def _remove(self, tag_id):
+        node = self.tags.pop(tag_id)
+        self._children[node.parent_id].discard(tag_id)
+        self._names[node.name.lower()].discard(tag_id)
+
+    def add(self, node):
+        """ Add or replace a TagNode. """
+        if node.id in self.tags:
+            self._remove(node.id)
+        self.tags[node.id] = node
+        self._children[node.parent_id].add(node.id)
+        self._names[node.name.lower()].add(node.id)
+        if node.modified and (self.last_modified is None or node.modified > self.last_modified):
+            self.last_modified = node.modified
+
+    def update(self, records):
+        """ Merge Tag records (objectify elements from search/am/tag). Returns count merged.
+
+        """
+        count = 0
+        for record in records:
+            parent_id = record.find("parentTagId")
+            modified = record.find("modified")
+            self.add(
+                TagNode(
+                    int(record.id),
+                    str(record.find("name")),
+                    int(parent_id) if parent_id is not None else None,
+                    str(modified) if modified is not None else None,
+                )
+            )
+            count += 1
+        logger.debug("Merged %d tags into tag index.", count)
+        return count
+
+    def find(self, name):
+        """ Return list of TagNodes named name (case insensitive). """
+        return [self.tags[tag_id] for tag_id in sorted(self._names.get(name.lower(), ()))]
+
+    def children(self, tag_id):
+        """ Return list of direct child TagNodes of tag_id. """
+        return [self.tags[child] for child in sorted(self._children.get(int(tag_id), ()))]
+
+    def subtree(self, tag_id):
+        """ Return list of all descendant TagNodes of tag_id, breadth first. """
+        result = []
+        seen = {int(tag_id)}
+        queue = deque([int(tag_id)])
+        while queue:
+            for child in sorted(self._children.get(queue.popleft(), ())):
+                if child not in seen:
+                    seen.add(child)
+                    result.append(self.tags[child])
+                    queue.append(child)
+        return result
+
+    def ancestors(self, tag_id):
+        """ Return list of ancestor TagNodes of tag_id, nearest parent first. """
+        result = []
+        seen = {int(tag_id)}
+        node = self.tags.get(int(tag_id))
+        while node is not None and node.parent_id is not None and node.parent_id not in seen:
+            seen.add(node.parent_id)
+            node = self.tags.get(node.parent_id)
+            if node is not None:
+                result.append(node)
+        return result
@@ -3,6 +3,7 @@ import logging
 
 import qualysapi.config as qcconf
 import qualysapi.connector as qcconn
+import qualysapi.pool as qcpool
 import qualysapi.settings as qcs
 
 
@@ -25,14 +26,30 @@ def connect(
     hostname="qualysapi.qualys.com",
     max_retries="3",
     proxies=None,
+    singleflight=False,
+    timeouts=None,
+    use_session=None,
+    adaptive_paging=False,
 ):
     """ Return a QGAPIConnect object for v1 API pulling settings from config
     file.
+
+    timeouts are (connect, read) seconds, see qualysapi.connector.build_timeouts.
+    use_session logs in once via api/2.0/fo/session/ instead of sending Basic credentials
+    with every API v2 call; call close() on the connector to log out.
+    adaptive_paging tunes page sizes of paged pulls, see QGConnector.paging_metrics().
     """
     # Use function parameter login credentials.
     if username and password:
         connect = qcconn.QGConnector(
-            auth=(username, password), server=hostname, max_retries=max_retries, proxies=proxies
+            auth=(username, password),
+            server=hostname,
+            max_retries=max_retries,
+            proxies=proxies,
+            singleflight=singleflight,
+            timeouts=timeouts,
+            use_session=bool(use_session),
+            adaptive_paging=adaptive_paging,
         )
 
     # Retrieve login credentials from config file.
@@ -44,8 +61,22 @@ def connect(
             remember_me_always=remember_me_always,
         )
         connect = qcconn.QGConnector(
-            conf.get_auth(), conf.get_hostname(), conf.proxies, conf.max_retries
+            conf.get_auth(),
+            conf.get_hostname(),
+            conf.proxies,
+            conf.max_retries,
+            singleflight=singleflight,
+            timeouts=timeouts if timeouts is not None else conf.timeouts,
+            use_session=use_session if use_session is not None else conf.use_session,
+            adaptive_paging=adaptive_paging,
         )
 
     logger.info("Finished building connector.")
     return connect
+
+
+def connect_pool(config_file=qcs.default_filename, sections=None, **connector_kwargs):
+    """ Return a ConnectorPool with one connector per subscription section of config file.
+
+    """
+    return qcpool.ConnectorPool(config_file, sections, **connector_kwargs)
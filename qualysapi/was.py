@@ -0,0 +1,67 @@
+""" Compact record types and parsers for WAS findings and scan results.
+
+"""
+import logging
+from collections import namedtuple
+
+from qualysapi.interning import intern_value
+from qualysapi.streaming import findtext, iterparse_records
+
+
+# Setup module level logging.
+logger = logging.getLogger(__name__)
+
+WasFinding = namedtuple(
+    "WasFinding",
+    [
+        "id",
+        "unique_id",
+        "qid",
+        "name",
+        "type",
+        "severity",
+        "status",
+        "url",
+        "webapp_id",
+        "webapp_name",
+        "first_detected",
+        "last_detected",
+    ],
+)
+
+WasScanVuln = namedtuple("WasScanVuln", ["scan_id", "qid", "title", "uri", "param"])
+
+
+def finding_record(element):
+    """ Return WasFinding for a search/was/finding Finding element. """
+    return WasFinding(
+        findtext(element, "id", int),
+        findtext(element, "uniqueId"),
+        findtext(element, "qid", int),
+        findtext(element, "name", intern_value),
+        findtext(element, "type", intern_value),
+        findtext(element, "severity", int),
+        findtext(element, "status", intern_value),
+        findtext(element, "url"),
+        findtext(element, "webApp/id", int),
+        findtext(element, "webApp/name", intern_value),
+        findtext(element, "firstDetectedDate"),
+        findtext(element, "lastDetectedDate"),
+    )
+
+
+def iter_scan_vulns(source, scan_id=None):
+    """ Yield WasScanVuln for every WasScanVuln element of a download/was/wasscan/ XML.
+
+    """
+
+    def make_record(element):
+        return WasScanVuln(
+            scan_id,
+            findtext(element, "qid", int),
+            findtext(element, "title", intern_value),
+            findtext(element, "uri"),
+            findtext(element, "param"),
+        )
+
+    return iterparse_records(source, "WasScanVuln", make_record)
@@ -0,0 +1,84 @@
+import io
+
+import pytest
+import requests
+
+from qualysapi.api_objects import AssetGroup
+from qualysapi.connector import QGConnector
+
+
+class FakeConnector(QGConnector):
+    """ QGConnector answering request() and request_streaming() with canned responses.
+
+    responses is one response for every call, a list of responses served one per call
+    (e.g. pages), a dict of api_call -> response or list of responses, or a function of
+    (api_call, data) returning a response. A response is text or bytes, an exception to
+    raise or, for request_streaming, a ready requests.Response. Every call is recorded in
+    calls as (api_call, copy of data).
+    """
+
+    def __init__(self, responses="<SIMPLE_RETURN/>", **kwargs):
+        super().__init__(("user", "password"), **kwargs)
+        if isinstance(responses, dict):
+            responses = {
+                call: iter(response) if isinstance(response, list) else response
+                for call, response in responses.items()
+            }
+        elif isinstance(responses, list):
+            responses = iter(responses)
+        self.responses = responses
+        self.calls = []
+
+    def respond(self, api_call, data):
+        self.calls.append((api_call, dict(data) if isinstance(data, dict) else data))
+        response = self.responses
+        if isinstance(response, dict):
+            response = response[api_call]
+        if callable(response):
+            response = response(api_call, data)
+        elif not isinstance(response, (str, bytes)):
+            response = next(response)
+        if isinstance(response, BaseException):
+            raise response
+        return response
+
+    def request(self, api_call, data=None, *args, **kwargs):
+        with self._phase("request"):
+            return self.respond(api_call, data)
+
+    def request_streaming(self, api_call, data=None, *args, **kwargs):
+        response = self.respond(api_call, data)
+        if isinstance(response, requests.Response):
+            return response
+        return streamed(response)
+
+
+def streamed(body, status_code=200, headers=None, raw=io.BytesIO):
+    """ Return requests.Response streaming body (text or bytes) from raw(body bytes). """
+    response = requests.Response()
+    response.status_code = status_code
+    response.headers.update(headers or {})
+    response.raw = raw(body.encode("utf-8") if isinstance(body, str) else body)
+    return response
+
+
+@pytest.fixture
+def fake_connector():
+    """ FakeConnector class; call it with canned responses and QGConnector options. """
+    return FakeConnector
+
+
+@pytest.fixture
+def streamed_response():
+    """ streamed(): build a streamed requests.Response for FakeConnector responses. """
+    return streamed
+
+
+@pytest.fixture
+def make_group():
+    """ Return function building an AssetGroup from an ID and its scan IPs. """
+
+    def make(id, scanips, last_update="2020-01-01T00:00:00Z"):
+        return AssetGroup("High", id, last_update, scanips, [], [], f"group {id}")
+
+    return make
@@ -0,0 +1,53 @@
+import pytest
+
+
+def fail_on(ips):
+    # Reject the chunk sending exactly ips, accept every other one.
+    def respond(api_call, data):
+        return False if data["ips"] == ips else "<SIMPLE_RETURN/>"
+
+    return respond
+
+
+def test_large_range_lists_are_chunked(fake_connector):
+    # Every other address, so nothing collapses into a range.
+    ips = [f"10.0.{i // 128}.{i % 128 * 2}" for i in range(300)]
+    conn = fake_connector()
+    results = conn.addIPs(ips, max_length=100, max_workers=4)
+    chunks = [result.item for result in results]
+    assert len(chunks) > 1
+    assert all(
+        len(chunk) <= 100 and result.error is None for chunk, result in zip(chunks, results)
+    )
+    assert sorted(data["ips"] for _, data in conn.calls) == sorted(chunks)
+    sent = [ip for chunk in chunks for ip in chunk.split(",")]
+    assert sent == sorted(ips, key=lambda ip: tuple(map(int, ip.split("."))))
+
+
+def test_contiguous_ips_are_sent_as_ranges(fake_connector, tmp_path):
+    path = tmp_path / "ips.txt"
+    path.write_text("10.0.0.1\n10.0.0.2\n10.0.0.3\n\n192.168.0.0/30\n")
+    conn = fake_connector()
+    conn.addIPs(path)
+    assert [data["ips"] for _, data in conn.calls] == [
+        "10.0.0.1-10.0.0.3,192.168.0.0-192.168.0.3"
+    ]
+
+
+@pytest.mark.parametrize("vmpc, flags", [("vm", (1, 0)), ("pc", (0, 1)), ("both", (1, 1))])
+def test_vmpc_flags(fake_connector, vmpc, flags):
+    conn = fake_connector()
+    conn.addIPs("10.0.0.1", vmpc=vmpc)
+    assert (conn.calls[0][1]["enable_vm"], conn.calls[0][1]["enable_pc"]) == flags
+
+
+def test_failed_chunk_is_reported(fake_connector):
+    conn = fake_connector(fail_on("10.0.0.3"))
+    results = conn.addIPs("10.0.0.1,10.0.0.3", max_length=8)
+    assert [result.item for result in results] == ["10.0.0.1", "10.0.0.3"]
+    assert results[0].error is None
+    assert isinstance(results[1].error, ValueError)
+
+
+if __name__ == "__main__":
+    pytest.main(args=["-vv", "tests/"])
@@ -0,0 +1,41 @@
+import pytest
+
+
+def test_batched_edits(fake_connector, make_group):
+    group = make_group(1, ["10.0.0.1-10.0.0.10"])
+    group.queueAdd(f"10.0.1.{i}" for i in range(256))
+    group.queueAdd("10.0.2.1")
+    group.queueRemove(["10.0.0.5", "10.0.2.1"])
+    conn = fake_connector()
+    assert group.flush(conn) == 1
+    edit = conn.calls[0][1]
+    assert edit["add_ips"] == "10.0.1.0-10.0.1.255"
+    assert edit["remove_ips"] == "10.0.0.5,10.0.2.1"
+    assert group.scanips == ["10.0.0.1-10.0.0.4", "10.0.0.6-10.0.0.10", "10.0.1.0-10.0.1.255"]
+    assert not group.hasPendingEdits()
+
+
+def test_failed_flush_keeps_edits_queued(fake_connector, make_group):
+    group = make_group(1, ["10.0.0.1"])
+    group.queueAdd("10.0.1.1,10.0.2.1,10.0.3.1")
+    with pytest.raises(ValueError):
+        group.flush(fake_connector(["<SIMPLE_RETURN/>", False]), max_length=10)
+    # The first chunk was accepted, the failed one and the rest are sent again.
+    assert group.scanips == ["10.0.0.1", "10.0.1.1"]
+    conn = fake_connector()
+    assert group.flush(conn, max_length=10) == 2
+    assert [data["add_ips"] for _, data in conn.calls] == ["10.0.2.1", "10.0.3.1"]
+    assert group.scanips == ["10.0.0.1", "10.0.1.1", "10.0.2.1", "10.0.3.1"]
+    assert not group.hasPendingEdits()
+
+
+def test_set_assets_normalises_scanips(fake_connector, make_group):
+    group = make_group(1, ["10.0.0.1"])
+    conn = fake_connector()
+    group.setAssets(conn, ["10.0.0.3", "10.0.0.0/31", "10.0.0.2"])
+    assert conn.calls[0][1]["set_ips"] == "10.0.0.0-10.0.0.3"
+    assert group.scanips == ["10.0.0.0-10.0.0.3"]
+
+
+if __name__ == "__main__":
+    pytest.main(args=["-vv", "tests/"])
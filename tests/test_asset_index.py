@@ -0,0 +1,43 @@
+import pytest
+
+from qualysapi.asset_index import AssetGroupIndex
+from qualysapi.ip_ranges import collapse_ranges, format_ip_range, iter_ip_ranges
+
+
+def test_collapse_ranges():
+    ranges = collapse_ranges(iter_ip_ranges("10.0.0.3,10.0.0.1-10.0.0.2,10.0.0.5,10.0.1.0/24"))
+    assert [format_ip_range(*r) for r in ranges] == [
+        "10.0.0.1-10.0.0.3",
+        "10.0.0.5",
+        "10.0.1.0-10.0.1.255",
+    ]
+
+
+def test_overlapping_groups(make_group):
+    index = AssetGroupIndex(
+        [
+            make_group(1, ["10.0.0.1-10.0.0.255"]),
+            make_group(2, ["10.0.0.128-10.0.1.10", "2001:db8::1"]),
+            make_group(3, ["192.168.1.1"]),
+        ]
+    )
+    assert index.group_ids_for("10.0.0.5") == {1}
+    assert index.group_ids_for("10.0.0.200") == {1, 2}
+    assert index.group_ids_for("10.0.1.10") == {2}
+    assert index.group_ids_for("10.0.1.11") == set()
+    assert index.group_ids_for("2001:db8::1") == {2}
+    assert [g.id for g in index.groups_for("192.168.1.1")] == [3]
+
+
+def test_incremental_update(make_group):
+    index = AssetGroupIndex([make_group(1, ["10.0.0.1"]), make_group(2, ["10.0.0.2"])])
+    changed = index.update(
+        [make_group(1, ["10.0.0.1"]), make_group(3, ["10.0.0.1"], "2020-02-01T00:00:00Z")]
+    )
+    assert changed == 2
+    assert index.group_ids_for("10.0.0.1") == {1, 3}
+    assert index.group_ids_for("10.0.0.2") == set()
+
+
+if __name__ == "__main__":
+    pytest.main(args=["-vv", "tests/"])
@@ -0,0 +1,59 @@
+import io
+import time
+import zipfile
+
+import pytest
+import requests
+
+from qualysapi.cassette import Cassette, CassetteMiss
+from qualysapi.connector import QGConnector
+from qualysapi.host_store import HostStore
+
+
+HOST_LIST = b"""<HOST_LIST_OUTPUT><RESPONSE><HOST_LIST>
+<HOST><ID>1</ID><IP>10.0.0.1</IP><TRACKING_METHOD>IP</TRACKING_METHOD></HOST>
+</HOST_LIST></RESPONSE></HOST_LIST_OUTPUT>"""
+
+
+class LiveSession(requests.Session):
+    """ Stands in for the network while recording. """
+
+    def post(self, url, data=None, **kwargs):
+        response = requests.Response()
+        response.status_code = 200
+        response.url = url
+        response.headers["x-ratelimit-remaining"] = "42"
+        response.headers["Set-Cookie"] = "QualysSession=secret; path=/api"
+        if url.endswith("/session/"):
+            response.cookies.set("QualysSession", "secret")
+            self.cookies.set("QualysSession", "secret")
+            response.raw = io.BytesIO(b"<SIMPLE_RETURN>Logged in</SIMPLE_RETURN>")
+        else:
+            response.raw = io.BytesIO(HOST_LIST)
+        return response
+
+
+def test_record_then_replay_offline(tmp_path):
+    path = str(tmp_path / "hosts.cassette")
+    with Cassette(path, "record") as cassette:
+        conn = QGConnector(("jerry", "I<3Elaine"), use_session=True, cassette=cassette)
+        conn.session = LiveSession()
+        recorded = conn.syncHosts(HostStore())
+
+    with zipfile.ZipFile(path) as archive:
+        content = b"".join(archive.read(name) for name in archive.namelist())
+    assert b"I<3Elaine" not in content and b"secret" not in content
+
+    with Cassette(path, latency=0.05) as cassette:
+        conn = QGConnector(("jerry", "wrong"), use_session=True, cassette=cassette)
+        started = time.monotonic()
+        assert conn.syncHosts(HostStore()) == recorded == 1
+        # Login and one page, each delayed.
+        assert time.monotonic() - started >= 0.1
+        assert conn.rate_limit_remaining["/api/2.0/fo/asset/host/"] == 42
+        with pytest.raises(CassetteMiss):
+            conn.request("/api/2.0/fo/scan/", {"action": "list"})
+
+
+if __name__ == "__main__":
+    pytest.main(args=["-vv", "tests/"])
@@ -0,0 +1,69 @@
+import json
+
+import pytest
+
+from qualysapi.checkpoint import Checkpoint
+from qualysapi.host_store import HostStore
+
+
+PAGE = """<HOST_LIST_OUTPUT><RESPONSE><HOST_LIST>
+<HOST><ID>{id}</ID><IP>10.0.0.{id}</IP><TRACKING_METHOD>IP</TRACKING_METHOD></HOST>
+</HOST_LIST>{warning}</RESPONSE></HOST_LIST_OUTPUT>"""
+
+WARNING = """<WARNING><CODE>1980</CODE><URL>
+https://qualysapi.qualys.com/api/2.0/fo/asset/host/?action=list&amp;id_min=2</URL></WARNING>"""
+
+
+def host_pages(fail_on_page=None):
+    # Serve two host list pages chained by id_min, failing on the second one if asked.
+    def respond(api_call, data):
+        if "id_min" not in data:
+            return PAGE.format(id=1, warning=WARNING)
+        if fail_on_page == 2:
+            return IOError("connection reset")
+        return PAGE.format(id=2, warning="")
+
+    return respond
+
+
+def test_export_resumes_from_checkpoint(fake_connector, tmp_path):
+    filename = str(tmp_path / "hosts.jsonl")
+    with pytest.raises(IOError):
+        fake_connector(host_pages(2)).exportHosts(filename)
+
+    conn = fake_connector(host_pages(None))
+    assert conn.exportHosts(filename) == 1
+    # Only the failed page was requested again and nothing was written twice.
+    assert [data.get("id_min") for _, data in conn.calls] == ["2"]
+    with open(filename) as f:
+        assert [json.loads(line)["id"] for line in f] == [1, 2]
+    state = Checkpoint(filename + ".checkpoint")._read()
+    assert state["done"] and state["pages"] == 2
+
+
+def test_sync_resumes_with_original_start(fake_connector, tmp_path):
+    path = str(tmp_path / "sync.checkpoint")
+    store = HostStore()
+    with pytest.raises(IOError):
+        fake_connector(host_pages(2)).syncHosts(store, checkpoint=Checkpoint(path))
+    started = Checkpoint(path)._read()["extra"]["started"]
+    assert started.endswith("Z")
+
+    assert fake_connector(host_pages(None)).syncHosts(store, checkpoint=Checkpoint(path)) == 1
+    # The high-water mark is when the interrupted sync first started.
+    assert store.high_water_mark == started
+    assert len(store) == 2
+
+
+def test_changed_parameters_start_over(tmp_path):
+    checkpoint = Checkpoint(str(tmp_path / "state"))
+    checkpoint.begin("/api/2.0/fo/asset/host/", {"details": "All"})
+    checkpoint.advance("100")
+    assert checkpoint.begin("/api/2.0/fo/asset/host/", {"details": "All"}) == "100"
+    assert checkpoint.resumed
+    assert checkpoint.begin("/api/2.0/fo/asset/host/", {"details": "Basic"}) is None
+    assert not checkpoint.resumed
+
+
+if __name__ == "__main__":
+    pytest.main(args=["-vv", "tests/"])
@@ -0,0 +1,115 @@
+import io
+
+import pytest
+
+from qualysapi.compliance import ComplianceIndex, iter_posture_info
+
+
+WARNING = """<WARNING><CODE>1980</CODE><URL>
+https://qualysapi.qualys.com/api/2.0/fo/compliance/posture/info/?action=list&amp;id_min={id_min}
+</URL></WARNING>"""
+
+CONTROLS = """<CONTROL_LIST>
+<CONTROL><ID>10</ID><STATEMENT>Password length</STATEMENT>
+<CRITICALITY><LABEL>SERIOUS</LABEL><VALUE>3</VALUE></CRITICALITY></CONTROL>
+<CONTROL><ID>11</ID><STATEMENT>Audit logging</STATEMENT>
+<CRITICALITY><LABEL>CRITICAL</LABEL><VALUE>4</VALUE></CRITICALITY></CONTROL>
+</CONTROL_LIST>"""
+
+GLOSSARY = f"""<GLOSSARY>{CONTROLS}
+<TECHNOLOGY_LIST><TECHNOLOGY><ID>5</ID><NAME>Linux</NAME></TECHNOLOGY></TECHNOLOGY_LIST>
+</GLOSSARY>"""
+
+INFO = """<INFO><ID>{id}</ID><HOST_ID>{host}</HOST_ID><CONTROL_ID>{control}</CONTROL_ID>
+<TECHNOLOGY_ID>5</TECHNOLOGY_ID><INSTANCE>os</INSTANCE><STATUS>{status}</STATUS>
+<POSTURE_MODIFIED_DATE>2020-01-01T00:00:00Z</POSTURE_MODIFIED_DATE></INFO>"""
+
+POSTURE_PAGES = [
+    f"""<POSTURE_INFO_LIST_OUTPUT><RESPONSE><INFO_LIST>
+{INFO.format(id=1, host=100, control=10, status="Passed")}
+{INFO.format(id=2, host=100, control=11, status="Failed")}
+</INFO_LIST>{GLOSSARY}{WARNING.format(id_min=3)}</RESPONSE></POSTURE_INFO_LIST_OUTPUT>""",
+    f"""<POSTURE_INFO_LIST_OUTPUT><RESPONSE><INFO_LIST>
+{INFO.format(id=3, host=101, control=10, status="Passed")}
+</INFO_LIST>{GLOSSARY}</RESPONSE></POSTURE_INFO_LIST_OUTPUT>""",
+]
+
+POLICY_LIST = """<POLICY_LIST_OUTPUT><RESPONSE><POLICY_LIST>
+<POLICY><ID>1</ID><TITLE>Linux baseline</TITLE></POLICY>
+<POLICY><ID>2</ID><TITLE>Windows baseline</TITLE></POLICY>
+</POLICY_LIST></RESPONSE></POLICY_LIST_OUTPUT>"""
+
+CONTROL_LIST = f"<CONTROL_LIST_OUTPUT><RESPONSE>{CONTROLS}</RESPONSE></CONTROL_LIST_OUTPUT>"
+
+
+def compliance_responses(api_call, data):
+    # Serve posture info pages by id_min and the policy and control lists.
+    if api_call.endswith("/policy/"):
+        return POLICY_LIST
+    if api_call.endswith("/control/"):
+        return CONTROL_LIST
+    return POSTURE_PAGES[1 if "id_min" in data else 0]
+
+
+def test_iter_posture_info_files_glossary_once():
+    index = ComplianceIndex()
+    records = iter_posture_info(io.BytesIO(POSTURE_PAGES[0].encode()), 7, index)
+    info = []
+    with pytest.raises(StopIteration) as stop:
+        while True:
+            info.append(next(records))
+    # The next page's id_min is the generator's return value.
+    assert stop.value.value == "3"
+    assert [(r.id, r.policy_id, r.host_id, r.control_id, r.status) for r in info] == [
+        (1, 7, 100, 10, "Passed"),
+        (2, 7, 100, 11, "Failed"),
+    ]
+    assert index.controls[11].statement == "Audit logging"
+    assert index.controls[11].criticality == "CRITICAL"
+    assert index.technologies == {5: "Linux"}
+    # Interned values are shared between records.
+    assert info[0].instance is info[1].instance
+
+
+def test_iter_posture_info_follows_pages(fake_connector):
+    conn = fake_connector(compliance_responses)
+    index = ComplianceIndex()
+    records = list(conn.iterPostureInfo(7, index, hosts="10.0.0.1", limit=2))
+    assert [r.id for r in records] == [1, 2, 3]
+    assert [call[1].get("id_min") for call in conn.calls] == [None, "3"]
+    assert conn.calls[0][1]["ips"] == "10.0.0.1"
+    assert conn.calls[0][1]["truncation_limit"] == "2"
+    assert index.controls[records[2].control_id].statement == "Password length"
+
+
+def test_compliance_index(fake_connector):
+    conn = fake_connector(compliance_responses)
+    index = conn.complianceIndex()
+    assert index.policies == {1: "Linux baseline", 2: "Windows baseline"}
+    assert sorted(index.controls) == [10, 11]
+    assert [call[0] for call in conn.calls] == [
+        "/api/2.0/fo/compliance/policy/",
+        "/api/2.0/fo/compliance/control/",
+    ]
+    assert not conn.complianceIndex(controls=False).controls
+
+
+def test_pull_posture_info(fake_connector):
+    conn = fake_connector(compliance_responses)
+    index = ComplianceIndex()
+    records = []
+    results = conn.pullPostureInfo([7, 8], records.append, index, max_workers=2)
+    assert [(r.item, r.result, r.error) for r in results] == [(7, 3, None), (8, 3, None)]
+    assert sorted((r.policy_id, r.id) for r in records) == [
+        (7, 1),
+        (7, 2),
+        (7, 3),
+        (8, 1),
+        (8, 2),
+        (8, 3),
+    ]
+    assert sorted(index.controls) == [10, 11]
+
+
+if __name__ == "__main__":
+    pytest.main(args=["-vv", "tests/"])
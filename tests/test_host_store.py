@@ -0,0 +1,125 @@
+import datetime
+
+import pytest
+
+from qualysapi.host_store import HostStore
+
+
+HOST_LIST = """<HOST_LIST_OUTPUT><RESPONSE><HOST_LIST>
+<HOST><ID>1</ID><IP>10.0.0.1</IP><TRACKING_METHOD>IP</TRACKING_METHOD><DNS>web01</DNS>
+<NETBIOS>WEB01</NETBIOS><OS>Linux 3.10</OS>
+<LAST_VULN_SCAN_DATETIME>2020-01-01T10:00:00Z</LAST_VULN_SCAN_DATETIME></HOST>
+<HOST><ID>2</ID><IP>10.0.0.2</IP><TRACKING_METHOD>IP</TRACKING_METHOD><DNS>db01</DNS>
+<NETBIOS>DB01</NETBIOS><OS>Windows 2016</OS></HOST>
+</HOST_LIST></RESPONSE></HOST_LIST_OUTPUT>"""
+
+
+def test_store_queries(fake_connector):
+    conn = fake_connector(HOST_LIST, host_store=HostStore())
+    conn.listHosts(detailed=True)
+    store = conn.host_store
+    assert len(store) == 2
+    assert store.get(1).dns == "web01"
+    assert [h.id for h in store.find_by_netbios("DB01")] == [2]
+    assert [h.id for h in store.find_by_os("Windows%")] == [2]
+    assert str(store.get(1).last_scan) == "2020-01-01 10:00:00"
+    assert store.get(2).last_scan == "never"
+
+
+def test_get_host_served_from_store(fake_connector):
+    conn = fake_connector(HOST_LIST, host_store=HostStore())
+    conn.listHosts(detailed=True)
+    assert conn.getHost("10.0.0.2").id == 2
+    assert len(conn.calls) == 1
+    # Expired records fall back to the API.
+    conn.getHost("10.0.0.2", max_age=-1)
+    assert len(conn.calls) == 2
+
+
+def test_partial_pulls_do_not_replace_stored_hosts(fake_connector):
+    conn = fake_connector(HOST_LIST, host_store=HostStore())
+    conn.listHosts(detailed=True)
+    # Without details=All the response has no LAST_VULN_SCAN_DATETIME.
+    conn.listHosts()
+    conn.getHostRange("10.0.0.1", "10.0.0.2")
+    assert str(conn.getHost("10.0.0.1").last_scan) == "2020-01-01 10:00:00"
+    assert len(conn.calls) == 3
+
+
+SCAN_LIST = """<SCAN_LIST_OUTPUT><RESPONSE><SCAN_LIST>
+<SCAN><REF>scan/1.1</REF><TYPE>On-Demand</TYPE><TITLE>Weekly</TITLE><USER_LOGIN>admin</USER_LOGIN>
+<LAUNCH_DATETIME>2020-01-01T10:00:00Z</LAUNCH_DATETIME><DURATION>00:10:00</DURATION>
+<PROCESSED>1</PROCESSED><STATUS><STATE>Finished</STATE></STATUS>
+<TARGET>10.0.0.1, 10.0.0.2</TARGET><ASSET_GROUP_TITLE_LIST>
+<ASSET_GROUP_TITLE>Servers</ASSET_GROUP_TITLE></ASSET_GROUP_TITLE_LIST></SCAN>
+<SCAN><REF>scan/1.2</REF><TYPE>Scheduled</TYPE><TITLE>Daily</TITLE><USER_LOGIN>admin</USER_LOGIN>
+<LAUNCH_DATETIME>2020-01-02T10:00:00Z</LAUNCH_DATETIME><DURATION>Pending</DURATION>
+<PROCESSED>0</PROCESSED><STATUS><STATE>Running</STATE></STATUS><TARGET>10.0.0.3</TARGET></SCAN>
+</SCAN_LIST></RESPONSE></SCAN_LIST_OUTPUT>"""
+
+
+def test_scans_round_trip(fake_connector):
+    conn = fake_connector(SCAN_LIST, host_store=HostStore())
+    listed = conn.listScans()
+    store = conn.host_store
+    scan = store.get_scan("scan/1.1")
+    for field in ("ref", "title", "type", "status", "target", "user_login", "processed"):
+        assert getattr(scan, field) == getattr(listed[0], field)
+    assert scan.launch_datetime == datetime.datetime(2020, 1, 1, 10, 0, 0)
+    assert scan.assetgroups == ["Servers"]
+    assert [s.ref for s in store.scans()] == ["scan/1.1", "scan/1.2"]
+    assert [s.ref for s in store.scans(status="Running")] == ["scan/1.2"]
+    assert store.get_scan("scan/9.9") is None
+    assert store.scans(max_age=-1) == []
+
+
+def test_sync_high_water_mark(fake_connector):
+    store = HostStore()
+    conn = fake_connector(HOST_LIST)
+    assert conn.syncHosts(store) == 2
+    high_water_mark = store.high_water_mark
+    assert high_water_mark
+    conn.syncHosts(store)
+    assert conn.calls[-1][1]["vm_processed_after"] == high_water_mark
+
+
+def test_sync_rejects_non_delta_filters(fake_connector):
+    with pytest.raises(ValueError):
+        fake_connector(HOST_LIST).syncHosts(HostStore(), since_filter="no_vm_scan_since")
+
+
+def test_get_hosts_batches_lookups(fake_connector):
+    conn = fake_connector(HOST_LIST, host_store=HostStore())
+    hosts = conn.getHosts(["10.0.0.1", "10.0.0.2", "10.0.0.3"])
+    assert conn.calls[0][1]["ips"] == "10.0.0.1-10.0.0.3"
+    assert hosts["10.0.0.1"].id == 1
+    assert hosts["10.0.0.2"].id == 2
+    assert hosts["10.0.0.3"] is None
+    # Known hosts now come from the store, only the miss is requested again.
+    conn.getHosts(["10.0.0.1", "10.0.0.3"])
+    assert conn.calls[1][1]["ips"] == "10.0.0.3"
+
+
+def test_get_hosts_skips_hosts_without_ip(fake_connector):
+    conn = fake_connector(HOST_LIST.replace("<IP>10.0.0.1</IP>", ""), host_store=HostStore())
+    hosts = conn.getHosts(["10.0.0.1", "10.0.0.2"])
+    assert hosts["10.0.0.1"] is None
+    assert hosts["10.0.0.2"].id == 2
+
+
+def test_not_scanned_since_cutoff(fake_connector, monkeypatch):
+    class Today(datetime.date):
+        @classmethod
+        def today(cls):
+            return cls(2020, 3, 10)
+
+    monkeypatch.setattr(datetime, "date", Today)
+    conn = fake_connector(HOST_LIST)
+    hosts = conn.notScannedSince(30)
+    # Hosts last scanned exactly 30 days ago (February 9th) are included.
+    assert conn.calls[0][1]["no_vm_scan_since"] == "2020-02-10"
+    assert [host.id for host in hosts] == [1]
+
+
+if __name__ == "__main__":
+    pytest.main(args=["-vv", "tests/"])
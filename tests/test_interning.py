@@ -0,0 +1,65 @@
+import pytest
+from lxml import objectify
+
+from qualysapi.api_objects import AssetGroup, Host, Scan
+from qualysapi.interning import DictionaryEncoder, encode_columns, intern_value
+
+
+def fresh(value):
+    # Build an equal str that is not the same object as value.
+    return "".join(list(value))
+
+
+def test_intern_value_shares_identity():
+    first, second = fresh("Windows 2016"), fresh("Windows 2016")
+    assert first is not second
+    assert intern_value(first) is intern_value(second)
+    assert intern_value(None) is None
+    assert intern_value(3) == "3"
+
+
+def test_dictionary_encoder_round_trip():
+    encoder = DictionaryEncoder()
+    values = ["Linux", "Windows", "Linux", None, "Windows"]
+    codes = [encoder.encode(value) for value in values]
+    assert codes == [0, 1, 0, 2, 1]
+    assert [encoder.decode(code) for code in codes] == values
+    assert len(encoder) == 3
+    columns = encode_columns({"os": ["Windows", "Solaris"], "id": [1, 2]}, {"os": encoder})
+    assert columns == {"os": [1, 3], "id": [1, 2]}
+
+
+def test_records_intern_low_cardinality_fields():
+    hosts = [
+        Host("web", i, f"10.0.0.{i}", "", "WEB", fresh("Linux 3.10"), fresh("IP")) for i in (1, 2)
+    ]
+    assert hosts[0].os is hosts[1].os
+    assert hosts[0].tracking_method is hosts[1].tracking_method
+    groups = [AssetGroup(fresh("High"), i, "", [], [], [], "group") for i in (1, 2)]
+    assert groups[0].business_impact is groups[1].business_impact
+    status = objectify.fromstring("<STATUS><STATE>Finished</STATE></STATUS>")
+    scans = [
+        Scan(
+            "",
+            "00:10:00",
+            "2020-01-01T00:00:00Z",
+            fresh("Initial Options"),
+            1,
+            f"scan/{i}",
+            status,
+            fresh("10.0.0.1, 10.0.0.2"),
+            "title",
+            fresh("On-Demand"),
+            fresh("admin"),
+        )
+        for i in (1, 2)
+    ]
+    assert scans[0].option_profile is scans[1].option_profile
+    assert scans[0].status is scans[1].status
+    assert scans[0].target[1] is scans[1].target[1]
+    assert scans[0].type is scans[1].type
+    assert scans[0].user_login is scans[1].user_login
+
+
+if __name__ == "__main__":
+    pytest.main(args=["-vv", "tests/"])
@@ -0,0 +1,100 @@
+import io
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+import requests
+
+import qualysapi.settings as qcs
+from qualysapi.connector import QGConnector
+from qualysapi.memory_budget import MemoryBudget
+
+BODY = b"<SIMPLE_RETURN>" + b"x" * 45 + b"</SIMPLE_RETURN>"
+
+
+class SlowBody(io.BytesIO):
+    def read(self, *args):
+        time.sleep(0.01)
+        return super().read(*args)
+
+
+class SlowSession(requests.Session):
+    """ Serves BODY slowly, with Content-Length unless chunked. """
+
+    def __init__(self, chunked=False):
+        super().__init__()
+        self.chunked = chunked
+
+    def post(self, url, data=None, **kwargs):
+        response = requests.Response()
+        response.status_code = 200
+        if self.chunked:
+            response.headers["Transfer-Encoding"] = "chunked"
+        else:
+            response.headers["Content-Length"] = str(len(BODY))
+        response.raw = SlowBody(BODY)
+        return response
+
+
+def test_budget_admits_by_size_and_never_starves_large_calls():
+    budget = MemoryBudget(100)
+    first, second, large = budget.reserve(), budget.reserve(), budget.reserve()
+    assert first.resize(60)
+    assert not second.resize(60, block=False)
+    assert not second.resize(60, timeout=0.01)
+    first.release()
+    # Alone in flight, a call larger than the whole budget is still admitted.
+    assert large.resize(500, block=False)
+    assert not second.resize(1, block=False)
+    large.release()
+    assert budget.in_use == 0 and budget.peak == 500
+
+
+def test_concurrent_requests_stay_within_budget():
+    conn = QGConnector(("user", "password"), memory_budget=len(BODY) * 2)
+    conn.session = SlowSession()
+    with ThreadPoolExecutor(max_workers=6) as executor:
+        texts = list(
+            executor.map(
+                lambda _: conn.request("/api/2.0/fo/scan/", {"action": "list"}), range(6)
+            )
+        )
+    assert texts == [BODY.decode()] * 6
+    assert conn.memory_budget.peak <= len(BODY) * 2
+    assert conn.memory_budget.waits > 0
+    assert conn.memory_budget.in_use == 0
+
+
+def test_chunked_responses_wait_for_budget(monkeypatch):
+    monkeypatch.setattr(qcs, "stream_chunk_size", 16)
+    conn = QGConnector(("user", "password"), memory_budget=len(BODY) * 2)
+    conn.session = SlowSession(chunked=True)
+    with ThreadPoolExecutor(max_workers=6) as executor:
+        texts = list(
+            executor.map(
+                lambda _: conn.request("/api/2.0/fo/scan/", {"action": "list"}), range(6)
+            )
+        )
+    assert texts == [BODY.decode()] * 6
+    # Only the oldest call in flight may overrun the budget, by the rest of its body.
+    assert conn.memory_budget.peak <= len(BODY) * 3
+    assert conn.memory_budget.waits > 0
+    assert conn.memory_budget.in_use == 0
+
+
+def test_spooled_response_spills_when_budget_is_taken():
+    conn = QGConnector(("user", "password"), memory_budget=100)
+    conn.session = SlowSession()
+    other = conn.memory_budget.reserve()
+    other.resize(90)
+    buffer = conn.request_spooled("/api/2.0/fo/scan/", {"action": "list"})
+    assert not isinstance(buffer, io.BytesIO)
+    assert buffer.read() == BODY
+    other.release()
+    buffer = conn.request_spooled("/api/2.0/fo/scan/", {"action": "list"})
+    assert isinstance(buffer, io.BytesIO)
+    assert conn.memory_budget.in_use == 0
+
+
+if __name__ == "__main__":
+    pytest.main(args=["-vv", "tests/"])
@@ -0,0 +1,37 @@
+import pytest
+
+from qualysapi.host_store import HostStore
+from qualysapi.paging import AdaptivePager
+
+
+PAGE = """<HOST_LIST_OUTPUT><RESPONSE><HOST_LIST>
+<HOST><ID>1</ID><IP>10.0.0.1</IP><TRACKING_METHOD>IP</TRACKING_METHOD></HOST>
+</HOST_LIST>{warning}</RESPONSE></HOST_LIST_OUTPUT>"""
+
+WARNING = """<WARNING><CODE>1980</CODE><URL>
+https://qualysapi.qualys.com/api/2.0/fo/asset/host/?action=list&amp;id_min={id_min}</URL></WARNING>"""
+
+
+def test_pager_tracks_target_duration_and_size():
+    pager = AdaptivePager(1000, minimum=100, maximum=100000, target_seconds=10, max_bytes=10**6)
+    # Fast, small pages grow, but at most twice per page.
+    assert pager.observe(1000, 1.0, 1000) == 2000
+    # Slow pages shrink toward the target duration.
+    assert pager.observe(2000, 40.0, 1000) == 1000
+    # Heavy pages shrink below the size ceiling.
+    assert pager.observe(1000, 1.0, 2 * 10**6) == 500
+    metrics = pager.metrics()
+    assert metrics["size"] == 500 and metrics["largest"] == 2000 and metrics["pages"] == 3
+
+
+def test_pages_use_adaptive_truncation_limit(fake_connector):
+    pages = [PAGE.format(warning=WARNING.format(id_min=id_min)) for id_min in (2, 3)]
+    conn = fake_connector(pages + [PAGE.format(warning="")], adaptive_paging=True)
+    assert conn.syncHosts(HostStore(), limit=1000) == 3
+    # Quick pages double the page size until the last one.
+    assert [data["truncation_limit"] for _, data in conn.calls] == ["1000", "2000", "4000"]
+    assert conn.paging_metrics()["/api/2.0/fo/asset/host/"]["pages"] == 2
+
+
+if __name__ == "__main__":
+    pytest.main(args=["-vv", "tests/"])
@@ -0,0 +1,57 @@
+import threading
+import time
+
+import pytest
+
+from qualysapi.connector import QGConnector
+
+
+def split(payload):
+    return payload.split(",")
+
+
+def test_pipeline_fetches_parses_and_sinks_everything():
+    conn = QGConnector(("user", "password"))
+    pipeline = conn.pipeline(fetch=lambda i: f"{i}a,{i}b", parse=split, fetch_workers=3)
+    records = []
+    assert pipeline.run(range(10), records.append) == 20
+    assert sorted(records) == sorted(f"{i}{c}" for i in range(10) for c in "ab")
+
+
+def test_slow_consumer_throttles_fetching():
+    conn = QGConnector(("user", "password"))
+    fetched = []
+    lock = threading.Lock()
+
+    def fetch(i):
+        with lock:
+            fetched.append(i)
+        return str(i)
+
+    pipeline = conn.pipeline(fetch=fetch, parse=split, fetch_workers=1, queue_size=2)
+    records = pipeline.iterate(range(100))
+    next(records)
+    time.sleep(0.2)
+    # Only the bounded queues' worth of items were fetched ahead of the consumer.
+    assert len(fetched) < 10
+    records.close()
+
+
+def test_stage_errors_are_raised_to_consumer():
+    def parse(payload):
+        raise ValueError("bad page")
+
+    pipeline = QGConnector(("user", "password")).pipeline(parse=parse)
+    with pytest.raises(ValueError):
+        pipeline.run(["page"], print)
+
+
+def test_parse_in_processes():
+    pipeline = QGConnector(("user", "password")).pipeline(
+        parse=split, parse_workers=2, processes=True
+    )
+    assert sorted(pipeline.iterate(["a,b", "c"])) == ["a", "b", "c"]
+
+
+if __name__ == "__main__":
+    pytest.main(args=["-vv", "tests/"])
@@ -0,0 +1,101 @@
+import os
+import threading
+import time
+
+import pytest
+
+from qualysapi import connect_pool
+
+
+CONFIG = """[tenant_a]
+hostname = qualysapi.qualys.com
+username = a
+password = a
+
+[tenant_b]
+hostname = qualysapi.qg2.apps.qualys.com
+username = b
+password = b
+read_timeout = 60
+
+[proxy]
+proxy_url = proxy.mycorp.com
+"""
+
+
+@pytest.fixture
+def config_file(tmp_path):
+    path = tmp_path / "pool.qcrc"
+    path.write_text(CONFIG)
+    os.chmod(path, 0o600)
+    return str(path)
+
+
+def test_pool_builds_connector_per_section(config_file):
+    with connect_pool(config_file) as pool:
+        assert sorted(pool.connectors) == ["tenant_a", "tenant_b"]
+        assert pool["tenant_b"].server == "qualysapi.qg2.apps.qualys.com"
+        assert pool["tenant_b"].auth == ("b", "b")
+        assert pool["tenant_b"].timeouts[2][1] == 60
+        assert pool["tenant_a"].proxies == {"https": "https://proxy.mycorp.com:443"}
+        results = pool.map(lambda conn: conn.server)
+    assert [(r.subscription, r.result) for r in results] == [
+        ("tenant_a", "qualysapi.qualys.com"),
+        ("tenant_b", "qualysapi.qg2.apps.qualys.com"),
+    ]
+
+
+def test_tasks_respect_subscription_concurrency_limit(config_file):
+    pool = connect_pool(config_file)
+    pool["tenant_a"].concurrency_limit = 1
+    active = {"tenant_a": 0, "tenant_b": 0}
+    peak = dict(active)
+    lock = threading.Lock()
+
+    def task(conn, item):
+        subscription = "tenant_a" if conn is pool["tenant_a"] else "tenant_b"
+        with lock:
+            active[subscription] += 1
+            peak[subscription] = max(peak[subscription], active[subscription])
+        time.sleep(0.02)
+        with lock:
+            active[subscription] -= 1
+        if item == 3:
+            raise ValueError(item)
+        return item
+
+    tasks = [(s, i) for i in range(4) for s in ("tenant_a", "tenant_b")]
+    results = pool.map_tasks(task, tasks, max_workers=8)
+    assert peak == {"tenant_a": 1, "tenant_b": 2}
+    assert [r.result for r in results[:6]] == [0, 0, 1, 1, 2, 2]
+    assert all(isinstance(r.error, ValueError) for r in results[6:])
+
+
+def test_bulk_actions_stay_within_subscription_limit(config_file):
+    pool = connect_pool(config_file)
+    conn = pool["tenant_a"]
+    conn.concurrency_limit = 2
+    active = [0]
+    peak = [0]
+    lock = threading.Lock()
+
+    def request(api_call, data=None, *args, **kwargs):
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(0.01)
+        with lock:
+            active[0] -= 1
+        return "<SIMPLE_RETURN/>"
+
+    conn.request = request
+    # Each task fans out into 4 chunks, which addIPs alone would run 2 at a time.
+    ips = "10.0.0.1,10.0.0.3,10.0.0.5,10.0.0.7"
+    tasks = [("tenant_a", i) for i in range(4)]
+    results = pool.map_tasks(lambda conn, item: conn.addIPs(ips, max_length=8), tasks)
+    assert all(r.error is None and len(r.result) == 4 for r in results)
+    assert peak[0] == 2
+
+
+if __name__ == "__main__":
+    pytest.main(args=["-vv", "tests/"])
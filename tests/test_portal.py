@@ -0,0 +1,67 @@
+import pytest
+from lxml import etree
+
+from qualysapi.portal import ServiceRequestTemplate, parse_service_response, records
+
+
+def test_template_escapes_values():
+    template = ServiceRequestTemplate([("name", "EQUALS", 'a<b & "c"')], limit_results=50)
+    root = etree.fromstring(template.render([("id", "GREATER", 7)]))
+    assert root.findtext("preferences/limitResults") == "50"
+    assert [(c.get("field"), c.text) for c in root.iter("Criteria")] == [
+        ("name", 'a<b & "c"'),
+        ("id", "7"),
+    ]
+
+
+def test_template_data_records():
+    body = ServiceRequestTemplate().render(
+        data=[{"id": 1, "tags": {"add": {"TagSimple": [{"id": 5}, {"id": 6}]}}}],
+        object_type="HostAsset",
+    )
+    root = etree.fromstring(body)
+    assert root.find("filters") is None
+    assert [e.text for e in root.iterfind("data/HostAsset/tags/add/TagSimple/id")] == ["5", "6"]
+
+
+def test_parse_service_response():
+    root = parse_service_response(
+        "<ServiceResponse><responseCode>SUCCESS</responseCode>"
+        "<data><Tag><id>1</id></Tag></data></ServiceResponse>"
+    )
+    assert [int(r.id) for r in records(root)] == [1]
+    with pytest.raises(Exception):
+        parse_service_response(
+            "<ServiceResponse><responseCode>INVALID_REQUEST</responseCode></ServiceResponse>"
+        )
+
+
+TAG_PAGES = [
+    "<ServiceResponse><responseCode>SUCCESS</responseCode><hasMoreRecords>true</hasMoreRecords>"
+    "<lastId>20</lastId><data><Tag><id>10</id></Tag><Tag><id>20</id></Tag></data>"
+    "</ServiceResponse>",
+    "<ServiceResponse><responseCode>SUCCESS</responseCode><hasMoreRecords>false</hasMoreRecords>"
+    "<data><Tag><id>30</id></Tag></data></ServiceResponse>",
+]
+
+
+@pytest.mark.parametrize("prefetch", [False, True])
+def test_search_portal_pages(fake_connector, prefetch):
+    conn = fake_connector(list(TAG_PAGES))
+    tags = conn.searchPortal(
+        "search/am/tag", [("name", "CONTAINS", "prod")], limit=2, prefetch=prefetch
+    )
+    assert [int(tag.id) for tag in tags] == [10, 20, 30]
+    payloads = [etree.fromstring(data) for _, data in conn.calls]
+    first, second = [
+        [(c.get("field"), c.get("operator"), c.text) for c in payload.iter("Criteria")]
+        for payload in payloads
+    ]
+    assert first == [("name", "CONTAINS", "prod")]
+    # The next page continues after the previous page's lastId.
+    assert second == [("name", "CONTAINS", "prod"), ("id", "GREATER", "20")]
+    assert payloads[1].findtext("preferences/limitResults") == "2"
+
+
+if __name__ == "__main__":
+    pytest.main(args=["-vv", "tests/"])
@@ -0,0 +1,42 @@
+import io
+
+import pytest
+
+from qualysapi.profiling import Profiler
+
+
+HOST_LIST = """<HOST_LIST_OUTPUT><RESPONSE><HOST_LIST>
+<HOST><ID>1</ID><IP>10.0.0.1</IP><TRACKING_METHOD>IP</TRACKING_METHOD>
+<LAST_VULN_SCAN_DATETIME>2020-01-01T10:00:00Z</LAST_VULN_SCAN_DATETIME></HOST>
+</HOST_LIST></RESPONSE></HOST_LIST_OUTPUT>"""
+
+
+def test_actions_are_timed_per_phase(fake_connector):
+    profiler = Profiler(cprofile=True, memory=True)
+    conn = fake_connector(HOST_LIST, profiler=profiler)
+    conn.listHosts()
+    conn.listHosts()
+    stats = profiler.stats()["listHosts"]
+    assert stats["calls"] == 2
+    assert stats["phases"]["parse"] > 0 and stats["phases"]["materialize"] > 0
+    assert stats["seconds"] >= stats["phases"]["parse"] + stats["phases"]["materialize"]
+    out = io.StringIO()
+    profiler.dump(out)
+    assert "listHosts" in out.getvalue() and "cProfile of listHosts" in out.getvalue()
+
+
+def test_generators_are_timed_while_consumed():
+    profiler = Profiler()
+    numbers = profiler.wrap("numbers", lambda: (i for i in range(3)))
+    assert list(numbers()) == [0, 1, 2]
+    assert profiler.stats()["numbers"]["calls"] == 1
+
+
+def test_unprofiled_connector_is_untouched(fake_connector):
+    conn = fake_connector(HOST_LIST)
+    assert conn.profiler is None
+    assert "listHosts" not in vars(conn)
+
+
+if __name__ == "__main__":
+    pytest.main(args=["-vv", "tests/"])
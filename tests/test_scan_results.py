@@ -0,0 +1,84 @@
+import io
+import json
+
+import pytest
+import requests
+
+import qualysapi.settings as qcs
+from qualysapi.scan_results import iter_csv_results, iter_json_results
+
+
+CSV_EXTENDED = b""""Scan Results","scan/1.1"
+"Launch Date","2020-01-01 10:00:00"
+
+"IP","DNS","NetBIOS","OS","IP Status","QID","Title","Type","Severity","Port","Protocol","FQDN","SSL","CVE ID","Vendor Reference","Bugtraq ID","Threat","Impact","Solution","Exploitability","Associated Malware","Results","PCI Vuln","Instance","Category"
+"10.0.0.1","web01","WEB01","Linux","host scanned, found vuln","38170","SSL Cert","Vuln","3","443","tcp","","over ssl","CVE-2020-0001","VR-1","1234","Threat","Impact","Fix","","Malware","line one
+line two","yes","","General remote services"
+"10.0.0.2","","","Windows","host scanned, found vuln","90043","SMB Signing","Vuln","2","","tcp","","","","","","","","","","","","no","","Windows"
+"""
+
+
+def test_csv_results_skip_header_and_keep_multiline_fields(monkeypatch):
+    monkeypatch.setattr(qcs, "stream_chunk_size", 16)
+    rows = list(iter_csv_results(io.BytesIO(CSV_EXTENDED), "scan/1.1"))
+    assert [row.qid for row in rows] == [38170, 90043]
+    assert rows[0].results == "line one\nline two"
+    assert rows[0].port == 443 and rows[1].port is None
+    assert rows[1].dns is None and rows[1].scan_ref == "scan/1.1"
+    assert rows[0].ip_status == "host scanned, found vuln"
+    assert (rows[0].cve_id, rows[0].vendor_reference, rows[0].bugtraq_id) == (
+        "CVE-2020-0001",
+        "VR-1",
+        "1234",
+    )
+    assert rows[0].associated_malware == "Malware"
+    assert [row.pci_vuln for row in rows] == ["yes", "no"]
+
+
+def test_json_results_parsed_across_chunks(monkeypatch):
+    monkeypatch.setattr(qcs, "stream_chunk_size", 7)
+    results = [{"launch_date": "2020-01-01"}] + [
+        {"ip": f"10.0.0.{i}", "qid": 38170 + i, "severity": "3", "title": "café ]"}
+        for i in range(5)
+    ]
+    source = io.BytesIO(json.dumps(results).encode("utf-8"))
+    rows = list(iter_json_results(source, "scan/1.1"))
+    assert [row.qid for row in rows] == [38170 + i for i in range(5)]
+    assert rows[0].severity == 3 and rows[0].title == "café ]"
+
+
+def test_truncated_json_results_raise():
+    with pytest.raises(ValueError):
+        list(iter_json_results(io.BytesIO(b'[{"qid": 1}, {"qid": 2'), None))
+
+
+class ResetBody(io.BytesIO):
+    """Drops the connection after the first read."""
+
+    def read(self, *args, **kwargs):
+        if self.tell():
+            raise requests.exceptions.ConnectionError("connection reset")
+        return super().read(*args, **kwargs)
+
+
+def test_download_scan_results_is_atomic(
+    fake_connector, streamed_response, tmp_path, monkeypatch
+):
+    monkeypatch.setattr(qcs, "stream_chunk_size", 64)
+    path = (
+        fake_connector(CSV_EXTENDED)
+        .downloadScanResults(["scan/1.1"], str(tmp_path), output_format="csv_extended")[0]
+        .result
+    )
+    reset = fake_connector(lambda api_call, data: streamed_response(CSV_EXTENDED, raw=ResetBody))
+    result = reset.downloadScanResults(["scan/1.1"], str(tmp_path), output_format="csv_extended")[
+        0
+    ]
+    assert isinstance(result.error, requests.exceptions.ConnectionError)
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["scan_1.1.csv"]
+    with open(path, "rb") as f:
+        assert [row.qid for row in iter_csv_results(f)] == [38170, 90043]
+
+
+if __name__ == "__main__":
+    pytest.main(args=["-vv", "tests/"])
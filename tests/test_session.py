@@ -0,0 +1,74 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+import requests
+
+from qualysapi.connector import QGConnector
+
+
+class Response:
+    def __init__(self, status_code=200, text="<SIMPLE_RETURN/>"):
+        self.status_code = status_code
+        self.text = text
+        self.encoding = "utf-8"
+        self.headers = {}
+
+    def raise_for_status(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class FakeSession(requests.Session):
+    """ Session answering session/ logins and rejecting calls sent with an old cookie. """
+
+    def __init__(self):
+        super().__init__()
+        self.lock = threading.Lock()
+        self.logins = 0
+        self.logouts = 0
+        self.basic_auth = []
+
+    def post(self, url, data=None, auth=None, **kwargs):
+        if url.endswith("/api/2.0/fo/session/"):
+            with self.lock:
+                if data["action"] == "login":
+                    self.logins += 1
+                    self.cookies.set("QualysSession", str(self.logins))
+                else:
+                    self.logouts += 1
+            return Response()
+        self.basic_auth.append(auth)
+        if self.cookies.get("QualysSession") != str(self.logins) or self.logins < 2:
+            # The first session expires immediately.
+            return Response(401)
+        return Response()
+
+
+def test_session_shared_and_refreshed_once():
+    conn = QGConnector(("user", "password"), use_session=True)
+    conn.session = FakeSession()
+    with conn:
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            list(
+                executor.map(
+                    lambda _: conn.request("/api/2.0/fo/scan/", {"action": "list"}), range(16)
+                )
+            )
+    # One login, one re-login after expiry, no Basic credentials, one logout on close.
+    assert conn.session.logins == 2
+    assert set(conn.session.basic_auth) == {None}
+    assert conn.session.logouts == 1
+
+
+def test_portal_calls_keep_basic_auth():
+    conn = QGConnector(("user", "password"), use_session=True)
+    assert conn.uses_session("https://qualysapi.qualys.com/api/2.0/fo/scan/")
+    assert not conn.uses_session("https://qualysapi.qualys.com/qps/rest/2.0/search/am/tag/")
+    assert not conn.uses_session("https://qualysapi.qualys.com/msp/about.php")
+
+
+if __name__ == "__main__":
+    pytest.main(args=["-vv", "tests/"])
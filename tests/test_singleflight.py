@@ -0,0 +1,117 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+import requests
+
+from qualysapi.connector import QGConnector
+
+
+class Response:
+    def __init__(self, text):
+        self.status_code = 200
+        self.text = text
+        self.encoding = "utf-8"
+        self.headers = {}
+
+    def raise_for_status(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class BlockingSession(requests.Session):
+    """Holds every call until released, then answers it or raises error."""
+
+    def __init__(self, error=None):
+        super().__init__()
+        self.error = error
+        self.calls = 0
+        self.lock = threading.Lock()
+        self.released = threading.Event()
+
+    def post(self, url, data=None, **kwargs):
+        with self.lock:
+            self.calls += 1
+        self.released.wait()
+        if self.error is not None:
+            raise self.error
+        return Response(f"<SIMPLE_RETURN>{data['action']}</SIMPLE_RETURN>")
+
+
+def wait_for(condition):
+    expires = time.monotonic() + 5
+    while not condition():
+        assert time.monotonic() < expires
+        time.sleep(0.001)
+
+
+def make_connector(session):
+    conn = QGConnector(("user", "password"), singleflight=True)
+    conn.session = session
+    return conn
+
+
+def test_concurrent_reads_share_one_request():
+    session = BlockingSession()
+    conn = make_connector(session)
+    with ThreadPoolExecutor(max_workers=5) as executor:
+        futures = [
+            executor.submit(conn.request, "/api/2.0/fo/scan/", {"action": "list"})
+            for _ in range(5)
+        ]
+        wait_for(lambda: conn.singleflight.shared == 4)
+        session.released.set()
+        texts = [future.result() for future in futures]
+    assert texts == ["<SIMPLE_RETURN>list</SIMPLE_RETURN>"] * 5
+    assert session.calls == 1
+
+
+def test_writes_are_not_shared():
+    session = BlockingSession()
+    conn = make_connector(session)
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        futures = [
+            executor.submit(conn.request, "/api/2.0/fo/scan/", {"action": "launch"})
+            for _ in range(3)
+        ]
+        # All three calls are in flight at once.
+        wait_for(lambda: session.calls == 3)
+        session.released.set()
+        for future in futures:
+            future.result()
+    assert conn.singleflight.shared == 0
+
+
+def test_leader_error_reaches_followers():
+    session = BlockingSession(error=requests.exceptions.ConnectionError("reset"))
+    conn = make_connector(session)
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        futures = [
+            executor.submit(conn.request, "/api/2.0/fo/scan/", {"action": "list"})
+            for _ in range(3)
+        ]
+        wait_for(lambda: conn.singleflight.shared == 2)
+        session.released.set()
+        for future in futures:
+            with pytest.raises(requests.exceptions.ConnectionError):
+                future.result()
+    assert session.calls == 1
+
+
+def test_follower_wait_is_bounded_by_deadline():
+    session = BlockingSession()
+    conn = make_connector(session)
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        leader = executor.submit(conn.request, "/api/2.0/fo/scan/", {"action": "list"})
+        wait_for(lambda: session.calls == 1)
+        with pytest.raises(requests.exceptions.Timeout):
+            conn.request("/api/2.0/fo/scan/", {"action": "list"}, deadline=0.05)
+        session.released.set()
+        assert leader.result() == "<SIMPLE_RETURN>list</SIMPLE_RETURN>"
+
+
+if __name__ == "__main__":
+    pytest.main(args=["-vv", "tests/"])
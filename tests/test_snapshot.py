@@ -0,0 +1,69 @@
+import os
+
+import pytest
+
+import qualysapi.snapshot
+from qualysapi.snapshot import SnapshotStore, changed_fields, iter_snapshot, write_snapshot
+
+
+def hosts(*changes):
+    records = {i: {"id": i, "ip": f"10.0.0.{i}", "os": "Linux"} for i in (5, 1, 3, 9)}
+    for change in changes:
+        change(records)
+    return list(records.values())
+
+
+def test_snapshot_sorted_across_runs(tmp_path):
+    filename = str(tmp_path / "hosts.snapshot.gz")
+    assert write_snapshot(filename, hosts(), run_size=2) == 4
+    assert [record_id for record_id, _, _ in iter_snapshot(filename)] == [1, 3, 5, 9]
+
+
+def test_failed_write_keeps_previous_snapshot(tmp_path, monkeypatch):
+    filename = str(tmp_path / "hosts.snapshot.gz")
+    write_snapshot(filename, hosts())
+
+    def merge(*runs, key=None):
+        yield next(iter(runs[0]))
+        raise OSError("No space left on device")
+
+    monkeypatch.setattr(qualysapi.snapshot.heapq, "merge", merge)
+    with pytest.raises(OSError):
+        write_snapshot(filename, hosts(lambda records: records.pop(1)))
+    assert not os.path.exists(f"{filename}.tmp")
+    assert [record_id for record_id, _, _ in iter_snapshot(filename)] == [1, 3, 5, 9]
+
+
+def test_diff_emits_add_remove_change(tmp_path):
+    store = SnapshotStore(str(tmp_path))
+    store.save(hosts(), "20200101")
+
+    def change(records):
+        del records[3]
+        records[7] = {"id": 7, "ip": "10.0.0.7", "os": "Windows"}
+        records[9]["os"] = "Windows"
+
+    store.save(hosts(change), "20200102")
+    assert store.latest() == "20200102"
+    events = list(store.diff("20200101", "20200102"))
+    assert [(event.kind, event.id) for event in events] == [
+        ("remove", 3),
+        ("add", 7),
+        ("change", 9),
+    ]
+    assert changed_fields(events[2]) == ["os"]
+    assert events[2].old["os"] == "Linux" and events[2].new["os"] == "Windows"
+
+
+def test_snapshot_hosts(fake_connector, tmp_path):
+    conn = fake_connector("""<HOST_LIST_OUTPUT><RESPONSE><HOST_LIST>
+<HOST><ID>2</ID><IP>10.0.0.2</IP><TRACKING_METHOD>IP</TRACKING_METHOD></HOST>
+<HOST><ID>1</ID><IP>10.0.0.1</IP><TRACKING_METHOD>IP</TRACKING_METHOD></HOST>
+</HOST_LIST></RESPONSE></HOST_LIST_OUTPUT>""")
+    store = SnapshotStore(str(tmp_path))
+    name = conn.snapshotHosts(store)
+    assert [record_id for record_id, _, _ in iter_snapshot(store.path(name))] == [1, 2]
+
+
+if __name__ == "__main__":
+    pytest.main(args=["-vv", "tests/"])
@@ -0,0 +1,90 @@
+import io
+import mmap
+import tempfile
+
+import pytest
+import requests
+
+import qualysapi.settings as qcs
+
+
+BODY = b"<HOST_LIST_OUTPUT>" + b"<HOST/>" * 100 + b"</HOST_LIST_OUTPUT>"
+
+
+class FailingBody(io.BytesIO):
+    """Fails after the first read, like a connection reset mid-download."""
+
+    def read(self, *args, **kwargs):
+        if self.tell():
+            raise requests.exceptions.ConnectionError("connection reset")
+        return super().read(*args, **kwargs)
+
+
+@pytest.fixture
+def temporary_files(monkeypatch):
+    # Record the temporary files request_spooled creates.
+    created = []
+    make = tempfile.TemporaryFile
+
+    def record(*args, **kwargs):
+        created.append(make(*args, **kwargs))
+        return created[-1]
+
+    monkeypatch.setattr(tempfile, "TemporaryFile", record)
+    monkeypatch.setattr(qcs, "stream_chunk_size", 64)
+    return created
+
+
+def test_small_body_stays_in_memory(fake_connector, temporary_files):
+    buffer = fake_connector(BODY).request_spooled(
+        "/api/2.0/fo/asset/host/", spool_threshold=10**6
+    )
+    assert isinstance(buffer, io.BytesIO)
+    assert buffer.read() == BODY
+    assert not temporary_files
+
+
+def test_body_over_threshold_spills_to_file(fake_connector, temporary_files):
+    buffer = fake_connector(BODY).request_spooled("/api/2.0/fo/asset/host/", spool_threshold=100)
+    assert buffer is temporary_files[0]
+    assert buffer.read() == BODY
+
+
+def test_announced_large_body_goes_straight_to_file(
+    fake_connector, streamed_response, temporary_files
+):
+    conn = fake_connector(
+        lambda api_call, data: streamed_response(BODY, headers={"Content-Length": str(len(BODY))})
+    )
+    buffer = conn.request_spooled("/api/2.0/fo/asset/host/", spool_threshold=100)
+    assert buffer is temporary_files[0]
+    assert buffer.read() == BODY
+
+
+def test_spooled_body_as_mmap(fake_connector, temporary_files):
+    mapped = fake_connector(BODY).request_spooled(
+        "/api/2.0/fo/asset/host/", spool_threshold=100, use_mmap=True
+    )
+    assert isinstance(mapped, mmap.mmap)
+    assert mapped[:] == BODY
+    assert temporary_files[0].closed
+    # Bodies kept in memory are not mapped.
+    buffer = fake_connector(BODY).request_spooled("/api/2.0/fo/asset/host/", use_mmap=True)
+    assert isinstance(buffer, io.BytesIO)
+
+
+def test_failed_download_closes_temporary_file(
+    fake_connector, streamed_response, temporary_files
+):
+    conn = fake_connector(
+        lambda api_call, data: streamed_response(BODY, raw=FailingBody), memory_budget=len(BODY)
+    )
+    with pytest.raises(requests.exceptions.ConnectionError):
+        conn.request_spooled("/api/2.0/fo/asset/host/", spool_threshold=10)
+    assert len(temporary_files) == 1
+    assert temporary_files[0].closed
+    assert conn.memory_budget.in_use == 0
+
+
+if __name__ == "__main__":
+    pytest.main(args=["-vv", "tests/"])
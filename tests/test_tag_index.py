@@ -0,0 +1,89 @@
+import pytest
+from lxml import etree
+
+
+def tag(id, name, parent_id=None, modified="2020-01-01T00:00:00Z"):
+    parent = f"<parentTagId>{parent_id}</parentTagId>" if parent_id else ""
+    return f"<Tag><id>{id}</id><name>{name}</name>{parent}<modified>{modified}</modified></Tag>"
+
+
+def page(*tags):
+    return (
+        "<ServiceResponse><responseCode>SUCCESS</responseCode>"
+        f"<hasMoreRecords>false</hasMoreRecords><data>{''.join(tags)}</data></ServiceResponse>"
+    )
+
+
+TAGS = page(
+    tag(1, "Environment"),
+    tag(2, "Production", 1),
+    tag(3, "Staging", 1),
+    tag(4, "Web", 2),
+    tag(5, "Database", 2),
+)
+
+UPDATED = page(tag(5, "Database", 3, modified="2020-03-01T00:00:00Z"))
+
+CHILDREN = page(
+    "<Tag><id>2</id><name>Production</name><children><list>"
+    "<TagSimple><id>4</id><name>Web</name></TagSimple>"
+    "<TagSimple><id>5</id><name>Database</name></TagSimple>"
+    "</list></children></Tag>"
+)
+
+
+def payloads(conn):
+    return [etree.fromstring(data) for _, data in conn.calls]
+
+
+def test_tag_index_tree(fake_connector):
+    conn = fake_connector([TAGS, UPDATED])
+    index = conn.tagIndex()
+    assert len(index) == 5
+    assert [t.name for t in index.children(1)] == ["Production", "Staging"]
+    assert [t.id for t in index.subtree(1)] == [2, 3, 4, 5]
+    assert [t.id for t in index.ancestors(5)] == [2, 1]
+    assert [t.id for t in index.find("web")] == [4]
+
+    # A refresh only asks for tags updated since the newest one indexed, and moves them.
+    conn.tagIndex(index)
+    criteria = [
+        (c.get("field"), c.get("operator"), c.text) for c in payloads(conn)[1].iter("Criteria")
+    ]
+    assert criteria == [("updated", "GREATER", "2020-01-01T00:00:00Z")]
+    assert [t.id for t in index.children(2)] == [4]
+    assert [t.id for t in index.children(3)] == [5]
+    assert [t.id for t in index.ancestors(5)] == [3, 1]
+    assert index.last_modified == "2020-03-01T00:00:00Z"
+
+
+def test_list_child_tags(fake_connector):
+    conn = fake_connector([CHILDREN, page()])
+    children = conn.listChildTags(tag_name="Production")
+    assert [str(child[1]) for child in children] == ["Web", "Database"]
+    assert payloads(conn)[0].find("filters/Criteria").text == "Production"
+    assert conn.listChildTags(tag_id=99) == []
+
+
+def test_update_asset_tags(fake_connector):
+    response = "<ServiceResponse><responseCode>SUCCESS</responseCode></ServiceResponse>"
+    conn = fake_connector([response, response])
+    responses = conn.updateAssetTags(
+        [11, 12, 13], add_tag_ids=[4], remove_tag_ids=[5, 6], batch_size=2
+    )
+    assert len(responses) == 2
+    assert [payload.find("filters/Criteria").text for payload in payloads(conn)] == [
+        "11,12",
+        "13",
+    ]
+    tags = payloads(conn)[0].find("data/HostAsset/tags")
+    assert [e.text for e in tags.iterfind("add/TagSimple/id")] == ["4"]
+    assert [e.text for e in tags.iterfind("remove/TagSimple/id")] == ["5", "6"]
+    # Without removals, no remove element is sent.
+    conn = fake_connector([response])
+    conn.updateAssetTags([11], add_tag_ids=[4])
+    assert payloads(conn)[0].find("data/HostAsset/tags/remove") is None
+
+
+if __name__ == "__main__":
+    pytest.main(args=["-vv", "tests/"])
@@ -0,0 +1,98 @@
+import io
+import os
+import time
+
+import pytest
+import requests
+
+import qualysapi.settings as qcs
+from qualysapi.config import QualysConnectConfig
+from qualysapi.connector import QGConnector, build_timeouts
+
+
+class SlowBody(io.BytesIO):
+    def read(self, *args, **kwargs):
+        time.sleep(0.02)
+        return super().read(*args, **kwargs)
+
+
+class SlowSession(requests.Session):
+    """Answers at once, then trickles the body."""
+
+    def __init__(self):
+        super().__init__()
+        self.timeouts = []
+
+    def post(self, url, data=None, timeout=None, **kwargs):
+        self.timeouts.append(timeout)
+        response = requests.Response()
+        response.status_code = 200
+        response.raw = SlowBody(b"<SIMPLE_RETURN/>" * 10)
+        return response
+
+
+def test_build_timeouts():
+    assert build_timeouts() == {
+        family: (qcs.connect_timeout, read) for family, read in qcs.read_timeouts.items()
+    }
+    assert build_timeouts(30)[2] == (qcs.connect_timeout, 30.0)
+    assert build_timeouts((5, 60))["was"] == (5.0, 60.0)
+    timeouts = build_timeouts({"am": 10, 1: (3, 20)})
+    assert timeouts["am"] == (qcs.connect_timeout, 10.0)
+    assert timeouts[1] == (3.0, 20.0)
+    assert timeouts[2] == (qcs.connect_timeout, qcs.read_timeouts[2])
+
+
+def test_url_family_selects_timeouts():
+    conn = QGConnector(("user", "password"), timeouts={"was": 7, 2: 9})
+    conn.session = SlowSession()
+    assert conn.url_family("https://qualysapi.qualys.com/msp/about.php") == 1
+    assert conn.url_family("https://qualysapi.qualys.com/qps/rest/1.0/search/am/tag") == "am"
+    assert conn.url_family("https://qualysapi.qualys.com/qps/rest/2.0/search/am/tag") == "am2"
+    assert (
+        conn.url_family("https://qualysapi.qualys.com/qps/rest/3.0/search/was/finding") == "was"
+    )
+    assert conn.url_family("https://qualysapi.qualys.com/api/2.0/fo/scan/") == 2
+    conn.request("/api/2.0/fo/scan/", {"action": "list"})
+    assert conn.session.timeouts[-1] == (qcs.connect_timeout, 9.0)
+
+
+def test_config_timeouts(tmp_path):
+    path = tmp_path / ".qcrc"
+    path.write_text(
+        "[info]\nhostname = qualysapi.qualys.com\nusername = user\npassword = password\n"
+        "connect_timeout = 5\nread_timeout = 60\nread_timeout_was = 600\n"
+    )
+    os.chmod(str(path), 0o600)
+    timeouts = QualysConnectConfig(filename=str(path)).timeouts
+    assert timeouts[2] == (5.0, 60.0)
+    assert timeouts["am2"] == (5.0, 60.0)
+    assert timeouts["was"] == (5.0, 600.0)
+
+
+def test_config_without_timeouts_uses_defaults(tmp_path):
+    path = tmp_path / ".qcrc"
+    path.write_text("[info]\nhostname = qualysapi.qualys.com\nusername = user\npassword = x\n")
+    os.chmod(str(path), 0o600)
+    assert QualysConnectConfig(filename=str(path)).timeouts is None
+
+
+def test_sleep_past_deadline_raises_timeout():
+    conn = QGConnector(("user", "password"))
+    with pytest.raises(requests.exceptions.Timeout):
+        conn._sleep(30, conn.deadline_at(1))
+    with pytest.raises(requests.exceptions.Timeout):
+        conn._sleep(0, conn.deadline_at(-1))
+
+
+def test_deadline_bounds_body_download(monkeypatch):
+    monkeypatch.setattr(qcs, "stream_chunk_size", 16)
+    conn = QGConnector(("user", "password"))
+    conn.session = SlowSession()
+    with pytest.raises(requests.exceptions.Timeout):
+        conn.request("/api/2.0/fo/scan/", {"action": "list"}, deadline=0.05)
+    assert conn.request("/api/2.0/fo/scan/", {"action": "list"}) == "<SIMPLE_RETURN/>" * 10
+
+
+if __name__ == "__main__":
+    pytest.main(args=["-vv", "tests/"])
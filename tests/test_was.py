@@ -0,0 +1,98 @@
+import io
+
+import pytest
+import requests
+from lxml import etree
+
+from qualysapi.interning import DictionaryEncoder
+from qualysapi.was import iter_scan_vulns
+
+
+FINDING = """<Finding><id>{id}</id><uniqueId>uid-{id}</uniqueId><qid>150001</qid>
+<name>Reflected XSS</name><type>VULNERABILITY</type><severity>5</severity><status>NEW</status>
+<url>https://shop.example.com/search</url><webApp><id>9</id><name>Shop</name></webApp>
+<firstDetectedDate>2020-01-01T00:00:00Z</firstDetectedDate>
+<lastDetectedDate>2020-02-01T00:00:00Z</lastDetectedDate></Finding>"""
+
+FINDING_PAGES = {
+    None: f"""<ServiceResponse><responseCode>SUCCESS</responseCode><count>2</count>
+<hasMoreRecords>true</hasMoreRecords><lastId>2</lastId>
+<data>{FINDING.format(id=1)}{FINDING.format(id=2)}</data></ServiceResponse>""",
+    "2": f"""<ServiceResponse><responseCode>SUCCESS</responseCode><count>1</count>
+<hasMoreRecords>false</hasMoreRecords><data>{FINDING.format(id=3)}</data></ServiceResponse>""",
+}
+
+WAS_SCAN = b"""<WasScan><id>42</id><vulns><list>
+<WasScanVuln><qid>150001</qid><title>Reflected XSS</title><uri>https://shop.example.com/search</uri>
+<param>q</param></WasScanVuln>
+<WasScanVuln><qid>150002</qid><title>SQL Injection</title><uri>https://shop.example.com/item</uri>
+</WasScanVuln>
+</list></vulns></WasScan>"""
+
+
+def last_id(data):
+    return etree.fromstring(data).findtext("filters/Criteria[@field='id']")
+
+
+def was_responses(api_call, data):
+    # Serve finding pages by the lastId in the search criteria, and scan downloads.
+    if api_call.startswith("download/"):
+        return WAS_SCAN
+    return FINDING_PAGES[last_id(data)]
+
+
+def test_iter_scan_vulns():
+    vulns = list(iter_scan_vulns(io.BytesIO(WAS_SCAN), 42))
+    assert [(v.scan_id, v.qid, v.title, v.param) for v in vulns] == [
+        (42, 150001, "Reflected XSS", "q"),
+        (42, 150002, "SQL Injection", None),
+    ]
+
+
+def test_iter_was_findings_follows_last_id(fake_connector):
+    conn = fake_connector(was_responses)
+    findings = list(conn.iterWasFindings([("webApp.id", "EQUALS", 9)], limit=2))
+    assert [f.id for f in findings] == [1, 2, 3]
+    assert [last_id(data) for _, data in conn.calls] == [None, "2"]
+    finding = findings[0]
+    assert (finding.unique_id, finding.qid, finding.severity) == ("uid-1", 150001, 5)
+    assert (finding.webapp_id, finding.webapp_name) == (9, "Shop")
+    assert finding.name is findings[2].name
+
+
+def test_iter_was_findings_columnar(fake_connector):
+    encoder = DictionaryEncoder()
+    batches = list(
+        fake_connector(was_responses).iterWasFindings(batch_size=2, encoders={"status": encoder})
+    )
+    assert [batch["id"] for batch in batches] == [[1, 2], [3]]
+    assert batches[0]["status"] == [0, 0]
+    assert encoder.decode(0) == "NEW"
+
+
+def test_iter_was_scan_results(fake_connector):
+    conn = fake_connector(was_responses)
+    assert [v.qid for v in conn.iterWasScanResults(42)] == [150001, 150002]
+    assert [api_call for api_call, _ in conn.calls] == ["download/was/wasscan/42"]
+
+
+def test_download_was_scans(fake_connector, tmp_path):
+    conn = fake_connector(was_responses)
+    results = conn.downloadWasScans([42, 43], str(tmp_path), max_workers=2)
+    assert [(r.item, r.error) for r in results] == [(42, None), (43, None)]
+    assert [v.qid for v in iter_scan_vulns(results[1].result, 43)] == [150001, 150002]
+
+
+def test_failed_download_keeps_previous_file(fake_connector, streamed_response, tmp_path):
+    conn = fake_connector(was_responses)
+    path = conn.downloadWasScans([42], str(tmp_path))[0].result
+    failing = fake_connector(lambda api_call, data: streamed_response(WAS_SCAN, status_code=500))
+    result = failing.downloadWasScans([42], str(tmp_path))[0]
+    assert isinstance(result.error, requests.HTTPError)
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["wasscan_42.xml"]
+    with open(path, "rb") as f:
+        assert f.read() == WAS_SCAN
+
+
+if __name__ == "__main__":
+    pytest.main(args=["-vv", "tests/"])